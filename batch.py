@@ -0,0 +1,94 @@
+import contextlib
+import io
+import os
+import shutil
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+# One entry per input path, in the order the paths were given.
+# output is whatever the worker printed, error is None or "Type: message".
+BatchResult = namedtuple("BatchResult", ["path", "result", "output", "error"])
+
+def add_jobs_argument(parser):
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=1,
+        help="number of worker processes (0 = one per CPU, default: 1)",
+    )
+
+def resolve_jobs(jobs):
+    if jobs is None or jobs < 1:
+        return os.cpu_count() or 1
+    return jobs
+
+def walk_files(top, suffixes, skip=None):
+    # Sorted walk so that serial and parallel runs see files in the same order
+    for root, dirs, files in os.walk(top):
+        dirs.sort()
+        if skip:
+            dirs[:] = [d for d in dirs if not skip(os.path.join(root, d))]
+        for file in sorted(files):
+            if file.endswith(suffixes):
+                yield os.path.join(root, file)
+
+def write_atomic(path, content, encoding='utf-8'):
+    # Write next to path and swap it in, so a failed run never leaves a half-written file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding=encoding) as f:
+            f.write(content)
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _run_captured(func, path):
+    # Runs in a worker process: capture prints so the parent can replay them in order
+    out = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(out):
+            result = func(path)
+        return BatchResult(path, result, out.getvalue(), None)
+    except Exception as e:
+        return BatchResult(path, None, out.getvalue(), f"{type(e).__name__}: {e}")
+
+def _run_serial(func, path):
+    try:
+        return BatchResult(path, func(path), "", None)
+    except Exception as e:
+        return BatchResult(path, None, "", f"{type(e).__name__}: {e}")
+
+def run_batch(func, paths, jobs=1):
+    """Run func(path) for every path and return a list of BatchResult.
+
+    func must be a module-level function (or functools.partial of one) so it
+    can be pickled. With jobs > 1 the work is spread over a process pool;
+    output and errors are printed in input order either way, so logs match
+    the serial run line for line.
+    """
+    paths = list(paths)
+    jobs = min(resolve_jobs(jobs), max(len(paths), 1))
+    results = []
+
+    if jobs == 1:
+        for path in paths:
+            result = _run_serial(func, path)
+            if result.error:
+                print(f"Error processing {path}: {result.error}")
+            results.append(result)
+        return results
+
+    chunksize = max(1, len(paths) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        for result in executor.map(_run_captured, [func] * len(paths), paths, chunksize=chunksize):
+            if result.output:
+                print(result.output, end="")
+            if result.error:
+                print(f"Error processing {result.path}: {result.error}")
+            results.append(result)
+    return results
+
+def count_errors(results):
+    return sum(1 for r in results if r.error)
@@ -0,0 +1,55 @@
+"""Time and peak memory of redesign_sites.render_page.
+
+Pages are rendered in memory without the responsive image step (Pillow
+resizing would dominate the timings), so nothing is written anywhere.
+Usage: python benchmarks/bench_redesign.py [--repeat 5] [paths ...]
+"""
+import argparse
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from redesign_sites import render_page
+
+def run(pages, repeat):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for path, text in pages:
+                render_page(text, path, images=False, reconvert=True)
+        elapsed = (time.perf_counter() - start) / repeat
+
+        peak = 0
+        for path, text in pages:
+            tracemalloc.start()
+            render_page(text, path, images=False, reconvert=True)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    return elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="*")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    paths = args.paths or sorted(glob.glob("sites/**/*.html", recursive=True))
+    pages = []
+    for path in paths:
+        with open(path, "r") as f:
+            pages.append((path, f.read()))
+    total_kb = sum(len(text) for _, text in pages) / 1024
+    print(f"{len(pages)} pages, {total_kb:.0f} KiB")
+
+    elapsed, peak = run(pages, args.repeat)
+    print(f"{'time/run (s)':>13} {'peak/page (KiB)':>16}")
+    print(f"{elapsed:>13.3f} {peak / 1024:>16.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Compare the old per-mapping str.replace loop with the compiled single-scan matcher.
+
+Usage: python benchmarks/bench_rename.py [--renames 100 1000 5000] [--files 200]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from normalize_filenames import compile_rename_map, rewrite_references
+
+def make_rename_map(count):
+    rename_map = {}
+    for i in range(count):
+        old_name = f"Site Name {i}.html"
+        rename_map[old_name] = f"site_name_{i}.html"
+        rename_map[old_name.replace(" ", "%20")] = f"site_name_{i}.html"
+    return rename_map
+
+def make_documents(rename_map, files, links_per_file, seed=0):
+    rng = random.Random(seed)
+    names = list(rename_map)
+    filler = "<p>" + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 20 + "</p>\n"
+    documents = []
+    for _ in range(files):
+        parts = []
+        for _ in range(links_per_file):
+            parts.append(filler)
+            parts.append(f'<a href="sites/{rng.choice(names)}">link</a>\n')
+        documents.append("".join(parts))
+    return documents
+
+def replace_loop(content, rename_map):
+    # The original implementation: one scan (and one copy per hit) per mapping
+    changes_count = 0
+    for old_name, new_name in rename_map.items():
+        if old_name in content:
+            content = content.replace(old_name, new_name)
+            changes_count += 1
+    return content, changes_count
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--renames", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--links", type=int, default=20, help="links per file")
+    args = parser.parse_args()
+
+    print(f"{'renames':>8} {'loop (s)':>10} {'single scan (s)':>16} {'compile (s)':>12} {'speedup':>8}")
+    for count in args.renames:
+        rename_map = make_rename_map(count)
+        documents = make_documents(rename_map, args.files, args.links)
+
+        start = time.perf_counter()
+        expected = [replace_loop(doc, rename_map)[0] for doc in documents]
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        pattern = compile_rename_map(rename_map)
+        compile_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        actual = [rewrite_references(doc, pattern, rename_map)[0] for doc in documents]
+        scan_time = time.perf_counter() - start
+
+        assert actual == expected, "single-scan output differs from the replace loop"
+        print(f"{len(rename_map):>8} {loop_time:>10.3f} {scan_time:>16.3f} {compile_time:>12.3f} "
+              f"{loop_time / (scan_time + compile_time):>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Time and peak memory of the transform scripts on synthetic trees of growing size.
+
+Each script runs on a fresh copy of a tree from synthetic_corpus.py,
+once per-file through process_file and once end to end through main().
+Results go to a JSON file; --compare prints the change against an
+earlier results file.
+Usage: python benchmarks/bench_scripts.py [--sizes 100 1000 10000] [--scripts ...] [--output bench_scripts.json]
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, REPO_DIR)
+
+import migrate_bootstrap
+import normalize_filenames
+import redesign_sites
+from link_index import LinkIndex
+from synthetic_corpus import generate_tree
+
+DEFAULT_SIZES = (100, 1000, 10000)
+# Per-file peak memory does not depend on the tree size, so a sample is enough
+MEMORY_SAMPLE = 25
+
+def _redesign(path):
+    redesign_sites.process_file(path, images=False)
+
+def _migrate_stream(path):
+    migrate_bootstrap.process_file(path, stream=True)
+
+def _warm_link_index():
+    # What the last run leaves behind: an index that is current for the whole tree
+    LinkIndex.build(".").save()
+
+def _one_new_page():
+    # The usual case after the first run: a normalized tree and one new page with a space in its name
+    normalize_filenames.main([])
+    shutil.copy(site_pages()[0], os.path.join("sites", "New Site.html"))
+    with open("index.html", "a", encoding="utf-8") as f:
+        f.write('<a href="sites/New%20Site.html">New Site</a>\n')
+
+def _one_new_page_warm():
+    _one_new_page()
+    _warm_link_index()
+
+# script -> (per-file function or None, main() arguments, untimed setup or None)
+SCRIPTS = {
+    "migrate_bootstrap": (migrate_bootstrap.process_file, ["--force"], None),
+    "migrate_bootstrap --stream": (_migrate_stream, ["--force", "--stream"], None),
+    "redesign_sites": (_redesign, ["--force", "--no-images"], None),
+    "normalize_filenames": (None, [], None),
+    "normalize_filenames --index": (None, ["--index"], None),
+    "normalize_filenames --index warm": (None, ["--index"], _warm_link_index),
+    "normalize_filenames 1 new page": (None, [], _one_new_page),
+    "normalize_filenames --index 1 new page warm": (None, ["--index"], _one_new_page_warm),
+}
+
+@contextlib.contextmanager
+def in_tree(pristine):
+    # A scratch copy of the tree as the working directory, since the scripts work on "."
+    scratch = tempfile.mkdtemp(prefix="bench-")
+    tree = os.path.join(scratch, "tree")
+    shutil.copytree(pristine, tree)
+    cwd = os.getcwd()
+    os.chdir(tree)
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            yield tree
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(scratch)
+
+def site_pages():
+    return sorted(os.path.join("sites", name) for name in os.listdir("sites") if name.endswith(".html"))
+
+def bench_process_file(func, pristine):
+    with in_tree(pristine):
+        pages = site_pages()
+        start = time.perf_counter()
+        for path in pages:
+            func(path)
+        elapsed = time.perf_counter() - start
+    with in_tree(pristine):
+        peak = 0
+        for path in site_pages()[:MEMORY_SAMPLE]:
+            tracemalloc.start()
+            func(path)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    return elapsed, peak
+
+def bench_main(module, argv, pristine, memory=True, setup=None):
+    with in_tree(pristine):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        module.main(argv)
+        elapsed = time.perf_counter() - start
+    peak = None
+    if memory:
+        # Separate run, tracemalloc slows everything down
+        with in_tree(pristine):
+            if setup:
+                setup()
+            tracemalloc.start()
+            module.main(argv)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return elapsed, peak
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def result_key(result):
+    return (result["script"], result["stage"], result["pages"])
+
+def compare(results, previous_path):
+    with open(previous_path, "r", encoding="utf-8") as f:
+        previous = {result_key(r): r for r in json.load(f)["results"]}
+    print(f"\nAgainst {previous_path}:")
+    for result in results:
+        old = previous.get(result_key(result))
+        if old:
+            print(f"  {result['script']:<32} {result['stage']:<13} {result['pages']:>6}  "
+                  f"{old['seconds']:.3f}s -> {result['seconds']:.3f}s ({old['seconds'] / result['seconds']:.2f}x)")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    parser.add_argument("--scripts", nargs="+", choices=list(SCRIPTS), default=list(SCRIPTS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="bench_scripts.json")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="skip the tracemalloc run of main(), which doubles the time")
+    parser.add_argument("--compare", help="earlier --output file to compare against")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'script':<32} {'stage':<13} {'pages':>6} {'seconds':>9} {'ms/page':>8} {'peak (KiB)':>11}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory(prefix="corpus-") as pristine:
+            generate_tree(pristine, size, args.seed, os.path.join(REPO_DIR, redesign_sites.ROOT_DIR, "AA-template", "AA-template.html"))
+            for name in args.scripts:
+                func, argv, setup = SCRIPTS[name]
+                module = sys.modules[name.split()[0]]
+                runs = [("main", bench_main(module, argv, pristine, args.memory, setup))]
+                if func:
+                    runs.insert(0, ("process_file", bench_process_file(func, pristine)))
+                for stage, (elapsed, peak) in runs:
+                    results.append({
+                        "script": name, "stage": stage, "pages": size, "seconds": round(elapsed, 4),
+                        "ms_per_page": round(elapsed * 1000 / size, 3),
+                        "peak_kib": round(peak / 1024) if peak is not None else None,
+                    })
+                    peak_text = f"{peak / 1024:>11.0f}" if peak is not None else f"{'-':>11}"
+                    print(f"{name:<32} {stage:<13} {size:>6} {elapsed:>9.3f} {elapsed * 1000 / size:>8.2f} {peak_text}")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({
+            "meta": {
+                "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "seed": args.seed,
+            },
+            "results": results,
+        }, f, indent=2)
+        f.write("\n")
+    print(f"\nWrote {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == "__main__":
+    main()
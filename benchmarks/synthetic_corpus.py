@@ -0,0 +1,154 @@
+"""Generate a synthetic atlas tree of Bootstrap 3 era site pages.
+
+Pages are built from sites/AA-template with its content replaced by
+panels, grid columns, figures and links to other pages, the way the
+student pages looked before the migration. About half of the pages get
+names with spaces so normalize_filenames.py has renames to do.
+Usage: python benchmarks/synthetic_corpus.py OUT_DIR [--pages 1000] [--seed 0]
+"""
+import argparse
+import csv
+import os
+import random
+import re
+import sys
+import urllib.parse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from migrate_bootstrap import BOOTSTRAP_CSS_CDN, BOOTSTRAP_JS_CDN
+
+TEMPLATE_PATH = os.path.join("sites", "AA-template", "AA-template.html")
+BOOTSTRAP3_CSS = '<link href="../css/bootstrap.css" rel="stylesheet">'
+BOOTSTRAP3_JS = (
+    '<script src="https://ajax.googleapis.com/ajax/libs/jquery/1.11.1/jquery.min.js"></script>\n'
+    '<script src="../js/bootstrap.min.js"></script>'
+)
+DIV_RE = re.compile(r'<(/?)div\b[^>]*>', re.IGNORECASE)
+PERIODS = ("Predynastic", "Old Kingdom", "Middle Kingdom", "New Kingdom", "Late Period", "Ptolemaic", "Roman")
+WORDS = (
+    "excavation survey temple tomb necropolis pottery sherd stela inscription dynasty pharaoh "
+    "mastaba pyramid settlement cemetery relief faience papyrus nome harbor fortress"
+).split()
+SECTIONS_PER_PAGE = (3, 8)
+LINKS_PER_SECTION = (0, 3)
+
+def page_name(i):
+    # Every other page has the kind of name normalize_filenames.py rewrites
+    return f"Site Name {i}.html" if i % 2 else f"site-{i}.html"
+
+def link_to(name, rng):
+    # Students wrote both raw spaces and %20
+    return name if rng.random() < 0.5 else urllib.parse.quote(name)
+
+def sentence(rng, words=12):
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+def section(rng, k, names):
+    links = "".join(
+        f' See <a href="{link_to(name, rng)}">{name[:-5]}</a>.'
+        for name in rng.sample(names, min(len(names), rng.randint(*LINKS_PER_SECTION)))
+    )
+    paragraphs = "\n".join(f"<p>{sentence(rng, rng.randint(20, 60))}</p>" for _ in range(rng.randint(1, 3)))
+    return f"""
+<h3>Section {k}</h3>
+<hr>
+<div class="row">
+  <div class="col-xs-12 col-md-8">
+    <div class="panel panel-default">
+      <div class="panel-heading"><h4 class="panel-title">{sentence(rng, 4)}</h4></div>
+      <div class="panel-body">
+{paragraphs}
+<p>{sentence(rng)}{links}</p>
+        <figure class="figure pull-right">
+          <img class="img-responsive center-block" src="http://example.org/images/{k}.jpg" width="400" height="300">
+          <figcaption class="figure-caption text-right">{sentence(rng, 6)}</figcaption>
+        </figure>
+      </div>
+    </div>
+  </div>
+  <div class="col-xs-12 col-md-4 col-md-offset-0">
+    <button type="button" class="btn btn-default" data-toggle="modal" data-target="#refs-{k}">References</button>
+  </div>
+</div>"""
+
+def render(template, i, names, rng):
+    title = page_name(i)[:-5].title()
+    sections = "".join(section(rng, k, names) for k in range(rng.randint(*SECTIONS_PER_PAGE)))
+    detail = f"""<div id="detail">
+      <h1>{title}</h1>
+      <h3>{rng.choice(PERIODS)}</h3>
+      <h4>Student {i}</h4>{sections}
+    </div>"""
+    start, end = detail_span(template)
+    return template[:start] + detail + template[end:]
+
+def detail_span(template):
+    # Source range of the template's #detail, up to its matching </div>
+    start = template.index('<div id="detail">')
+    depth = 0
+    for match in DIV_RE.finditer(template, start):
+        depth += -1 if match.group(1) else 1
+        if not depth:
+            return start, match.end()
+    raise ValueError("#detail is not closed")
+
+def load_template(path=TEMPLATE_PATH):
+    with open(path, "r", encoding="utf-8") as f:
+        template = f.read()
+    # Back to Bootstrap 3 and to the depth of a page directly under sites/
+    template = template.replace(BOOTSTRAP_CSS_CDN, BOOTSTRAP3_CSS).replace(BOOTSTRAP_JS_CDN, BOOTSTRAP3_JS)
+    return template.replace("../../", "../")
+
+def generate_tree(out_dir, pages, seed=0, template_path=TEMPLATE_PATH):
+    """Write pages synthetic site pages plus index.html and sites-popup.csv to out_dir.
+
+    Returns the page paths. The same seed always gives the same tree.
+    """
+    rng = random.Random(seed)
+    template = load_template(template_path)
+    names = [page_name(i) for i in range(pages)]
+    sites_dir = os.path.join(out_dir, "sites")
+    os.makedirs(sites_dir, exist_ok=True)
+
+    paths = []
+    for i, name in enumerate(names):
+        path = os.path.join(sites_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(render(template, i, names, rng))
+        paths.append(path)
+
+    with open(os.path.join(out_dir, "sites-popup.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["lat", "lon", "timePeriod", "siteName", "info", "link"])
+        for i, name in enumerate(names):
+            writer.writerow([
+                round(rng.uniform(22, 31), 4), round(rng.uniform(25, 34), 4),
+                f"<h4>{rng.choice(PERIODS)}</h4>", f"<h3>{name[:-5]}</h3>", sentence(rng),
+                f'<a href="sites/{name}">MORE DETAILS</a>',
+            ])
+
+    with open(os.path.join(out_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(
+            '<html><head><link href="css/bootstrap.css" rel="stylesheet"></head><body>\n'
+            '<nav class="navbar navbar-default navbar-fixed-top"><ul class="nav navbar-nav navbar-right">'
+            '<li><a href="projects.html">Projects</a></li></ul></nav>\n'
+            '<div class="container"><div class="row"><div class="col-xs-12 text-center">Atlas</div></div></div>\n'
+            '</body></html>\n'
+        )
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("out")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    paths = generate_tree(args.out, args.pages, args.seed)
+    size = sum(os.path.getsize(path) for path in paths)
+    print(f"Wrote {len(paths)} pages ({size / 1024 / 1024:.1f} MiB) to {args.out}/")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import os
+
+MANIFEST_PATH = ".build-manifest.json"
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def script_version(*parts):
+    # Hash of the given source files (paths) and/or literal strings, e.g. a template.
+    h = hashlib.sha256()
+    for part in parts:
+        if os.path.isfile(part):
+            with open(part, 'rb') as f:
+                h.update(f.read())
+        else:
+            h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+class BuildManifest:
+    """Per-script record of the files a previous run produced.
+
+    The manifest file holds one section per script, each with the script
+    version and, per file, the content hash as it was left after the run.
+    A file is up to date when the version still matches and its content
+    hash is the same. mtime/size are kept only to avoid rehashing files
+    that have not been touched.
+    """
+
+    def __init__(self, name, version, path=MANIFEST_PATH):
+        self.name = name
+        self.version = version
+        self.path = path
+        self.data = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable manifest {path}: {e}")
+        section = self.data.get(name, {})
+        self.files = section.get("files", {}) if section.get("version") == version else {}
+
+    def _stat(self, path):
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+
+    def is_current(self, path):
+        entry = self.files.get(path)
+        if not entry or not os.path.exists(path):
+            return False
+        mtime, size = self._stat(path)
+        if entry["mtime"] == mtime and entry["size"] == size:
+            return True
+        if entry["size"] != size:
+            return False
+        if entry["sha256"] != file_hash(path):
+            return False
+        # Touched but not changed: refresh the stat so we skip hashing next time
+        entry["mtime"] = mtime
+        return True
+
+    def partition(self, paths):
+        # Returns (stale, current) keeping the input order
+        stale, current = [], []
+        for path in paths:
+            (current if self.is_current(path) else stale).append(path)
+        return stale, current
+
+    def record(self, path):
+        mtime, size = self._stat(path)
+        self.files[path] = {"sha256": file_hash(path), "mtime": mtime, "size": size}
+
+    def save(self):
+        files = {p: e for p, e in sorted(self.files.items()) if os.path.exists(p)}
+        self.data[self.name] = {"version": self.version, "files": files}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, indent=2, sort_keys=True)
+            f.write("\n")
+        os.replace(tmp_path, self.path)
+
+def add_force_argument(parser):
+    parser.add_argument(
+        "--force", action="store_true",
+        help=f"ignore {MANIFEST_PATH} and process every file",
+    )
+
+def skip_unchanged(manifest, paths, force=False):
+    if force:
+        return list(paths)
+    stale, current = manifest.partition(paths)
+    if current:
+        print(f"Skipping {len(current)} unchanged files (see {manifest.path}, --force to rebuild):")
+        for path in current:
+            print(f"  {path}")
+    return stale
+
+def record_results(manifest, results):
+    for result in results:
+        if not result.error:
+            manifest.record(result.path)
+    manifest.save()
@@ -1,17 +1,12 @@
-const init = () => {
-    const scripts = document.getElementsByTagName('script');
-    let scriptSrc = "";
-    let absoluteScriptSrc = "";
+// Captured while the script runs: currentScript is null inside event handlers
+const navFootScript = document.currentScript;
 
-    for (let i = 0; i < scripts.length; i++) {
-        if (scripts[i].src && scripts[i].src.includes("nav-foot.js")) {
-            scriptSrc = scripts[i].getAttribute("src");
-            absoluteScriptSrc = scripts[i].src;
-            break;
-        }
-    }
+const init = () => {
+    // The build may give this file a fingerprinted name (nav-foot.<hash>.js)
+    const scriptSrc = navFootScript ? navFootScript.getAttribute("src") : "";
+    const absoluteScriptSrc = navFootScript ? navFootScript.src : "";
 
-    const prefix = scriptSrc ? scriptSrc.replace("centralize-nav-foot/nav-foot.js", "") : "";
+    const prefix = scriptSrc ? scriptSrc.replace(/centralize-nav-foot\/[^\/]*$/, "") : "";
     console.log("nav-foot.js loaded.");
     console.log("Relative Script src:", scriptSrc);
     console.log("Absolute Script src:", absoluteScriptSrc);
@@ -20,12 +15,21 @@ const init = () => {
     // Use absolute paths for fetching to avoid relative path ambiguity
     // We assume navbar.html and footer.html are in the same directory as this script
     const scriptUrl = new URL(absoluteScriptSrc);
-    const timestamp = new Date().getTime();
-    const navUrl = new URL(`navbar.html?v=${timestamp}`, scriptUrl).href;
-    const footUrl = new URL(`footer.html?v=${timestamp}`, scriptUrl).href;
+    // fingerprint_assets.py rewrites these names along with the script's;
+    // only the unhashed copies served from the repo need a cache buster
+    const fingerprinted = /nav-foot\.[0-9a-f]{10}\.js$/.test(scriptSrc);
+    const query = fingerprinted ? "" : `?v=${new Date().getTime()}`;
+    const navUrl = new URL("navbar.html", scriptUrl).href + query;
+    const footUrl = new URL("footer.html", scriptUrl).href + query;
 
     // Helper to load HTML
     const loadHtml = async (elementId, url) => {
+        // Pages built with prerender_partials.py already contain the partial
+        const target = document.getElementById(elementId);
+        if (target && target.hasAttribute("data-prerendered")) {
+            console.log(`#${elementId} is prerendered, skipping fetch.`);
+            return;
+        }
         try {
             console.log(`Fetching ${url} for #${elementId}...`);
             const response = await fetch(url);
@@ -0,0 +1,152 @@
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+
+from compile_sites import COORD_DECIMALS, GEOJSON_NAME, OUT_DIR, write_json
+
+TILES_DIR = os.path.join(OUT_DIR, "tiles")
+TILE_SIZE = 256
+# Cluster radius in screen pixels, the same default as L.markerClusterGroup
+RADIUS = 80
+MIN_ZOOM = 0
+# At MAX_ZOOM and above every site is its own marker
+MAX_ZOOM = 16
+
+def project(lon, lat):
+    # Web Mercator, scaled to the unit square (0,0 top left)
+    sin = math.sin(math.radians(max(min(lat, 85.05112878), -85.05112878)))
+    x = lon / 360 + 0.5
+    y = 0.5 - math.log((1 + sin) / (1 - sin)) / (4 * math.pi)
+    return x, y
+
+def unproject(x, y):
+    lon = (x - 0.5) * 360
+    lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y))))
+    return round(lon, COORD_DECIMALS), round(lat, COORD_DECIMALS)
+
+def load_points(path):
+    with open(path, "r", encoding="utf-8") as f:
+        features = json.load(f)["features"]
+    points = []
+    for feature in features:
+        x, y = project(*feature["geometry"]["coordinates"])
+        points.append({"x": x, "y": y, "count": 1, "id": feature["id"], "name": feature["properties"]["name"]})
+    return points
+
+def cluster_level(items, zoom, radius=RADIUS):
+    """Greedily merge items within radius pixels of each other at zoom.
+
+    Neighbours are looked up in a grid of radius-sized cells, so each item
+    only checks the 3x3 cells around it. A merged cluster sits at the
+    count-weighted centre of its members and expands at zoom + 1.
+    """
+    r = radius / (TILE_SIZE * 2 ** zoom)
+    grid = {}
+    for i, item in enumerate(items):
+        grid.setdefault((int(item["x"] / r), int(item["y"] / r)), []).append(i)
+
+    visited = [False] * len(items)
+    merged = []
+    for i, item in enumerate(items):
+        if visited[i]:
+            continue
+        visited[i] = True
+        cx, cy = int(item["x"] / r), int(item["y"] / r)
+        neighbours = []
+        for gx in (cx - 1, cx, cx + 1):
+            for gy in (cy - 1, cy, cy + 1):
+                for j in grid.get((gx, gy), ()):
+                    other = items[j]
+                    if not visited[j] and (other["x"] - item["x"]) ** 2 + (other["y"] - item["y"]) ** 2 <= r * r:
+                        visited[j] = True
+                        neighbours.append(other)
+        if not neighbours:
+            merged.append(item)
+            continue
+        members = [item] + neighbours
+        count = sum(m["count"] for m in members)
+        merged.append({
+            "x": sum(m["x"] * m["count"] for m in members) / count,
+            "y": sum(m["y"] * m["count"] for m in members) / count,
+            "count": count,
+            "expansion_zoom": zoom + 1,
+        })
+    return merged
+
+def build_levels(points, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM, radius=RADIUS):
+    # {zoom: items}, each level clustered from the one above it
+    levels = {max_zoom: points}
+    for zoom in range(max_zoom - 1, min_zoom - 1, -1):
+        levels[zoom] = cluster_level(levels[zoom + 1], zoom, radius)
+    return levels
+
+def to_feature(item):
+    lon, lat = unproject(item["x"], item["y"])
+    geometry = {"type": "Point", "coordinates": [lon, lat]}
+    if item["count"] > 1:
+        properties = {"cluster": True, "count": item["count"], "expansion_zoom": item["expansion_zoom"]}
+        return {"type": "Feature", "geometry": geometry, "properties": properties}
+    return {"type": "Feature", "id": item["id"], "geometry": geometry, "properties": {"name": item["name"]}}
+
+def tile_items(items, zoom):
+    # {(x, y): items} for the tiles that have anything in them
+    n = 2 ** zoom
+    tiles = {}
+    for item in items:
+        key = (min(int(item["x"] * n), n - 1), min(int(item["y"] * n), n - 1))
+        tiles.setdefault(key, []).append(item)
+    return tiles
+
+def write_tiles(levels, out_dir=TILES_DIR, radius=RADIUS):
+    # Build next to the old tiles and swap, so a half-written set is never served
+    tmp_dir = out_dir + ".tmp"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    written = 0
+    for zoom, items in sorted(levels.items()):
+        for (x, y), tile in sorted(tile_items(items, zoom).items()):
+            tile_dir = os.path.join(tmp_dir, str(zoom), str(x))
+            os.makedirs(tile_dir, exist_ok=True)
+            write_json(
+                os.path.join(tile_dir, f"{y}.json"),
+                {"type": "FeatureCollection", "features": [to_feature(item) for item in tile]},
+            )
+            written += 1
+    write_json(os.path.join(tmp_dir, "meta.json"), {
+        "min_zoom": min(levels),
+        "max_zoom": max(levels),
+        "tile_size": TILE_SIZE,
+        "radius": radius,
+        "count": len(levels[max(levels)]),
+    })
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+    os.replace(tmp_dir, out_dir)
+    return written
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Precompute marker clusters per zoom level into static z/x/y.json tiles.",
+    )
+    parser.add_argument("--sites", default=os.path.join(OUT_DIR, GEOJSON_NAME),
+                        help="site index written by compile_sites.py")
+    parser.add_argument("--out", default=TILES_DIR)
+    parser.add_argument("--min-zoom", type=int, default=MIN_ZOOM)
+    parser.add_argument("--max-zoom", type=int, default=MAX_ZOOM)
+    parser.add_argument("--radius", type=int, default=RADIUS, help="cluster radius in pixels")
+    args = parser.parse_args(argv)
+
+    if not 0 <= args.min_zoom <= args.max_zoom:
+        parser.error("need 0 <= --min-zoom <= --max-zoom")
+
+    points = load_points(args.sites)
+    levels = build_levels(points, args.min_zoom, args.max_zoom, args.radius)
+    written = write_tiles(levels, args.out, args.radius)
+    print(f"Wrote {written} tiles for {len(points)} sites, zoom {args.min_zoom}-{args.max_zoom}, to {args.out}/")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
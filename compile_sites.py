@@ -0,0 +1,145 @@
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+
+from bs4 import BeautifulSoup
+
+CSV_PATH = "sites-popup.csv"
+OUT_DIR = "data"
+GEOJSON_NAME = "sites.geojson"
+SHARDS_DIR = "sites"
+REQUIRED_COLUMNS = ("lat", "lon", "timePeriod", "siteName", "info", "link")
+# ~10 cm, plenty for a site marker
+COORD_DECIMALS = 6
+
+def clean_text(value):
+    # "<h3> Dahshur</h3>" -> "Dahshur"
+    return BeautifulSoup(value, "html.parser").get_text(" ", strip=True)
+
+def link_href(value):
+    a = BeautifulSoup(value, "html.parser").find("a", href=True)
+    return a["href"].strip() if a else ""
+
+def slugify(value):
+    return re.sub(r"[^a-z0-9]+", "-", value.lower()).strip("-")
+
+def site_id(name, link):
+    if link:
+        return slugify(os.path.splitext(os.path.basename(link))[0])
+    return slugify(name)
+
+def load_sites(path=CSV_PATH):
+    """Read and validate the CSV. Returns (sites, errors, warnings).
+
+    Each site is a dict with id, lat, lon, name, period, info and link,
+    all markup stripped except info, which the side panel shows as HTML.
+    """
+    sites, errors, warnings = [], [], []
+    seen_ids = set()
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or [])]
+        if missing:
+            return [], [f"{path}: missing columns {', '.join(missing)}"], []
+
+        for line, row in enumerate(reader, start=2):
+            where = f"{path}:{line}"
+            if None in row:
+                warnings.append(f"{where}: extra fields ignored")
+            try:
+                lat, lon = float(row["lat"]), float(row["lon"])
+            except (TypeError, ValueError):
+                errors.append(f"{where}: bad coordinates {row['lat']!r}, {row['lon']!r}")
+                continue
+            if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+                errors.append(f"{where}: coordinates out of range {lat}, {lon}")
+                continue
+
+            name = clean_text(row["siteName"] or "")
+            if not name:
+                errors.append(f"{where}: empty siteName")
+                continue
+            link = link_href(row["link"] or "")
+            if not link:
+                warnings.append(f"{where}: {name} has no detail link")
+            elif not os.path.exists(link):
+                warnings.append(f"{where}: {name} links to missing page {link}")
+
+            sid = site_id(name, link)
+            base, n = sid, 2
+            while sid in seen_ids:
+                sid = f"{base}-{n}"
+                n += 1
+            seen_ids.add(sid)
+
+            sites.append({
+                "id": sid,
+                "lat": round(lat, COORD_DECIMALS),
+                "lon": round(lon, COORD_DECIMALS),
+                "name": name,
+                "period": clean_text(row["timePeriod"] or ""),
+                "info": (row["info"] or "").strip(),
+                "link": link,
+            })
+    return sites, errors, warnings
+
+def to_feature(site):
+    return {
+        "type": "Feature",
+        "id": site["id"],
+        "geometry": {"type": "Point", "coordinates": [site["lon"], site["lat"]]},
+        "properties": {"name": site["name"]},
+    }
+
+def write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        f.write("\n")
+
+def write_outputs(sites, out_dir=OUT_DIR):
+    shards_dir = os.path.join(out_dir, SHARDS_DIR)
+    os.makedirs(shards_dir, exist_ok=True)
+
+    # Map payload: coordinates and names only
+    write_json(
+        os.path.join(out_dir, GEOJSON_NAME),
+        {"type": "FeatureCollection", "features": [to_feature(site) for site in sites]},
+    )
+
+    # One detail shard per site, fetched when its marker is clicked
+    written = set()
+    for site in sites:
+        name = f"{site['id']}.json"
+        write_json(os.path.join(shards_dir, name), {k: v for k, v in site.items() if k not in ("lat", "lon")})
+        written.add(name)
+    for name in os.listdir(shards_dir):
+        if name.endswith(".json") and name not in written:
+            os.remove(os.path.join(shards_dir, name))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=f"Validate {CSV_PATH} and compile it into {OUT_DIR}/{GEOJSON_NAME} plus per-site detail shards.",
+    )
+    parser.add_argument("--csv", default=CSV_PATH)
+    parser.add_argument("--out", default=OUT_DIR)
+    parser.add_argument("--check", action="store_true", help="only validate, write nothing")
+    args = parser.parse_args(argv)
+
+    sites, errors, warnings = load_sites(args.csv)
+    for message in warnings:
+        print(f"Warning: {message}")
+    for message in errors:
+        print(f"Error: {message}")
+    if errors:
+        return 1
+
+    if not args.check:
+        write_outputs(sites, args.out)
+        print(f"Compiled {len(sites)} sites into {args.out}/")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
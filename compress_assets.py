@@ -0,0 +1,345 @@
+import argparse
+import functools
+import gzip
+import os
+import re
+import sys
+
+from batch import add_jobs_argument, count_errors, run_batch, walk_files
+from fingerprint_assets import DIST_DIR
+
+try:
+    import brotli
+except ImportError: # Brotli is optional, without it only .gz siblings are written
+    brotli = None
+
+# Content-Encoding -> suffix of the precompressed sibling, in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+MINIFY_EXTENSIONS = ('.html', '.css', '.js')
+COMPRESS_EXTENSIONS = ('.html', '.css', '.js', '.json', '.csv', '.svg', '.xml', '.txt', '.map', '.kml', '.geojson')
+# Below this a compressed response saves less than its headers cost
+MIN_COMPRESS_SIZE = 256
+# Lines this long on average mean the file is minified already (leaflet.js, bootstrap.min.js)
+MINIFIED_LINE_LENGTH = 200
+
+# HTML
+
+HTML_TOKEN_RE = re.compile(
+    r'<!--.*?-->'
+    r'|<(?P<raw>script|style|pre|textarea)\b(?:"[^"]*"|\'[^\']*\'|[^\'">])*>'
+    r'|<(?:"[^"]*"|\'[^\']*\'|[^\'">])*>',
+    re.DOTALL | re.IGNORECASE,
+)
+TAG_PART_RE = re.compile(r'"[^"]*"|\'[^\']*\'|\s+')
+TYPE_ATTR_RE = re.compile(r'\btype\s*=\s*["\']?([^"\'\s>]+)', re.IGNORECASE)
+JS_TYPES = {"text/javascript", "application/javascript", "module"}
+WHITESPACE_RE = re.compile(r'\s+')
+
+def collapse_whitespace(text):
+    # A run with a line break becomes one line break, so minified pages still diff line by line
+    return WHITESPACE_RE.sub(lambda m: "\n" if "\n" in m.group() else " ", text)
+
+def minify_tag(tag):
+    # Whitespace between attributes only, quoted values stay as they are
+    tag = TAG_PART_RE.sub(lambda m: m.group() if m.group()[0] in "\"'" else " ", tag)
+    return re.sub(r'\s+(/?>)$', r'\1', tag)
+
+def minify_raw(name, tag, content):
+    if name == "style":
+        return minify_css(content)
+    if name == "script":
+        match = TYPE_ATTR_RE.search(tag)
+        if match is None or match.group(1).lower() in JS_TYPES:
+            return minify_js(content)
+    # pre/textarea text, JSON and templates in script tags
+    return content
+
+def minify_html(text):
+    """Drop comments and collapse whitespace, leaving the rendered page the same.
+
+    IE conditional comments are kept. Inline scripts and styles are
+    minified like .js and .css files, <pre> and <textarea> are left alone.
+    """
+    out = []
+    # Text on both sides of a dropped comment collapses as one run
+    pending = []
+    pos = 0
+    while True:
+        match = HTML_TOKEN_RE.search(text, pos)
+        if match is None:
+            pending.append(text[pos:])
+            out.append(collapse_whitespace("".join(pending)))
+            break
+        pending.append(text[pos:match.start()])
+        token = match.group()
+        pos = match.end()
+        if token.startswith("<!--") and not token.startswith("<!--[if"):
+            continue
+        out.append(collapse_whitespace("".join(pending)))
+        pending = []
+        if token.startswith("<!--"):
+            out.append(token)
+            continue
+        out.append(minify_tag(token))
+        name = match.group("raw")
+        if name:
+            end = re.compile(rf'</{name}\s*>', re.IGNORECASE).search(text, pos)
+            content_end = end.start() if end else len(text)
+            out.append(minify_raw(name.lower(), token, text[pos:content_end]))
+            pos = content_end
+    return "".join(out).strip() + "\n"
+
+# CSS
+
+CSS_TOKEN_RE = re.compile(r'/\*.*?\*/|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|\\.|\s+|[^"\'/\\\s{};,>:]+|.', re.DOTALL)
+# No space is needed on either side of these. Not ":" (a descendant ":hover"
+# selector needs the space before it) and not "+" or "-" (calc() needs them).
+CSS_PUNCTUATION = set("{};,>")
+
+def minify_css(text):
+    tokens = []
+    for token in CSS_TOKEN_RE.findall(text):
+        if token.startswith("/*"):
+            if token.startswith("/*!"):
+                tokens.append(token)
+            elif tokens and tokens[-1] != " ":
+                tokens.append(" ") # a/**/b is still two words
+            continue
+        if token.isspace():
+            if tokens and tokens[-1] != " ":
+                tokens.append(" ")
+            continue
+        tokens.append(token)
+
+    out = []
+    for i, token in enumerate(tokens):
+        if token == " ":
+            before = out[-1][-1] if out else ""
+            after = tokens[i + 1][0] if i + 1 < len(tokens) else ""
+            if not before or not after or before in CSS_PUNCTUATION or before == ":" or after in CSS_PUNCTUATION:
+                continue
+        elif token == "}" and out and out[-1] == ";":
+            out.pop()
+        out.append(token)
+    return "".join(out)
+
+# JavaScript
+
+JS_WORD_RE = re.compile(r'[\w$\\]')
+# After one of these keywords a "/" starts a regular expression, not a division
+JS_REGEX_KEYWORDS = {
+    "return", "typeof", "instanceof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw",
+    "yield", "await",
+}
+JS_REGEX_AFTER = set("(,=:[!&|?{};+-*%<>~^")
+# A line break is dropped only where automatic semicolon insertion cannot depend on it
+JS_JOIN_AFTER = set("{;,([")
+JS_JOIN_BEFORE = set(")]},;")
+
+def is_word_char(char):
+    return bool(char) and (bool(JS_WORD_RE.match(char)) or ord(char) > 127)
+
+def _skip_string(text, i, quote):
+    # Index just past the string literal opening at i
+    i += 1
+    while i < len(text) and text[i] != quote:
+        i += 2 if text[i] == "\\" else 1
+    return i + 1
+
+def _skip_regex(text, i):
+    i += 1
+    in_class = False
+    while i < len(text) and text[i] != "\n":
+        char = text[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == "[":
+            in_class = True
+        elif char == "]":
+            in_class = False
+        elif char == "/" and not in_class:
+            i += 1
+            break
+        i += 1
+    while i < len(text) and is_word_char(text[i]):
+        i += 1 # flags
+    return i
+
+def _starts_regex(out):
+    # Whether a "/" following the code minified so far starts a regular expression
+    code = "".join(out[-3:]).rstrip()
+    if not code:
+        return True
+    if code[-1] in JS_REGEX_AFTER:
+        return True
+    word = re.search(r'[\w$]+$', code)
+    return bool(word) and word.group() in JS_REGEX_KEYWORDS and not re.search(r'[.\w$]$', code[:word.start()])
+
+def minify_js(text):
+    """Strip comments and indentation, keeping strings, templates and regexes as written.
+
+    Not a full minifier: names are left alone and line breaks are only
+    dropped after or before punctuation where no semicolon could have been
+    inserted, so the code behaves exactly as before. /*! comments (licenses)
+    are kept.
+    """
+    out = []
+    # Brace depth inside each ${...} of the template literals we are in
+    templates = []
+    pending = None # whitespace seen since the last token: None, " " or "\n"
+    i = 0
+    n = len(text)
+
+    def emit(token):
+        nonlocal pending
+        if pending and out:
+            before, after = out[-1][-1], token[0]
+            if pending == "\n" and not (before in JS_JOIN_AFTER or after in JS_JOIN_BEFORE):
+                out.append("\n")
+            elif (is_word_char(before) and is_word_char(after)) or (before in "+-" and after == before) \
+                    or (before == "/" and after == "/"):
+                out.append(" ")
+        pending = None
+        out.append(token)
+
+    while i < n:
+        char = text[i]
+        if char.isspace():
+            j = i
+            while j < n and text[j].isspace():
+                j += 1
+            if pending != "\n":
+                pending = "\n" if "\n" in text[i:j] else " "
+            i = j
+        elif text.startswith("//", i):
+            j = text.find("\n", i)
+            i = n if j < 0 else j
+        elif text.startswith("/*", i):
+            j = text.find("*/", i + 2)
+            j = n if j < 0 else j + 2
+            if text.startswith("/*!", i):
+                emit(text[i:j])
+            elif pending != "\n":
+                pending = "\n" if "\n" in text[i:j] else " "
+            i = j
+        elif char in "'\"":
+            j = _skip_string(text, i, char)
+            emit(text[i:j])
+            i = j
+        elif char == "`" or (char == "}" and templates and templates[-1] == 0):
+            # Template text up to the closing backtick or the next ${
+            if char == "}":
+                templates.pop()
+            j = i + 1
+            while j < n and text[j] != "`" and not text.startswith("${", j):
+                j += 2 if text[j] == "\\" else 1
+            if text.startswith("${", j):
+                templates.append(0)
+                j += 2
+            else:
+                j += 1
+            emit(text[i:j])
+            i = j
+        elif char == "/" and _starts_regex(out):
+            j = _skip_regex(text, i)
+            emit(text[i:j])
+            i = j
+        else:
+            if templates and char in "{}":
+                templates[-1] += 1 if char == "{" else -1
+            j = i + 1
+            if is_word_char(char):
+                while j < n and is_word_char(text[j]):
+                    j += 1
+            emit(text[i:j])
+            i = j
+    return "".join(out)
+
+MINIFIERS = {".html": minify_html, ".css": minify_css, ".js": minify_js}
+
+def is_minified(text):
+    return len(text) / (text.count("\n") + 1) > MINIFIED_LINE_LENGTH
+
+def minify_file(path):
+    # Returns (bytes before, bytes after)
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    ext = os.path.splitext(path)[1].lower()
+    if ext != ".html" and (".min." in os.path.basename(path) or is_minified(text)):
+        return len(text.encode('utf-8')), len(text.encode('utf-8'))
+    minified = MINIFIERS[ext](text)
+    if minified != text:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(minified)
+    return len(text.encode('utf-8')), len(minified.encode('utf-8'))
+
+def compress(data, encoding):
+    if encoding == "gzip":
+        # mtime=0 so the same input always gives the same .gz
+        return gzip.compress(data, compresslevel=9, mtime=0)
+    return brotli.compress(data, quality=11)
+
+def available_encodings():
+    return [(encoding, suffix) for encoding, suffix in ENCODINGS if encoding != "br" or brotli is not None]
+
+def precompress_file(path):
+    """Write the .gz (and .br) siblings of path that come out smaller than it.
+
+    A sibling that would not be smaller is removed, so the server never
+    prefers a stale or useless one. Returns {encoding: size}.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    sizes = {}
+    for encoding, suffix in available_encodings():
+        compressed = compress(data, encoding) if len(data) >= MIN_COMPRESS_SIZE else None
+        if compressed is None or len(compressed) >= len(data):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+            continue
+        with open(path + suffix, 'wb') as f:
+            f.write(compressed)
+        sizes[encoding] = len(compressed)
+    return sizes
+
+def process_file(path, minify=True):
+    before = after = os.path.getsize(path)
+    if minify and path.lower().endswith(MINIFY_EXTENSIONS):
+        before, after = minify_file(path)
+    return before, after, precompress_file(path)
+
+def is_hidden(path):
+    return os.path.basename(path).startswith(".")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=f"Minify the HTML/CSS/JS of a built site (python fingerprint_assets.py writes {DIST_DIR}/) "
+                    "and write precompressed .gz/.br siblings for serve.py.",
+    )
+    add_jobs_argument(parser)
+    parser.add_argument("directory", nargs="?", default=DIST_DIR)
+    parser.add_argument("--no-minify", dest="minify", action="store_false", help="only precompress")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        print(f"{args.directory}/ does not exist, run python fingerprint_assets.py first")
+        return 1
+    if brotli is None:
+        print("brotli is not installed, writing .gz files only")
+
+    paths = list(walk_files(args.directory, COMPRESS_EXTENSIONS, skip=is_hidden))
+    process = functools.partial(process_file, minify=args.minify)
+    results = run_batch(process, paths, jobs=args.jobs)
+
+    done = [r.result for r in results if r.result]
+    before = sum(b for b, _, _ in done)
+    after = sum(a for _, a, _ in done)
+    print(f"Minified {before / 1024:.0f} KiB to {after / 1024:.0f} KiB in {len(done)} files")
+    for encoding, _ in available_encodings():
+        compressed = [sizes[encoding] for _, _, sizes in done if encoding in sizes]
+        print(f"  {encoding}: {len(compressed)} files, {sum(compressed) / 1024:.0f} KiB")
+    return 1 if count_errors(results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
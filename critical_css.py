@@ -0,0 +1,311 @@
+import argparse
+import functools
+import json
+import os
+import re
+import sys
+
+from bs4 import BeautifulSoup
+
+from batch import add_jobs_argument, count_errors, run_batch, walk_files
+from compress_assets import minify_css
+from fingerprint_assets import DIST_DIR, MANIFEST_NAME
+from link_index import resolve_reference
+from redesign_sites import ROOT_DIR
+
+# The stylesheet redesign_sites.TEMPLATE links, under its fingerprinted name once there is a manifest
+STYLESHEET = "css/output.css"
+# What shows before any scrolling on a page rendered from redesign_sites.TEMPLATE:
+# the navbar, the hero header and the Quick Facts card next to the content
+CRITICAL_SELECTORS = ("#central-nav", "header", ".lg\\:col-span-4 > div")
+# Beside the Quick Facts card on wide screens: the content card's box, not what is in it
+CRITICAL_BOXES = (".lg\\:col-span-8 > div",)
+CRITICAL_ATTR = "data-critical"
+# Rules inside these at-rules apply to elements, so they are filtered like top-level rules
+NESTED_AT_RULES = {"media", "supports", "layer", "container"}
+
+LINK_RE = re.compile(r'<link\b[^>]*>', re.IGNORECASE)
+ATTR_RE = re.compile(r'''\b(rel|href)\s*=\s*(["'])([^"']*)\2''', re.IGNORECASE)
+CSS_COMMENT_RE = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/', re.DOTALL)
+
+# Selectors
+
+ESCAPE_RE = re.compile(r'\\(.)')
+IDENT = r'(?:\\.|[\w-])+'
+CLASS_RE = re.compile(r'\.(' + IDENT + ')')
+ID_RE = re.compile(r'#(' + IDENT + ')')
+TAG_RE = re.compile(r'(?:^|(?<=[\s>+~(]))([a-zA-Z][\w-]*)')
+ATTRIBUTE_SELECTOR_RE = re.compile(r'\[[^\]]*\]')
+PSEUDO_RE = re.compile(r'::?[\w-]+')
+# Nothing the first paint shows: states that need the user, and dialogs' backdrops
+DEFERRED_PSEUDO_RE = re.compile(r':(?:hover|focus|focus-visible|focus-within|active)\b|::backdrop\b')
+
+def _strip_functions(selector):
+    # :not(...) needs nothing on the page, :is(a, b) any one of its list, so
+    # both drop their argument. A single-selector :is/:where(x) still needs x.
+    out, i = [], 0
+    while i < len(selector):
+        match = re.compile(r'::?([\w-]+)\(').match(selector, i)
+        if match is None:
+            out.append(selector[i])
+            i += 1
+            continue
+        depth, j = 1, match.end()
+        while j < len(selector) and depth:
+            depth += {"(": 1, ")": -1}.get(selector[j], 0)
+            j += 1
+        argument = selector[match.end():j - 1]
+        if match.group(1) in ("is", "where", "matches") and "," not in argument:
+            out.append(" " + _strip_functions(argument) + " ")
+        else:
+            out.append(" ")
+        i = j
+    return "".join(out)
+
+def selector_requirements(selector):
+    """(tags, classes, ids) an element or its ancestors must have for selector to match anything.
+
+    Pseudo-classes, attribute selectors and :not() are ignored, so the
+    result only ever asks for less than the selector does.
+    """
+    selector = _strip_functions(ATTRIBUTE_SELECTOR_RE.sub(" ", selector))
+    unescape = functools.partial(ESCAPE_RE.sub, r'\1')
+    classes = {unescape(name) for name in CLASS_RE.findall(selector)}
+    ids = {unescape(name) for name in ID_RE.findall(selector)}
+    rest = PSEUDO_RE.sub(" ", ID_RE.sub(" ", CLASS_RE.sub(" ", selector)))
+    tags = {tag.lower() for tag in TAG_RE.findall(rest)}
+    return tags, classes, ids
+
+# Stylesheet
+
+def strip_comments(css):
+    return CSS_COMMENT_RE.sub(lambda m: m.group() if m.group()[0] in "\"'" else " ", css)
+
+def _skip_string(css, i):
+    return CSS_COMMENT_RE.match(css, i).end()
+
+def _prelude_end(css, start):
+    # Index of the "{" or ";" ending the selector or at-rule prelude at start,
+    # skipping strings and parentheses (url(...;...) has semicolons in it)
+    depth, i = 0, start
+    while i < len(css):
+        char = css[i]
+        if char in "\"'":
+            i = _skip_string(css, i)
+            continue
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char in "{;" and depth <= 0:
+            return i
+        i += 1
+    return len(css)
+
+def _block_end(css, start):
+    # Index just past the "}" closing the block whose "{" is at start
+    depth, i = 0, start
+    while i < len(css):
+        char = css[i]
+        if char in "\"'":
+            i = _skip_string(css, i)
+            continue
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return len(css)
+
+def parse_stylesheet(css):
+    """Top-level rules of css as a list of nodes.
+
+    ("rule", selectors, declarations), ("at", name, prelude, children) for
+    @media and the other NESTED_AT_RULES, ("block", name, text) for other
+    at-rules with a block (@font-face, @keyframes) and ("statement", name,
+    text) for @import and @charset.
+    """
+    css = strip_comments(css)
+    nodes, i = [], 0
+    while i < len(css):
+        if css[i].isspace() or css[i] == ";":
+            i += 1
+            continue
+        prelude_end = _prelude_end(css, i)
+        prelude = css[i:prelude_end].strip()
+        if prelude_end == len(css) or css[prelude_end] == ";":
+            if prelude.startswith("@"):
+                nodes.append(("statement", re.match(r'@([\w-]*)', prelude).group(1).lower(), prelude + ";"))
+            i = prelude_end + 1
+            continue
+        end = _block_end(css, prelude_end)
+        body = css[prelude_end + 1:end - 1]
+        if prelude.startswith("@"):
+            name = re.match(r'@([\w-]*)', prelude).group(1).lower()
+            if name in NESTED_AT_RULES:
+                nodes.append(("at", name, prelude, parse_stylesheet(body)))
+            else:
+                nodes.append(("block", name, css[i:end].strip()))
+        else:
+            nodes.append(("rule", [selector.strip() for selector in split_selectors(prelude)], body.strip()))
+        i = end
+    return nodes
+
+def split_selectors(text):
+    # Commas inside :is(...) or attribute values do not separate selectors
+    parts, depth, start = [], 0, 0
+    for i, char in enumerate(text):
+        if char in "([":
+            depth += 1
+        elif char in ")]":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [part for part in parts if part.strip()]
+
+def critical_rules(nodes, tags, classes, ids):
+    """CSS text of the rules in nodes that can apply to an element with the given tokens.
+
+    A rule keeps only the selectors of its list that can match, so the
+    cascade between the kept rules stays what it was. Hover and focus
+    states, @import, @font-face and @keyframes are left to the full
+    stylesheet.
+    """
+    out = []
+    for node in nodes:
+        if node[0] == "rule":
+            _, selectors, declarations = node
+            kept = []
+            for selector in selectors:
+                if DEFERRED_PSEUDO_RE.search(selector):
+                    continue
+                need_tags, need_classes, need_ids = selector_requirements(selector)
+                if need_tags <= tags and need_classes <= classes and need_ids <= ids:
+                    kept.append(selector)
+            if kept:
+                out.append(f"{','.join(kept)}{{{declarations}}}")
+        elif node[0] == "at":
+            inner = critical_rules(node[3], tags, classes, ids)
+            if inner:
+                out.append(f"{node[2]}{{{inner}}}")
+    return "".join(out)
+
+# Pages
+
+def critical_elements(soup):
+    """The elements above the fold and everything their boxes depend on.
+
+    Besides the CRITICAL_SELECTORS elements with their contents and the
+    CRITICAL_BOXES elements without, that is every ancestor and the
+    ancestors' own children (but not what is in those), since a grid or
+    flex item's place depends on its siblings.
+    """
+    elements = set()
+    for selector in CRITICAL_SELECTORS + CRITICAL_BOXES:
+        for element in soup.select(selector):
+            elements.add(element)
+            if selector in CRITICAL_SELECTORS:
+                elements.update(element.find_all(True))
+            for parent in element.parents:
+                if parent.name is None or parent.name == "[document]":
+                    continue
+                elements.add(parent)
+                elements.update(parent.find_all(True, recursive=False))
+    return elements
+
+def page_tokens(soup):
+    tags, classes, ids = {"html", "body"}, set(), set()
+    for element in critical_elements(soup):
+        tags.add(element.name.lower())
+        classes.update(element.get("class") or ())
+        if element.get("id"):
+            ids.add(element["id"])
+    return tags, classes, ids
+
+def stylesheet_path(dist):
+    # Root-relative path of the Tailwind stylesheet in dist
+    manifest_path = os.path.join(dist, MANIFEST_NAME)
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get(STYLESHEET, STYLESHEET)
+    return STYLESHEET
+
+def find_stylesheet_link(text, page, stylesheet):
+    # The <link rel="stylesheet"> tag in text that loads stylesheet, or None
+    for match in LINK_RE.finditer(text):
+        attrs = {name.lower(): value for name, _, value in ATTR_RE.findall(match.group())}
+        if attrs.get("rel", "").lower() == "stylesheet" and resolve_reference(page, attrs.get("href", "")) == stylesheet:
+            return match, attrs["href"]
+    return None
+
+def async_stylesheet(href):
+    # Applied once it has loaded, without blocking the first paint
+    return (f'<link rel="stylesheet" href="{href}" media="print" onload="this.media=\'all\'">\n'
+            f'    <noscript><link rel="stylesheet" href="{href}"></noscript>')
+
+def inline_critical(text, page, stylesheet, nodes):
+    """text with the critical part of stylesheet inlined and the rest loaded asynchronously.
+
+    Returns None for pages that are not site pages, already have their
+    critical CSS or do not link the stylesheet.
+    """
+    if CRITICAL_ATTR in text:
+        return None
+    found = find_stylesheet_link(text, page, stylesheet)
+    if found is None:
+        return None
+    soup = BeautifulSoup(text, "html.parser")
+    if soup.find("header") is None:
+        return None
+    css = minify_css(critical_rules(nodes, *page_tokens(soup)))
+    link, href = found
+    replacement = f'<style {CRITICAL_ATTR}>{css}</style>\n    {async_stylesheet(href)}'
+    return text[:link.start()] + replacement + text[link.end():]
+
+def process_file(path, dist, stylesheet, nodes):
+    # Returns the size of the inlined CSS, or None if the page was left alone
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    page = os.path.relpath(path, dist).replace(os.sep, '/')
+    result = inline_critical(text, page, stylesheet, nodes)
+    if result is None:
+        return None
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(result)
+    return len(result.encode('utf-8')) - len(text.encode('utf-8'))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=f"Inline the above-the-fold part of {STYLESHEET} into the site pages of a built site "
+                    f"(python fingerprint_assets.py writes {DIST_DIR}/) and load the rest asynchronously.",
+    )
+    add_jobs_argument(parser)
+    parser.add_argument("directory", nargs="?", default=DIST_DIR)
+    args = parser.parse_args(argv)
+
+    stylesheet = stylesheet_path(args.directory)
+    css_path = os.path.join(args.directory, stylesheet)
+    if not os.path.isfile(css_path):
+        print(f"{css_path} does not exist, run python fingerprint_assets.py first")
+        return 1
+    with open(css_path, 'r', encoding='utf-8') as f:
+        nodes = parse_stylesheet(f.read())
+
+    paths = list(walk_files(os.path.join(args.directory, ROOT_DIR), ".html"))
+    process = functools.partial(process_file, dist=args.directory, stylesheet=stylesheet, nodes=nodes)
+    results = run_batch(process, paths, jobs=args.jobs)
+    inlined = [r.result for r in results if r.result is not None]
+    if inlined:
+        print(f"Inlined critical CSS into {len(inlined)} of {len(paths)} pages "
+              f"({sum(inlined) / len(inlined) / 1024:.1f} KiB per page on average, "
+              f"{os.path.getsize(css_path) / 1024:.0f} KiB stylesheet now loaded asynchronously)")
+    else:
+        print(f"No pages in {args.directory}/{ROOT_DIR} link {stylesheet}")
+    return 1 if count_errors(results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
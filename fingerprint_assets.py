@@ -0,0 +1,146 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import posixpath
+import shutil
+import sys
+
+from link_index import extract_references, iter_indexed_files, resolve_reference
+
+DIST_DIR = "dist"
+MANIFEST_NAME = "asset-manifest.json"
+# Root-relative globs of the assets that get content-hashed names
+ASSET_GLOBS = ("css/output.css", "js/*.js", "centralize-nav-foot/*.js", "centralize-nav-foot/*.html")
+HASH_LENGTH = 10
+
+# Not part of the published site
+SKIP_DIRS = {".git", ".github", ".pytest_cache", "__pycache__", "node_modules", "tests", "benchmarks", "src", "content", DIST_DIR}
+SKIP_EXTENSIONS = ('.py', '.pyc', '.pid', '.jsonl', '.ini')
+SKIP_FILES = {"requirements.txt", "package.json", "package-lock.json", "tailwind.config.js"}
+
+def copy_site(src, dist):
+    if os.path.exists(dist):
+        shutil.rmtree(dist)
+    for dirpath, dirs, files in os.walk(src):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS and not d.startswith('.'))
+        rel_dir = os.path.relpath(dirpath, src)
+        os.makedirs(os.path.join(dist, rel_dir), exist_ok=True)
+        for file in files:
+            if file.startswith('.') or file.endswith(SKIP_EXTENSIONS):
+                continue
+            if rel_dir == "." and file in SKIP_FILES:
+                continue
+            shutil.copy2(os.path.join(dirpath, file), os.path.join(dist, rel_dir, file))
+
+def fingerprinted_name(path, content):
+    # css/output.css -> css/output.<hash>.css
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    stem, ext = posixpath.splitext(path)
+    return f"{stem}.{digest}{ext}"
+
+def find_assets(root):
+    assets = set()
+    for pattern in ASSET_GLOBS:
+        for path in glob.glob(os.path.join(root, pattern)):
+            if os.path.isfile(path):
+                assets.add(os.path.relpath(path, root).replace(os.sep, '/'))
+    return sorted(assets)
+
+def asset_references(source, content, assets):
+    """[(offset, raw, asset)] for the references in content to one of assets.
+
+    Scripts usually name paths relative to the page that loads them from
+    the root, but nav-foot.js resolves its partials against its own URL,
+    so for scripts a reference relative to the script's directory counts
+    as well.
+    """
+    found = []
+    for target, offset, raw in extract_references(source, content):
+        if target not in assets and source.endswith('.js'):
+            target = resolve_reference(posixpath.join(posixpath.dirname(source), 'x.html'), raw)
+        if target in assets:
+            found.append((offset, raw, target))
+    return found
+
+def rewrite(content, refs, manifest):
+    # Swap each reference's file name for its fingerprinted one, dropping ?v= style queries
+    parts = []
+    pos = 0
+    for offset, raw, target in sorted(refs):
+        path = raw.split('#', 1)[0].split('?', 1)[0]
+        new_name = posixpath.basename(manifest[target])
+        parts.append(content[pos:offset])
+        parts.append(posixpath.join(posixpath.dirname(path), new_name) if '/' in path else new_name)
+        pos = offset + len(raw)
+    parts.append(content[pos:])
+    return ''.join(parts)
+
+def read_text(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def write_text(path, content):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+
+def fingerprint(dist):
+    """Give every asset in dist a content-hashed copy and point all references at it.
+
+    An asset that references other assets (nav-foot.js names its partials)
+    is hashed after its references are rewritten, so a changed partial
+    changes the script's name too. Returns the {path: fingerprinted path}
+    manifest.
+    """
+    assets = find_assets(dist)
+    pending = {}
+    for path in assets:
+        content = read_text(os.path.join(dist, path))
+        pending[path] = (content, asset_references(path, content, set(assets)))
+
+    manifest = {}
+    while pending:
+        ready = [path for path, (_, refs) in pending.items() if all(t in manifest for _, _, t in refs)]
+        if not ready:
+            raise ValueError(f"Assets reference each other in a cycle: {', '.join(sorted(pending))}")
+        for path in ready:
+            content, refs = pending.pop(path)
+            content = rewrite(content, refs, manifest)
+            manifest[path] = fingerprinted_name(path, content.encode('utf-8'))
+            write_text(os.path.join(dist, manifest[path]), content)
+
+    # Everything else that links to an asset
+    for path in iter_indexed_files(dist):
+        if path in manifest or path in manifest.values():
+            continue
+        full_path = os.path.join(dist, path)
+        try:
+            content = read_text(full_path)
+        except UnicodeDecodeError:
+            continue
+        refs = asset_references(path, content, manifest)
+        if refs:
+            write_text(full_path, rewrite(content, refs, manifest))
+
+    with open(os.path.join(dist, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+    return manifest
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=f"Copy the site into {DIST_DIR}/ with content-hashed CSS/JS/partial file names.",
+    )
+    parser.add_argument("--out", default=DIST_DIR)
+    args = parser.parse_args(argv)
+
+    copy_site(".", args.out)
+    manifest = fingerprint(args.out)
+    for path, hashed in sorted(manifest.items()):
+        print(f"{path} -> {hashed}")
+    print(f"Fingerprinted {len(manifest)} assets into {args.out}/ (see {MANIFEST_NAME})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
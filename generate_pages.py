@@ -0,0 +1,189 @@
+import argparse
+import functools
+import json
+import os
+import re
+import string
+import sys
+
+from batch import add_jobs_argument, count_errors, run_batch, walk_files, write_atomic
+from compile_sites import CSV_PATH, load_sites
+from prerender_partials import PLACEHOLDER_RE, load_partials, prerender
+from redesign_sites import ROOT_DIR, TEMPLATE, page_depth
+
+# content/pages.json holds each page's metadata, content/<page path> its #detail fragment
+CONTENT_DIR = "content"
+RECORDS_NAME = "pages.json"
+FIELDS = ("title", "period", "researcher")
+
+class CompiledTemplate:
+    """A str.format template split into its literal text and fields once.
+
+    render() joins the pieces, which gives the same string as
+    template.format(**values) without parsing the template again for
+    every page. match() runs the template backwards and recovers the
+    values from a page it rendered.
+    """
+
+    def __init__(self, template):
+        self.parts = []
+        for literal, field, spec, conversion in string.Formatter().parse(template):
+            if spec or conversion:
+                raise ValueError(f"Unsupported format in template field {field!r}")
+            self.parts.append((literal, field))
+        self.fields = list(dict.fromkeys(field for _, field in self.parts if field is not None))
+        self._regex = None
+
+    def render(self, values):
+        pieces = []
+        for literal, field in self.parts:
+            pieces.append(literal)
+            if field is not None:
+                pieces.append(str(values[field]))
+        return ''.join(pieces)
+
+    def match(self, text):
+        # Returns the field values, or None if text is not an output of this template
+        if self._regex is None:
+            pattern, seen = [], set()
+            for literal, field in self.parts:
+                pattern.append(re.escape(literal))
+                if field is not None:
+                    # A field used twice has to have the same value both times
+                    pattern.append(f'(?P={field})' if field in seen else f'(?P<{field}>.*?)')
+                    seen.add(field)
+            self._regex = re.compile(''.join(pattern) + r'\Z', re.DOTALL)
+        match = self._regex.match(text)
+        return match.groupdict() if match else None
+
+# Template text -> CompiledTemplate, so each template is compiled once per process
+_compiled = {}
+
+def compile_template(template=TEMPLATE):
+    compiled = _compiled.get(template)
+    if compiled is None:
+        compiled = _compiled[template] = CompiledTemplate(template)
+    return compiled
+
+def fragment_path(path, content_dir=CONTENT_DIR):
+    return os.path.join(content_dir, os.path.normpath(path))
+
+def load_records(content_dir=CONTENT_DIR, csv_path=CSV_PATH):
+    """Page path -> title/period/researcher for every page that has a content fragment.
+
+    The metadata comes from pages.json; a page sites-popup.csv links to
+    takes its title from the CSV row if pages.json leaves it out, so a new
+    site only needs a CSV row and a fragment. The CSV's timePeriod always
+    wins, a period in pages.json only stands in for a page without one.
+    """
+    records = {}
+    if os.path.exists(csv_path):
+        sites, _, _ = load_sites(csv_path)
+        for site in sites:
+            if site["link"]:
+                records[os.path.normpath(site["link"])] = {"title": site["name"], "period": site["period"]}
+    records_path = os.path.join(content_dir, RECORDS_NAME)
+    if os.path.exists(records_path):
+        with open(records_path, 'r', encoding='utf-8') as f:
+            for path, values in json.load(f).items():
+                record = records.setdefault(os.path.normpath(path), {})
+                period = record.get("period")
+                record.update(values)
+                if period:
+                    record["period"] = period
+    return {
+        path: {field: values.get(field, "") for field in FIELDS}
+        for path, values in sorted(records.items())
+        if os.path.exists(fragment_path(path, content_dir))
+    }
+
+def render(path, values, content, partials, template=TEMPLATE):
+    # Values go in as they are, like redesign_sites.render_page puts in the text it scraped
+    page = compile_template(template).render(dict(values, content=content, depth=page_depth(path)))
+    return prerender(page, path, partials)
+
+def generate_page(path, values, partials, content_dir=CONTENT_DIR):
+    with open(fragment_path(path, content_dir), 'r', encoding='utf-8') as f:
+        content = f.read()
+    page = render(path, values, content, partials)
+
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            if f.read() == page:
+                return False
+    else:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    write_atomic(path, page)
+    print(f"Generated {path}")
+    return True
+
+def strip_prerendered(text):
+    # Back to the empty placeholders TEMPLATE has
+    return PLACEHOLDER_RE.sub(lambda m: f'<div id="{m.group("id")}"></div>', text)
+
+def extract_record(text, path, template=TEMPLATE):
+    """(metadata, content fragment) of a page rendered from template, or None.
+
+    Pages edited by hand since they were rendered no longer match and
+    have to be fixed or left out.
+    """
+    values = compile_template(template).match(strip_prerendered(text))
+    if values is None or values["depth"] != page_depth(path):
+        return None
+    return {field: values[field] for field in FIELDS}, values["content"]
+
+def extract_all(content_dir=CONTENT_DIR):
+    # One-off move of the rendered site pages into content/, returns the number of pages left out
+    metadata, skipped = {}, 0
+    for path in walk_files(ROOT_DIR, ".html"):
+        if "aa-template" in os.path.dirname(path).lower():
+            continue
+        with open(path, 'r', encoding='utf-8') as f:
+            record = extract_record(f.read(), path)
+        if record is None:
+            print(f"Skipping {path}: does not match redesign_sites.TEMPLATE")
+            skipped += 1
+            continue
+        path = os.path.normpath(path)
+        metadata[path.replace(os.sep, "/")], content = record
+        target = fragment_path(path, content_dir)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        write_atomic(target, content)
+
+    with open(os.path.join(content_dir, RECORDS_NAME), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+    print(f"Extracted {len(metadata)} pages into {content_dir}/")
+    return skipped
+
+def _generate(path, records, partials):
+    return generate_page(path, records[path], partials)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=f"Render site pages from {CONTENT_DIR}/{RECORDS_NAME}, {CSV_PATH} and content fragments.",
+    )
+    add_jobs_argument(parser)
+    parser.add_argument("--extract", action="store_true",
+                        help=f"write {CONTENT_DIR}/ from the current pages instead (once, to move pages over)")
+    parser.add_argument("paths", nargs="*", help="pages to generate (default: every page with a record)")
+    args = parser.parse_args(argv)
+
+    if args.extract:
+        return 1 if extract_all() else 0
+
+    records = load_records()
+    paths = [os.path.normpath(path) for path in args.paths] or list(records)
+    missing = [path for path in paths if path not in records]
+    for path in missing:
+        print(f"No record or content fragment for {path}")
+
+    partials = load_partials()
+    process = functools.partial(_generate, records=records, partials=partials)
+    results = run_batch(process, [path for path in paths if path in records], jobs=args.jobs)
+    written = sum(1 for result in results if result.result)
+    print(f"Generated {written} of {len(results)} pages")
+    return 1 if missing or count_errors(results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -37,28 +37,23 @@ document.addEventListener('DOMContentLoaded', () => {
         closePanelBtn.addEventListener('click', closePanel);
     }
 
-    const showSidePanel = (props) => {
-        console.log("Showing side panel for:", props.siteName);
+    const showSidePanel = (site) => {
+        console.log("Showing side panel for:", site.name);
         if (!sidePanel) {
             console.error("Side panel element not found!");
             return;
         }
-        // Parse title from HTML (props.siteName is <h3>Name</h3>)
-        const tempDiv = document.createElement('div');
-        tempDiv.innerHTML = props.siteName;
-        panelTitle.textContent = tempDiv.textContent || tempDiv.innerText || "Site Details";
+        panelTitle.textContent = site.name || "Site Details";
 
-        // Info
+        // Info (site.info may hold inline markup from the CSV)
         panelInfo.innerHTML = `
-            <div class="mb-4 text-sm font-semibold text-blue-600 uppercase tracking-wide">${props.timePeriod}</div>
-            <div class="text-gray-700 leading-relaxed">${props.info}</div>
+            <div class="mb-4 text-sm font-semibold text-blue-600 uppercase tracking-wide"></div>
+            <div class="text-gray-700 leading-relaxed">${site.info}</div>
         `;
+        panelInfo.firstElementChild.textContent = site.period;
 
-        // Link (props.link is <a href="...">MORE DETAILS</a>)
-        tempDiv.innerHTML = props.link;
-        const link = tempDiv.querySelector('a');
-        if (link) {
-            panelLink.href = link.getAttribute('href');
+        if (site.link) {
+            panelLink.href = site.link;
             panelLink.classList.remove('hidden');
         } else {
             panelLink.classList.add('hidden');
@@ -69,23 +64,125 @@ document.addEventListener('DOMContentLoaded', () => {
         console.log("Side panel opened.");
     };
 
-    // Load CSV data
-    omnivore.csv('sites-popup.csv')
-        .on('ready', function (layer) {
-            this.eachLayer(function (marker) {
-                const props = marker.toGeoJSON().properties;
+    // Detail shards are fetched on first click and kept for the session
+    const siteDetails = new Map();
+    const loadSite = (id) => {
+        if (!siteDetails.has(id)) {
+            const request = fetch(`data/sites/${encodeURIComponent(id)}.json`).then((response) => {
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+                return response.json();
+            });
+            // Let a failed fetch be retried on the next click
+            request.catch(() => siteDetails.delete(id));
+            siteDetails.set(id, request);
+        }
+        return siteDetails.get(id);
+    };
+
+    const onSiteClick = (id) => {
+        console.log("Marker clicked!", id);
+        loadSite(id)
+            .then(showSidePanel)
+            .catch((error) => console.error(`Could not load details for ${id}:`, error));
+    };
 
-                // Instead of binding popup, add click listener
-                marker.on('click', () => {
-                    console.log("Marker clicked!", props);
-                    showSidePanel(props);
+    // Load the compiled site index (see compile_sites.py) and cluster it in the browser
+    const loadClientClusters = () => {
+        fetch('data/sites.geojson')
+            .then((response) => response.json())
+            .then((data) => {
+                const layer = L.geoJSON(data, {
+                    onEachFeature: (feature, marker) => {
+                        marker.on('click', () => onSiteClick(feature.id));
+                    }
                 });
 
-                // Add to cluster group
-                markers.addLayer(marker);
+                markers.addLayers(layer.getLayers());
+                map.addLayer(markers);
+            })
+            .catch((error) => console.error("Could not load site index:", error));
+    };
+
+    // Precomputed clusters (see cluster_tiles.py): only the tiles in view are fetched
+    const loadClusterTiles = (base, meta) => {
+        const layer = L.layerGroup().addTo(map);
+        const tiles = new Map();
+        let current = 0;
+
+        const fetchTile = (z, x, y) => {
+            const key = `${z}/${x}/${y}`;
+            if (!tiles.has(key)) {
+                // Empty tiles are not written, so a 404 just means no markers
+                tiles.set(key, fetch(`${base}/${key}.json`)
+                    .then((response) => (response.ok ? response.json() : { features: [] }))
+                    .catch(() => ({ features: [] })));
+            }
+            return tiles.get(key);
+        };
+
+        const toMarker = (feature) => {
+            const [lon, lat] = feature.geometry.coordinates;
+            const props = feature.properties;
+            if (!props.cluster) {
+                const marker = L.marker([lat, lon], { title: props.name });
+                marker.on('click', () => onSiteClick(feature.id));
+                return marker;
+            }
+            // Reuse the markercluster styles for the bubbles
+            const size = props.count < 10 ? 'small' : props.count < 100 ? 'medium' : 'large';
+            const marker = L.marker([lat, lon], {
+                icon: L.divIcon({
+                    html: `<div><span>${props.count}</span></div>`,
+                    className: `marker-cluster marker-cluster-${size}`,
+                    iconSize: L.point(40, 40)
+                })
+            });
+            marker.on('click', () => map.setView([lat, lon], props.expansion_zoom));
+            return marker;
+        };
+
+        const update = () => {
+            const z = Math.max(meta.min_zoom, Math.min(meta.max_zoom, Math.floor(map.getZoom())));
+            const bounds = map.getPixelBounds();
+            const scale = map.getZoomScale(z, map.getZoom());
+            const last = 2 ** z - 1;
+            const tileRange = (value) => Math.max(0, Math.min(last, Math.floor(value * scale / meta.tile_size)));
+            const x0 = tileRange(bounds.min.x), x1 = tileRange(bounds.max.x);
+            const y0 = tileRange(bounds.min.y), y1 = tileRange(bounds.max.y);
+
+            const requests = [];
+            for (let x = x0; x <= x1; x++) {
+                for (let y = y0; y <= y1; y++) {
+                    requests.push(fetchTile(z, x, y));
+                }
+            }
+            const view = ++current;
+            Promise.all(requests).then((results) => {
+                // A newer move may have finished first
+                if (view !== current) {
+                    return;
+                }
+                layer.clearLayers();
+                results.forEach((tile) => tile.features.forEach((feature) => layer.addLayer(toMarker(feature))));
             });
+        };
 
-            // Add cluster group to map
-            map.addLayer(markers);
-        });
+        map.on('moveend', update);
+        update();
+    };
+
+    const tilesBase = document.getElementById('map').dataset.clusterTiles;
+    if (tilesBase) {
+        fetch(`${tilesBase}/meta.json`)
+            .then((response) => response.json())
+            .then((meta) => loadClusterTiles(tilesBase, meta))
+            .catch((error) => {
+                console.error("Could not load cluster tiles, clustering in the browser:", error);
+                loadClientClusters();
+            });
+    } else {
+        loadClientClusters();
+    }
 });
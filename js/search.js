@@ -0,0 +1,226 @@
+// Full-text search over the index search_index.py writes to data/search/.
+// Tokenizing and ranking mirror search_index.py (SearchIndex.search), so
+// change both together. Shards are fetched per query term and kept for the session.
+(() => {
+    const INDEX_BASE = 'data/search/';
+    const MIN_TERM_LENGTH = 2;
+    const K1 = 1.2;
+    const B = 0.75;
+    // ms of no typing before the widget searches
+    const SEARCH_DELAY = 120;
+    const STOPWORDS = new Set((
+        'a an and are as at be been but by for from had has have he her his in into is it its of on or ' +
+        'she that the their there these they this to was were which who with'
+    ).split(' '));
+    const STEM_RULES = [
+        ['ies', 5, 'y'], ['sses', 5, 'ss'], ['ches', 5, 'ch'], ['shes', 5, 'sh'], ['xes', 4, 'x'],
+        ['ss', 0, 'ss'], ['us', 0, 'us'], ['is', 0, 'is'], ['s', 4, ''], ['ing', 6, ''], ['ed', 5, ''],
+    ];
+
+    const normalize = (text) => text.normalize('NFKD').replace(/[\u0300-\u036f]/g, '').toLowerCase();
+
+    const stem = (word) => {
+        for (const [suffix, minLength, replacement] of STEM_RULES) {
+            if (word.endsWith(suffix)) {
+                return word.length >= minLength ? word.slice(0, word.length - suffix.length) + replacement : word;
+            }
+        }
+        return word;
+    };
+
+    const words = (text) => text.match(/[a-z0-9]+/g) || [];
+
+    // [[position, term]] for the indexed words of text
+    const tokenize = (text) => {
+        const tokens = [];
+        words(normalize(text)).forEach((word, position) => {
+            if (word.length >= MIN_TERM_LENGTH && !STOPWORDS.has(word)) {
+                tokens.push([position, stem(word)]);
+            }
+        });
+        return tokens;
+    };
+
+    let metaRequest = null;
+    const shards = new Map();
+
+    const fetchJSON = (url) => fetch(url).then((response) => {
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        return response.json();
+    });
+
+    const loadMeta = () => {
+        if (!metaRequest) {
+            metaRequest = fetchJSON(`${INDEX_BASE}docs.json`);
+            metaRequest.catch(() => { metaRequest = null; });
+        }
+        return metaRequest;
+    };
+
+    const loadShard = (meta, key) => {
+        if (!meta.shards.includes(key)) {
+            return Promise.resolve({});
+        }
+        if (!shards.has(key)) {
+            const request = fetchJSON(`${INDEX_BASE}terms/${key}.json`);
+            request.catch(() => shards.delete(key));
+            shards.set(key, request);
+        }
+        return shards.get(key);
+    };
+
+    const hasPhrase = (phrase, matches, docId) => {
+        if (!phrase.length) {
+            return true;
+        }
+        const [firstPosition, firstTerm] = phrase[0];
+        let starts = new Set(matches.get(firstTerm).get(docId));
+        for (const [position, term] of phrase.slice(1)) {
+            const offset = position - firstPosition;
+            const shifted = new Set(matches.get(term).get(docId).map((p) => p - offset));
+            starts = new Set([...starts].filter((p) => shifted.has(p)));
+        }
+        return starts.size > 0;
+    };
+
+    // Resolves to [{url, title, period, length, score}], best first. With
+    // prefix, a last word the query ends on also matches the terms it starts.
+    const search = async (query, { limit = 10, prefix = false } = {}) => {
+        const meta = await loadMeta();
+        const shardKey = (term) => term.slice(0, meta.prefix_length);
+        const phrases = [...query.matchAll(/"([^"]*)"/g)].map((match) => tokenize(match[1]));
+        const text = normalize(query.replace(/"/g, ' '));
+        const queryWords = words(text);
+        let tokens = tokenize(text);
+
+        const last = queryWords[queryWords.length - 1];
+        const completing = prefix && last && text.endsWith(last) ? last : null;
+        if (completing && tokens.length && tokens[tokens.length - 1][0] === queryWords.length - 1) {
+            tokens = tokens.slice(0, -1);
+        }
+
+        // slot -> terms that fill it; a document needs one of them for every slot
+        const slots = new Map(tokens.map(([, term]) => [term, [term]]));
+        if (completing && completing.length >= meta.prefix_length) {
+            const stemmed = stem(completing);
+            const [completions, stemShard] = await Promise.all([
+                loadShard(meta, shardKey(completing)), loadShard(meta, shardKey(stemmed)),
+            ]);
+            const expanded = new Set(Object.keys(completions).filter((term) => term.startsWith(completing)));
+            if (stemmed in stemShard) {
+                expanded.add(stemmed);
+            }
+            if (expanded.size || !STOPWORDS.has(completing)) {
+                slots.set(`${completing}*`, [...expanded].sort());
+            }
+        }
+        if (!slots.size) {
+            return [];
+        }
+
+        const allTerms = [...slots.values()].flat();
+        const loaded = await Promise.all(allTerms.map((term) => loadShard(meta, shardKey(term))));
+        const postings = new Map(allTerms.map((term, i) => [term, loaded[i][term] || []]));
+
+        // slot -> Map(doc id -> [positions])
+        const matches = new Map();
+        for (const [slot, terms] of slots) {
+            const found = new Map();
+            for (const term of terms) {
+                for (const posting of postings.get(term)) {
+                    if (!found.has(posting[0])) {
+                        found.set(posting[0], []);
+                    }
+                    const positions = found.get(posting[0]);
+                    let position = 0;
+                    for (const gap of posting.slice(1)) {
+                        position += gap;
+                        positions.push(position);
+                    }
+                }
+            }
+            matches.set(slot, found);
+        }
+
+        const founds = [...matches.values()];
+        let candidates = [...founds[0].keys()].filter((docId) => founds.every((found) => found.has(docId)));
+        for (const phrase of phrases) {
+            candidates = candidates.filter((docId) => hasPhrase(phrase, matches, docId));
+        }
+
+        const docs = meta.docs;
+        const results = candidates.map((docId) => {
+            const lengthNorm = 1 - B + B * docs[docId].length / (meta.average_length || 1);
+            let score = 0;
+            for (const found of founds) {
+                const tf = found.get(docId).length;
+                const idf = Math.log(1 + (docs.length - found.size + 0.5) / (found.size + 0.5));
+                score += idf * tf * (K1 + 1) / (tf + K1 * lengthNorm);
+            }
+            return { score, docId };
+        });
+        results.sort((a, b) => b.score - a.score || a.docId - b.docId);
+        return results.slice(0, limit).map(({ score, docId }) => ({ ...docs[docId], score }));
+    };
+
+    window.siteSearch = { normalize, stem, tokenize, search };
+
+    // Widget: <input id="site-search"> with an <ul id="search-results"> for the hits
+    document.addEventListener('DOMContentLoaded', () => {
+        const input = document.getElementById('site-search');
+        const list = document.getElementById('search-results');
+        if (!input || !list) {
+            return;
+        }
+
+        let latest = 0;
+        let timer = null;
+        const render = (results) => {
+            list.replaceChildren(...results.map((result) => {
+                const item = document.createElement('li');
+                const link = document.createElement('a');
+                link.href = result.url;
+                link.className = 'block px-4 py-2 hover:bg-blue-50';
+                const title = document.createElement('span');
+                title.className = 'block text-sm font-bold text-gray-900';
+                title.textContent = result.title;
+                const period = document.createElement('span');
+                period.className = 'block text-xs text-gray-500';
+                period.textContent = result.period;
+                link.append(title, period);
+                item.append(link);
+                return item;
+            }));
+            list.classList.toggle('hidden', results.length === 0);
+        };
+
+        const update = () => {
+            const query = input.value;
+            const request = ++latest;
+            if (!query.trim()) {
+                render([]);
+                return;
+            }
+            search(query, { prefix: true })
+                .then((results) => {
+                    // Answers can arrive out of order; only the newest query is shown
+                    if (request === latest) {
+                        render(results);
+                    }
+                })
+                .catch((error) => console.error('Search failed:', error));
+        };
+        input.addEventListener('input', () => {
+            clearTimeout(timer);
+            timer = setTimeout(update, SEARCH_DELAY);
+        });
+        input.addEventListener('keydown', (event) => {
+            if (event.key === 'Escape') {
+                input.value = '';
+                render([]);
+            }
+        });
+    });
+})();
@@ -0,0 +1,202 @@
+import argparse
+import json
+import os
+import posixpath
+import re
+import sys
+import urllib.parse
+
+from build_manifest import file_hash
+
+INDEX_PATH = ".link-index.json"
+INDEX_VERSION = 1
+
+# Directories that never hold references to atlas pages. The full scan of normalize_filenames
+# walks the same files as the index, so both rewrite the same references.
+SKIP_DIRS = {".git", ".gemini", "node_modules", "vendor", "__pycache__", ".pytest_cache", "dist"}
+# Generated files that are large and never link to pages (Tailwind build, source maps)
+SKIP_FILES = {"css/output.css"}
+INDEXED_EXTENSIONS = ('.html', '.js', '.css', '.csv', '.py', '.md')
+
+# Each regex has a group named "ref" holding the reference as written
+HTML_REF_RE = re.compile(r'''\b(?:href|src)\s*=\s*(["'])(?P<ref>[^"']*)\1''', re.IGNORECASE)
+CSS_REF_RE = re.compile(r'''url\(\s*(["']?)(?P<ref>[^"')]+)\1\s*\)''', re.IGNORECASE)
+MD_REF_RE = re.compile(r'''\]\((?P<ref>[^)\s]+)''')
+# Quoted paths in scripts; spaces are allowed since un-normalized page names have them
+JS_REF_RE = re.compile(
+    r'''(["'`])(?P<ref>[^"'`\n]*[^"'`\s]\.(?:html|csv|json|js|css|png|jpe?g|gif|svg|webp))\1''',
+    re.IGNORECASE,
+)
+
+REF_PATTERNS = {
+    '.html': [HTML_REF_RE],
+    # sites-popup.csv keeps its link column as <a href="...">
+    '.csv': [HTML_REF_RE],
+    '.css': [CSS_REF_RE],
+    '.md': [MD_REF_RE, HTML_REF_RE],
+    '.js': [JS_REF_RE],
+    '.py': [JS_REF_RE],
+}
+
+SCHEME_RE = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.-]*:')
+
+def resolve_reference(source, ref):
+    """Resolve a reference found in source (root-relative posix path) to a root-relative path.
+
+    Returns None for external URLs, anchors and anything that points outside the tree.
+    """
+    # Student pages sometimes wrap URLs in typographic quotes: href="“http://...”"
+    ref = ref.strip().strip('\u201c\u201d\u2018\u2019')
+    if not ref or ref.startswith(('#', '//', '{', '$')) or SCHEME_RE.match(ref):
+        return None
+    ref = urllib.parse.unquote(ref.split('#', 1)[0].split('?', 1)[0])
+    if not ref:
+        return None
+    if ref.startswith('/'):
+        target = ref.lstrip('/')
+    elif source.endswith(('.js', '.py')):
+        # Scripts are loaded by pages at the root and the build scripts run
+        # from it, so their paths are root-relative
+        target = ref
+    else:
+        target = posixpath.join(posixpath.dirname(source), ref)
+    target = posixpath.normpath(target)
+    if target == '.' or target.startswith('../'):
+        return None
+    return target
+
+def extract_references(source, content):
+    # Returns [[target, offset, raw]] sorted by offset
+    ext = os.path.splitext(source)[1].lower()
+    refs = []
+    for regex in REF_PATTERNS.get(ext, []):
+        for match in regex.finditer(content):
+            raw = match.group('ref')
+            target = resolve_reference(source, raw)
+            if target:
+                refs.append([target, match.start('ref'), raw])
+    refs.sort(key=lambda r: r[1])
+    return refs
+
+def iter_indexed_files(root):
+    for dirpath, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS)
+        for file in sorted(files):
+            if not file.endswith(INDEXED_EXTENSIONS):
+                continue
+            path = os.path.relpath(os.path.join(dirpath, file), root).replace(os.sep, '/')
+            if path not in SKIP_FILES:
+                yield path
+
+class LinkIndex:
+    """Which files reference which paths, built from one pass over the tree.
+
+    Keys are root-relative posix paths. The index is cached in INDEX_PATH;
+    on refresh a file is re-read only if its mtime or size changed, and
+    re-parsed only if its content hash changed as well.
+    """
+
+    def __init__(self, root=".", cache_path=None):
+        self.root = root
+        self.cache_path = cache_path or os.path.join(root, INDEX_PATH)
+        self.files = {}
+        self.targets = {}
+        self.stats = {"parsed": 0, "reused": 0}
+
+    @classmethod
+    def build(cls, root=".", cache_path=None):
+        index = cls(root, cache_path)
+        index._load_cache()
+        index.refresh()
+        return index
+
+    def _load_cache(self):
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable link index {self.cache_path}: {e}")
+            return
+        if data.get("version") == INDEX_VERSION:
+            self.files = data.get("files", {})
+
+    def _index_file(self, path):
+        full_path = os.path.join(self.root, path)
+        st = os.stat(full_path)
+        entry = self.files.get(path)
+        if entry and entry["mtime"] == st.st_mtime_ns and entry["size"] == st.st_size:
+            self.stats["reused"] += 1
+            return entry
+        digest = file_hash(full_path)
+        if entry and entry["sha256"] == digest:
+            entry["mtime"] = st.st_mtime_ns
+            self.stats["reused"] += 1
+            return entry
+        try:
+            with open(full_path, 'r', encoding='utf-8') as f:
+                refs = extract_references(path, f.read())
+        except UnicodeDecodeError:
+            refs = []
+        self.stats["parsed"] += 1
+        return {"mtime": st.st_mtime_ns, "size": st.st_size, "sha256": digest, "refs": refs}
+
+    def refresh(self):
+        self.files = {path: self._index_file(path) for path in iter_indexed_files(self.root)}
+        self.targets = {}
+        for source, entry in self.files.items():
+            for target, offset, raw in entry["refs"]:
+                self.targets.setdefault(target, []).append((source, offset, raw))
+
+    def save(self):
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"version": INDEX_VERSION, "files": self.files}, f, separators=(',', ':'))
+        os.replace(tmp_path, self.cache_path)
+
+    def references_to(self, target, include_children=False):
+        """[(source, offset, raw)] for every reference to target.
+
+        With include_children, references to anything under target (a
+        directory) are returned as well.
+        """
+        target = posixpath.normpath(target.replace(os.sep, '/'))
+        refs = list(self.targets.get(target, []))
+        if include_children:
+            prefix = target + '/'
+            for other, other_refs in self.targets.items():
+                if other.startswith(prefix):
+                    refs.extend(other_refs)
+        return sorted(refs)
+
+    def referrers(self, targets):
+        # Sorted root-relative paths of the files referencing any of targets (or their children)
+        targets = {posixpath.normpath(target.replace(os.sep, '/')) for target in targets}
+        sources = set()
+        for target, refs in self.targets.items():
+            # The target itself or any directory above it
+            parts = target.split('/')
+            if any('/'.join(parts[:i]) in targets for i in range(len(parts), 0, -1)):
+                sources.update(source for source, _, _ in refs)
+        return sorted(sources)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show which files link to the given paths.")
+    parser.add_argument("paths", nargs="*", help="root-relative paths, e.g. sites/kerma.html")
+    parser.add_argument("--root", default=".")
+    args = parser.parse_args(argv)
+
+    index = LinkIndex.build(args.root)
+    index.save()
+    print(f"Indexed {len(index.files)} files ({index.stats['parsed']} parsed, {index.stats['reused']} from cache)")
+
+    for path in args.paths:
+        refs = index.references_to(path, include_children=True)
+        print(f"\n{path}: {len(refs)} references")
+        for source, offset, raw in refs:
+            print(f"  {source}@{offset}: {raw}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,14 @@
+import argparse
+import functools
 import os
 import re
+import shutil
+import sys
+import time
+
+from batch import add_jobs_argument, count_errors, run_batch, walk_files
+from build_manifest import BuildManifest, add_force_argument, record_results, script_version, skip_unchanged
+from profiling import FileProfile, add_profile_argument, measure, phase, write_report
 
 # Configuration
 ROOT_DIR = "."
@@ -42,74 +51,324 @@ CLASS_MAP = {
     r'data-slide': 'data-bs-slide',
 }
 
-def process_file(filepath):
-    with open(filepath, 'r') as f:
-        content = f.read()
+# Compile the class rules once. Attribute rules (data-*) are handled by plain
+# string replacement in process_file, so they are left out here.
+CLASS_RULES = [
+    (re.compile(r'\b' + pattern + r'\b'), replacement)
+    for pattern, replacement in CLASS_MAP.items()
+    if not pattern.startswith('data-')
+]
+CLASS_RULE_NAMES = [pattern for pattern in CLASS_MAP if not pattern.startswith('data-')]
+# Cheap pre-check: a token that matches none of the rules is returned as-is.
+CLASS_RULES_ANY = re.compile(
+    r'\b(?:' + '|'.join(p for p in CLASS_MAP if not p.startswith('data-')) + r')\b'
+)
+CLASS_ATTR_RE = re.compile(r'class="([^"]*)"')
+CLASS_SPLIT_RE = re.compile(r'(\s+)')
+
+# Bootstrap 3 assets to remove: local or CDN CSS, jQuery, JS, html5shiv/respond.js
+LEGACY_ASSET_RULES = [
+    ("remove bootstrap3 css", re.compile(r'<link[^>]*bootstrap[^>]*css[^>]*>', re.IGNORECASE)),
+    ("remove jquery", re.compile(r'<script[^>]*jquery[^>]*></script>', re.IGNORECASE)),
+    ("remove bootstrap3 js", re.compile(r'<script[^>]*bootstrap[^>]*js[^>]*></script>', re.IGNORECASE)),
+    ("remove ie8 shims", re.compile(r'<!--\[if lt IE 9\]>.*?<!\[endif\]-->', re.DOTALL)),
+]
+IE_SHIM_RE = LEGACY_ASSET_RULES[-1][1]
+IE_SHIM_OPEN = '<!--[if lt IE 9]>'
+# Pages that are past Bootstrap 3 already: migrated, or on the Tailwind stylesheet
+TAILWIND_CSS_RE = re.compile(r'<link\b[^>]*css/output\.css', re.IGNORECASE)
+# --stream looks for those markers with this much of the previous chunk kept
+CONVERTED_SCAN_OVERLAP = 4096
+# --stream reads pages this many characters at a time
+STREAM_CHUNK_SIZE = 64 * 1024
+# What may follow a '>' that --stream cuts after: anything but a tag the
+# legacy asset rules remove (<link, <script, <!--) or a closing </script
+STREAM_CUT_NEXT_RE = re.compile(r'[^<]|<[^/ls!]|</[^s]', re.IGNORECASE)
+# data-toggle= -> data-bs-toggle= etc.
+ATTRIBUTE_RULES = [
+    (pattern, f'{pattern}=', f'{replacement}=')
+    for pattern, replacement in CLASS_MAP.items()
+    if pattern.startswith('data-')
+]
+# Every rule --profile reports on, so the ones that never fire show up too
+RULE_NAMES = (
+    [name for name, _ in LEGACY_ASSET_RULES]
+    + ["add bootstrap5 css", "add bootstrap5 js"]
+    + [name for name, _, _ in ATTRIBUTE_RULES]
+    + ["class pre-check"] + CLASS_RULE_NAMES
+    + ["modal centering"]
+)
+
+# Token -> rewritten token, shared across files.
+_token_cache = {}
+
+def rewrite_token(token):
+    # Rules are applied in CLASS_MAP order and each one sees the output of the
+    # previous ones, exactly like the old one-pass-per-rule loop. None of the
+    # patterns can match across whitespace, so rewriting token by token gives
+    # the same result as rewriting the whole attribute value.
+    cached = _token_cache.get(token)
+    if cached is not None:
+        return cached
+    new_token = token
+    if CLASS_RULES_ANY.search(token):
+        for regex, replacement in CLASS_RULES:
+            new_token = regex.sub(replacement, new_token)
+    _token_cache[token] = new_token
+    return new_token
+
+def rewrite_token_profiled(token, profile):
+    # Same as rewrite_token, but uncached and timing every rule, so hits are per occurrence
+    start = time.perf_counter()
+    matched = CLASS_RULES_ANY.search(token)
+    profile.add_rule("class pre-check", 1 if matched else 0, time.perf_counter() - start)
+    if not matched:
+        return token
+    for (regex, replacement), name in zip(CLASS_RULES, CLASS_RULE_NAMES):
+        start = time.perf_counter()
+        token, hits = regex.subn(replacement, token)
+        profile.add_rule(name, hits, time.perf_counter() - start)
+    return token
+
+def rewrite_classes(classes, profile=None):
+    parts = CLASS_SPLIT_RE.split(classes)
+    # Odd indices are the whitespace separators, keep them untouched.
+    for i in range(0, len(parts), 2):
+        if parts[i]:
+            if profile is None:
+                parts[i] = rewrite_token(parts[i])
+            else:
+                parts[i] = rewrite_token_profiled(parts[i], profile)
+    return ''.join(parts)
 
-    original_content = content
+def replace_class_attr(match, profile=None):
+    return f'class="{rewrite_classes(match.group(1), profile)}"'
 
+def remove_legacy_assets(content, profile=None):
     # 1. Remove old CSS/JS
-    # Remove Bootstrap 3 CSS (local or CDN)
-    content = re.sub(r'<link[^>]*bootstrap[^>]*css[^>]*>', '', content, flags=re.IGNORECASE)
-    # Remove jQuery
-    content = re.sub(r'<script[^>]*jquery[^>]*></script>', '', content, flags=re.IGNORECASE)
-    # Remove Bootstrap 3 JS
-    content = re.sub(r'<script[^>]*bootstrap[^>]*js[^>]*></script>', '', content, flags=re.IGNORECASE)
-    # Remove html5shiv/respond.js
-    content = re.sub(r'<!--\[if lt IE 9\]>.*?<!\[endif\]-->', '', content, flags=re.DOTALL)
+    for name, regex in LEGACY_ASSET_RULES:
+        with measure(profile, name) as hits:
+            content, hits[0] = regex.subn('', content)
+    return content
 
+def add_bootstrap5(content, profile=None):
     # 2. Add Bootstrap 5 CSS (in head)
-    if BOOTSTRAP_CSS_CDN not in content:
-        content = content.replace('</head>', f'{BOOTSTRAP_CSS_CDN}\n</head>')
+    with measure(profile, "add bootstrap5 css") as hits:
+        if BOOTSTRAP_CSS_CDN not in content:
+            content = content.replace('</head>', f'{BOOTSTRAP_CSS_CDN}\n</head>')
+            hits[0] = 1
 
     # 3. Add Bootstrap 5 JS (at end of body)
-    if BOOTSTRAP_JS_CDN not in content:
-        content = content.replace('</body>', f'{BOOTSTRAP_JS_CDN}\n</body>')
+    with measure(profile, "add bootstrap5 js") as hits:
+        if BOOTSTRAP_JS_CDN not in content:
+            content = content.replace('</body>', f'{BOOTSTRAP_JS_CDN}\n</body>')
+            hits[0] = 1
 
     # 4. Update Classes and Attributes
     # First, simple string replacements for attributes
-    content = content.replace('data-toggle=', 'data-bs-toggle=')
-    content = content.replace('data-target=', 'data-bs-target=')
-    content = content.replace('data-dismiss=', 'data-bs-dismiss=')
-    content = content.replace('data-parent=', 'data-bs-parent=')
-    content = content.replace('data-slide=', 'data-bs-slide=')
-
-    for pattern, replacement in CLASS_MAP.items():
-        if pattern.startswith('data-'): continue # Skip attributes in class loop
-        # Use regex to replace classes inside class="..." attributes
-        # This is tricky with regex. A simpler approach is global replace if the pattern is unique enough.
-        # But "panel" might appear in text.
-        # We'll try a robust regex for class attributes.
-        
-        def replace_class(match):
-            classes = match.group(1)
-            # Replace specific class in the list
-            new_classes = re.sub(r'\b' + pattern + r'\b', replacement, classes)
-            return f'class="{new_classes}"'
-
-        content = re.sub(r'class="([^"]*)"', replace_class, content)
+    for name, old, new in ATTRIBUTE_RULES:
+        with measure(profile, name) as hits:
+            if profile is not None:
+                hits[0] = content.count(old)
+            content = content.replace(old, new)
+    return content
+
+def rewrite_class_attrs(content, profile=None):
+    if profile is None:
+        content = CLASS_ATTR_RE.sub(replace_class_attr, content)
+    else:
+        content = CLASS_ATTR_RE.sub(functools.partial(replace_class_attr, profile=profile), content)
 
     # 5. Specific Fixes
     # Modal centering
-    content = content.replace('modal-dialog', 'modal-dialog modal-dialog-centered')
+    with measure(profile, "modal centering") as hits:
+        if profile is not None:
+            hits[0] = content.count('modal-dialog')
+        content = content.replace('modal-dialog', 'modal-dialog modal-dialog-centered')
+    return content
+
+def is_converted(content):
+    return BOOTSTRAP_CSS_CDN in content or TAILWIND_CSS_RE.search(content) is not None
+
+def _migrate(content, profile=None):
+    content = remove_legacy_assets(content, profile)
+    content = add_bootstrap5(content, profile)
+    return rewrite_class_attrs(content, profile)
+
+def migrate(content, profile=None):
+    # Returns content with Bootstrap 3 assets, classes and attributes moved to Bootstrap 5.
+    # profile (a FileProfile) collects hits and time per rule.
+    # The rules are not idempotent (and would add Bootstrap 5 to a Tailwind
+    # page), so a page that is already converted is returned as it is.
+    if is_converted(content):
+        return content
+    return _migrate(content, profile)
+
+def is_converted_stream(source, chunk_size=STREAM_CHUNK_SIZE):
+    # is_converted() of the text file object source, read a chunk at a time
+    tail = ''
+    while True:
+        block = source.read(chunk_size)
+        if not block:
+            return False
+        window = tail + block
+        if is_converted(window):
+            return True
+        tail = window[-CONVERTED_SCAN_OVERLAP:]
+
+def _last_match_end(regex, text):
+    end = 0
+    for match in regex.finditer(text):
+        end = match.end()
+    return end
 
-    if content != original_content:
-        with open(filepath, 'w') as f:
-            f.write(content)
+def is_safe_cut(chunk):
+    """True if _migrate(chunk) + _migrate(rest) == _migrate(chunk + rest).
+
+    chunk must end with a '>' that the rest follows with STREAM_CUT_NEXT_RE.
+    Then no rule matches across the cut unless a legacy asset removal ends
+    exactly there (the text around it would join up), an IE 8 shim comment
+    or a class attribute is still open, which is what is checked here.
+
+    Adding the Bootstrap 5 CDN tags depends on the whole page ("not already
+    there"), but it is decided after the removals, which take out every
+    copy of those tags, so per-chunk it always comes out the same.
+    """
+    text = chunk
+    for _, regex in LEGACY_ASSET_RULES:
+        end = _last_match_end(regex, text)
+        if end == len(text):
+            return False
+        if regex is IE_SHIM_RE and IE_SHIM_OPEN in text[end:]:
+            return False
+        text = regex.sub('', text)
+    text = add_bootstrap5(text)
+    return 'class="' not in text[_last_match_end(CLASS_ATTR_RE, text):]
+
+def last_cut(text):
+    # Just after the last '>' in text that STREAM_CUT_NEXT_RE allows a cut
+    # after, or 0. The character(s) after it have to be read already.
+    end = len(text)
+    while True:
+        cut = text.rfind('>', 0, end) + 1
+        if cut <= 0 or STREAM_CUT_NEXT_RE.match(text, cut):
+            return cut
+        end = cut - 1
+
+def migrate_stream(source, target, chunk_size=STREAM_CHUNK_SIZE, profile=None):
+    """Migrate the seekable text file object source into target a chunk at a time.
+
+    Input is held back only up to the last safe cut (see is_safe_cut), so
+    memory stays around chunk_size whatever the page size or line length,
+    and the output is byte-identical to migrate() on the whole text. When
+    there is no safe cut, the next try waits for twice the input, which
+    keeps the work linear; a page only comes to be held whole if no cut is
+    safe anywhere. A first pass looks for the already-converted markers,
+    and such a page is copied as it is. Returns True if anything changed.
+    """
+    converted = is_converted_stream(source, chunk_size)
+    source.seek(0)
+    if converted:
+        while True:
+            block = source.read(chunk_size)
+            if not block:
+                return False
+            target.write(block)
+    changed = False
+    pending = ''
+    next_try = 0
+    while True:
+        block = source.read(chunk_size)
+        if block:
+            pending += block
+            if len(pending) < next_try:
+                continue
+            cut = last_cut(pending)
+            if cut <= 0 or not is_safe_cut(pending[:cut]):
+                next_try = 2 * len(pending)
+                continue
+            chunk, pending = pending[:cut], pending[cut:]
+            next_try = 0
+        else:
+            chunk, pending = pending, ''
+        new_chunk = _migrate(chunk, profile)
+        changed = changed or new_chunk != chunk
+        target.write(new_chunk)
+        if not block:
+            return changed
+
+def process_file(filepath, profile=False, stream=False):
+    # With profile, returns the file's FileProfile as a dict
+    file_profile = FileProfile(filepath) if profile else None
+    if stream:
+        changed = _process_file_streaming(filepath, file_profile)
+    else:
+        with phase(file_profile, "read"):
+            with open(filepath, 'r') as f:
+                original_content = f.read()
+
+        with phase(file_profile, "transform"):
+            content = migrate(original_content, file_profile)
+        changed = content != original_content
+        if changed:
+            with phase(file_profile, "write"):
+                with open(filepath, 'w') as f:
+                    f.write(content)
+    if changed:
         print(f"Updated {filepath}")
 
-def main():
-    # Process index.html and projects.html
-    if os.path.exists("index.html"):
-        process_file("index.html")
-    if os.path.exists("projects.html"):
-        process_file("projects.html")
+    if file_profile is None:
+        return None
+    if not stream:
+        file_profile.bytes_in = len(original_content.encode('utf-8'))
+        file_profile.bytes_out = len(content.encode('utf-8')) if changed else 0
+    return file_profile.to_dict()
+
+def _process_file_streaming(filepath, file_profile):
+    # Written next to the page and swapped in, or dropped if nothing changed
+    tmp_path = f"{filepath}.{os.getpid()}.tmp"
+    bytes_in = os.path.getsize(filepath)
+    try:
+        with phase(file_profile, "transform"):
+            with open(filepath, 'r') as source, open(tmp_path, 'w') as target:
+                changed = migrate_stream(source, target, profile=file_profile)
+        if changed:
+            shutil.copymode(filepath, tmp_path)
+            os.replace(tmp_path, filepath)
+        else:
+            os.remove(tmp_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if file_profile is not None:
+        file_profile.bytes_in = bytes_in
+        file_profile.bytes_out = os.path.getsize(filepath) if changed else 0
+    return changed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrate pages from Bootstrap 3 to Bootstrap 5.")
+    add_jobs_argument(parser)
+    add_force_argument(parser)
+    add_profile_argument(parser, "migrate_bootstrap")
+    parser.add_argument("--stream", action="store_true",
+                        help="rewrite pages a chunk at a time through a temporary file, "
+                             "keeping memory flat on very large pages")
+    args = parser.parse_args(argv)
+
+    # Process index.html and projects.html, then sites/
+    paths = [p for p in ("index.html", "projects.html") if os.path.exists(p)]
+    paths.extend(walk_files("sites", ".html"))
+
+    manifest = BuildManifest("migrate_bootstrap", script_version(__file__))
+    paths = skip_unchanged(manifest, paths, force=args.force)
 
-    # Process sites/
-    for root, dirs, files in os.walk("sites"):
-        for file in files:
-            if file.endswith(".html"):
-                process_file(os.path.join(root, file))
+    process = functools.partial(process_file, profile=bool(args.profile), stream=args.stream)
+    results = run_batch(process, paths, jobs=args.jobs)
+    record_results(manifest, results)
+    if args.profile:
+        write_report(args.profile, "migrate_bootstrap", results, RULE_NAMES)
+    return 1 if count_errors(results) else 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
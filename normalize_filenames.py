@@ -1,8 +1,19 @@
+import argparse
+import functools
 import os
+import re
+import sys
 import urllib.parse
 
+from batch import add_jobs_argument, count_errors, run_batch
+from link_index import INDEXED_EXTENSIONS, SKIP_DIRS, LinkIndex, iter_indexed_files
+
 ROOT_DIR = "."
 SITES_DIR = "sites"
+# The files the link index covers, so a full scan and --index agree
+REFERENCE_EXTENSIONS = INDEXED_EXTENSIONS
+# Characters that can continue a file name (regex character class body)
+NAME_CHARS = r"\w.%-"
 
 def normalize_name(name):
     # Remove extension for processing
@@ -11,19 +22,83 @@ def normalize_name(name):
     new_base = base.lower().replace(" ", "_")
     return new_base + ext
 
-def main():
-    rename_map = {}
-    
-    # 1. Identify and Rename Files AND Directories
+def to_index_path(path):
+    return os.path.relpath(path, ROOT_DIR).replace(os.sep, "/")
+
+def apply_renames(path, renamed):
+    # renamed is in execution order: files first, then their parent directories.
+    # Its paths are normalized already, as plan_renames makes them.
+    path = os.path.normpath(path)
+    for old_path, new_path in renamed:
+        if path == old_path or path.startswith(old_path + os.sep):
+            path = new_path + path[len(old_path):]
+    return path
+
+def is_skipped_dir(path):
+    return os.path.basename(path) in SKIP_DIRS
+
+def _trie_regex(node):
+    # node maps a character to the child node; the "" key marks the end of a name
+    alternatives = [re.escape(ch) + _trie_regex(child) for ch, child in sorted(node.items()) if ch]
+    if not alternatives:
+        return ""
+    if len(alternatives) == 1 and "" not in node:
+        return alternatives[0]
+    group = "(?:" + "|".join(alternatives) + ")"
+    # Optional and greedy: the longer name is tried first, the shorter one on backtrack
+    return group + "?" if "" in node else group
+
+def compile_rename_map(rename_map):
+    """Compile the old names into one regex that finds all of them in a single scan.
+
+    The names are merged into a prefix trie, so at each position the regex
+    only follows the branches that match the text, and the longest name wins.
+    A match must not be glued to other file-name characters on either side,
+    so an old name is never rewritten inside a longer name that merely ends
+    or starts with it (e.g. "kom.html" inside "old_kom.html" or "kom.html.bak").
+    """
+    trie = {}
+    for old_name in rename_map:
+        node = trie
+        for ch in old_name:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+    return re.compile(
+        r"(?<![" + NAME_CHARS + r"])" + "(?:" + _trie_regex(trie) + ")" + r"(?![" + NAME_CHARS + r"])"
+    )
+
+def rewrite_references(content, pattern, rename_map):
+    # Returns (new_content, number of references replaced)
+    return pattern.subn(lambda m: rename_map[m.group(0)], content)
+
+def update_references(filepath, pattern, rename_map):
+    with open(filepath, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    new_content, changes_count = rewrite_references(content, pattern, rename_map)
+
+    if changes_count > 0:
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(new_content)
+        print(f"Updated {changes_count} links in: {filepath}")
+    return changes_count
+
+def plan_renames(sites_dir=SITES_DIR):
+    """List the renames normalization needs, as (old_path, new_path, old_name, new_name).
+
+    Child files come before their parent directories, so executing them
+    in order never renames a directory out from under a pending file.
+    """
+    to_rename = []
     # We need to walk top-down to rename files, but bottom-up to rename directories?
     # Actually, os.walk is top-down by default.
     # If we rename a directory, the walk might get confused.
     # Let's collect all renames first, then execute.
-    
-    to_rename = [] # List of (old_path, new_path, is_dir)
-
-    print("--- Scanning for Renames ---")
-    for root, dirs, files in os.walk(SITES_DIR, topdown=False): # Bottom-up to handle child files before parent dirs
+    for root, dirs, files in os.walk(sites_dir, topdown=False): # Bottom-up to handle child files before parent dirs
+        # The page template keeps its name; the scripts and benchmarks load it by path
+        if "aa-template" in os.path.relpath(root, sites_dir).lower():
+            continue
+        dirs = [d for d in dirs if d.lower() != "aa-template"]
         # Rename Files
         for file in files:
             if not file.endswith(".html"):
@@ -33,8 +108,8 @@ def main():
             new_name = normalize_name(file)
             
             if old_name != new_name:
-                old_path = os.path.join(root, old_name)
-                new_path = os.path.join(root, new_name)
+                old_path = os.path.normpath(os.path.join(root, old_name))
+                new_path = os.path.normpath(os.path.join(root, new_name))
                 to_rename.append((old_path, new_path, old_name, new_name))
 
         # Rename Directories
@@ -43,12 +118,22 @@ def main():
             new_name = old_name.lower().replace(" ", "_")
             
             if old_name != new_name:
-                old_path = os.path.join(root, old_name)
-                new_path = os.path.join(root, new_name)
+                old_path = os.path.normpath(os.path.join(root, old_name))
+                new_path = os.path.normpath(os.path.join(root, new_name))
                 to_rename.append((old_path, new_path, old_name, new_name))
+    return to_rename
 
-    # Execute Renames
-    print(f"Found {len(to_rename)} items to rename.")
+def add_rename_mapping(rename_map, old_name, new_name):
+    rename_map[old_name] = new_name
+    # Also handle URL encoded versions
+    encoded_old = urllib.parse.quote(old_name)
+    if encoded_old != old_name:
+        rename_map[encoded_old] = new_name
+
+def execute_renames(to_rename):
+    # Returns ([(old_path, new_path)] that succeeded, {old name: new name})
+    renamed = []
+    rename_map = {}
     for old_path, new_path, old_name, new_name in to_rename:
         try:
             # On case-insensitive filesystems (Mac/Windows), renaming "File" to "file" might fail or do nothing
@@ -57,59 +142,65 @@ def main():
             os.rename(old_path, temp_path)
             os.rename(temp_path, new_path)
             print(f"Renamed: {old_name} -> {new_name}")
-            
-            rename_map[old_name] = new_name
-            # Also handle URL encoded versions
-            encoded_old = urllib.parse.quote(old_name)
-            if encoded_old != old_name:
-                rename_map[encoded_old] = new_name
+            renamed.append((old_path, new_path))
+            add_rename_mapping(rename_map, old_name, new_name)
                 
         except Exception as e:
             print(f"Error renaming {old_path}: {e}")
+    return renamed, rename_map
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Normalize site file names and update references to them.")
+    add_jobs_argument(parser)
+    parser.add_argument(
+        "--index", action="store_true",
+        help="only rewrite the files the cached link index says reference renamed paths, instead of every "
+             "text file in the tree (faster once the cache is warm, slower on a first run)",
+    )
+    args = parser.parse_args(argv)
+
+    # 1. Identify and Rename Files AND Directories
+    print("--- Scanning for Renames ---")
+    to_rename = plan_renames()
+
+    # Find who links to the renamed paths before they move
+    index = None
+    if to_rename and args.index:
+        index = LinkIndex.build(ROOT_DIR)
+        print(f"Link index: {len(index.files)} files ({index.stats['parsed']} parsed, {index.stats['reused']} cached)")
+
+    # Execute Renames
+    print(f"Found {len(to_rename)} items to rename.")
+    renamed, rename_map = execute_renames(to_rename)
 
     if not rename_map:
         print("No files needed renaming.")
-        return
+        return 0
 
     print(f"\nCreated {len(rename_map)} rename mappings.")
 
     # 2. Update References in All Files
     print("\n--- Updating References ---")
-    extensions = ('.html', '.js', '.css', '.csv', '.py', '.md')
-    
-    for root, dirs, files in os.walk(ROOT_DIR):
-        if ".git" in root or ".gemini" in root:
-            continue
-            
-        for file in files:
-            if not file.endswith(extensions):
-                continue
-                
-            filepath = os.path.join(root, file)
-            
+    if index is None:
+        paths = [
+            os.path.join(ROOT_DIR, path) for path in iter_indexed_files(ROOT_DIR)
             # Skip the script itself
-            if "normalize_filenames.py" in filepath:
-                continue
-
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                new_content = content
-                changes_count = 0
-                
-                for old_name, new_name in rename_map.items():
-                    if old_name in new_content:
-                        new_content = new_content.replace(old_name, new_name)
-                        changes_count += 1
-                
-                if changes_count > 0:
-                    with open(filepath, 'w', encoding='utf-8') as f:
-                        f.write(new_content)
-                    print(f"Updated {changes_count} links in: {filepath}")
-                    
-            except Exception as e:
-                print(f"Error processing {filepath}: {e}")
+            if "normalize_filenames.py" not in path
+        ]
+    else:
+        old_targets = [to_index_path(old_path) for old_path, _ in renamed]
+        referrers = index.referrers(old_targets)
+        # A referrer may itself have been renamed (or live in a renamed directory)
+        paths = [apply_renames(os.path.join(ROOT_DIR, path), renamed) for path in referrers]
+        print(f"{len(paths)} files reference renamed paths.")
+    pattern = compile_rename_map(rename_map)
+    update = functools.partial(update_references, pattern=pattern, rename_map=rename_map)
+    results = run_batch(update, paths, jobs=args.jobs)
+    if index is not None:
+        # Refresh now so the next run starts from a warm cache
+        index.refresh()
+        index.save()
+    return 1 if count_errors(results) else 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,174 @@
+import argparse
+import difflib
+import functools
+import os
+import sys
+
+import migrate_bootstrap
+import normalize_filenames
+import redesign_sites
+import responsive_images
+from batch import add_jobs_argument, count_errors, run_batch, walk_files, write_atomic
+from build_manifest import BuildManifest, add_force_argument, record_results, script_version
+from generate_pages import load_records
+from link_index import SKIP_DIRS
+from migrate_bootstrap import migrate
+from normalize_filenames import (
+    REFERENCE_EXTENSIONS, add_rename_mapping, apply_renames, compile_rename_map, execute_renames,
+    is_skipped_dir, plan_renames, rewrite_references,
+)
+from redesign_sites import render_page
+from watch import add_watch_arguments, watch
+
+# In the order they run on each page
+STAGES = ("migrate", "redesign", "links")
+
+def is_skipped(path):
+    # Vendored and generated trees hold no pages or links to them
+    return is_skipped_dir(path) or os.path.basename(path) in SKIP_DIRS
+
+def stages_for(path, stages, generated=()):
+    # Which of stages apply to path: redesign only re-templates site pages,
+    # non-HTML files (CSV, JS, CSS, Markdown) and the pages generate_pages.py
+    # builds from content/ (generated) only get their links rewritten
+    if not path.endswith(".html"):
+        return [stage for stage in stages if stage == "links"]
+    rel_path = os.path.relpath(path, normalize_filenames.ROOT_DIR)
+    if os.path.normpath(rel_path) in generated:
+        return [stage for stage in stages if stage == "links"]
+    in_sites = rel_path.startswith(redesign_sites.ROOT_DIR + os.sep)
+    if not in_sites and rel_path not in ("index.html", "projects.html"):
+        return [stage for stage in stages if stage == "links"]
+    if not in_sites or "aa-template" in os.path.dirname(path).lower():
+        return [stage for stage in stages if stage != "redesign"]
+    return list(stages)
+
+def transform(text, filepath, stages, images=True, pattern=None, rename_map=None, reconvert=False):
+    """Run stages over one page held in memory.
+
+    The page is parsed once, by the redesign stage; migrate and links are
+    text rewrites before and after it. Returns (new_text, [stages that
+    changed something]).
+    """
+    changed = []
+    if "migrate" in stages:
+        new_text = migrate(text)
+        if new_text != text:
+            changed.append("migrate")
+        text = new_text
+    if "redesign" in stages:
+        new_text = render_page(text, filepath, images=images, reconvert=reconvert)
+        if new_text is not None and new_text != text:
+            changed.append("redesign")
+            text = new_text
+    if "links" in stages and pattern is not None:
+        text, count = rewrite_references(text, pattern, rename_map)
+        if count:
+            changed.append("links")
+    return text, changed
+
+def process_file(filepath, stages, images=True, pattern=None, rename_map=None, dry_run=False, renamed=(),
+                 reconvert=False):
+    # renamed: the (old_path, new_path) renames a dry run did not carry out
+    with open(filepath, 'r', encoding='utf-8') as f:
+        text = f.read()
+
+    new_text, changed = transform(text, filepath, stages, images, pattern, rename_map, reconvert)
+    if not changed:
+        return changed
+
+    if dry_run:
+        diff = difflib.unified_diff(
+            text.splitlines(keepends=True), new_text.splitlines(keepends=True),
+            fromfile=f"a/{filepath}", tofile=f"b/{apply_renames(filepath, renamed)}",
+        )
+        print("".join(diff), end="")
+        return changed
+
+    write_atomic(filepath, new_text)
+    print(f"Updated {filepath} ({', '.join(changed)})")
+    return changed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Migrate, redesign and normalize links in one read and one write per page.",
+    )
+    add_jobs_argument(parser)
+    add_force_argument(parser)
+    parser.add_argument(
+        "--stages", nargs="+", choices=STAGES, default=list(STAGES),
+        help="stages to run, always in the order " + ", ".join(STAGES),
+    )
+    parser.add_argument("--no-images", dest="images", action="store_false",
+                        help="skip the responsive image step of the redesign stage")
+    parser.add_argument("--reconvert", action="store_true",
+                        help="let the redesign stage re-template pages that were redesigned already "
+                             "(not idempotent: review the diff)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="print a unified diff of the changes instead of writing or renaming anything")
+    parser.add_argument("paths", nargs="*",
+                        help="rebuild only these files, whether or not they changed (the others still get "
+                             "their links to renamed pages updated)")
+    add_watch_arguments(parser)
+    args = parser.parse_args(argv)
+    stages = [stage for stage in STAGES if stage in args.stages]
+    if args.watch:
+        return watch(args.interval, args.debounce)
+
+    paths = list(walk_files(normalize_filenames.ROOT_DIR, REFERENCE_EXTENSIONS, skip=is_skipped))
+    paths = [path for path in paths if not path.endswith(".py")]
+    generated = set(load_records())
+
+    # Renames happen first so every page is read and written once, at its final path
+    to_rename = plan_renames() if "links" in stages else []
+    if args.dry_run:
+        renamed = [(old_path, new_path) for old_path, new_path, _, _ in to_rename]
+        rename_map = {}
+        for _, _, old_name, new_name in to_rename:
+            add_rename_mapping(rename_map, old_name, new_name)
+        for old_path, new_path in renamed:
+            print(f"Would rename {old_path} -> {new_path}")
+    else:
+        renamed, rename_map = execute_renames(to_rename)
+    pattern = compile_rename_map(rename_map) if rename_map else None
+
+    version = script_version(
+        __file__, migrate_bootstrap.__file__, redesign_sites.__file__,
+        responsive_images.__file__, redesign_sites.TEMPLATE, f"stages={stages}", f"images={args.images}",
+        f"reconvert={args.reconvert}",
+    )
+    manifest = BuildManifest("pipeline", version)
+
+    # Files from an earlier run that are unchanged since only need their links updated.
+    # Paths are grouped by the stages they need, one batch per group.
+    targets = {os.path.normpath(path) for path in args.paths}
+    jobs = {}
+    for path in paths:
+        current = apply_renames(path, renamed)
+        source = path if args.dry_run else current
+        if targets:
+            rebuild = os.path.normpath(path) in targets or os.path.normpath(current) in targets
+        else:
+            rebuild = args.force or not manifest.is_current(source)
+        if rebuild:
+            path_stages = stages_for(current, stages, generated)
+        else:
+            path_stages = ["links"] if pattern is not None and "links" in stages else []
+        if path_stages:
+            jobs.setdefault(tuple(path_stages), []).append(source)
+
+    results = []
+    for path_stages, sources in jobs.items():
+        process = functools.partial(
+            process_file, stages=path_stages, images=args.images,
+            pattern=pattern, rename_map=rename_map, dry_run=args.dry_run, renamed=renamed,
+            reconvert=args.reconvert,
+        )
+        results.extend(run_batch(process, sources, jobs=args.jobs))
+
+    if not args.dry_run:
+        record_results(manifest, results)
+    return 1 if count_errors(results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+import argparse
+import functools
+import os
+import re
+import sys
+
+from batch import add_jobs_argument, count_errors, run_batch, walk_files
+from redesign_sites import page_depth
+
+PARTIALS_DIR = "centralize-nav-foot"
+# Placeholder id -> partial that nav-foot.js would fetch into it
+PARTIALS = {
+    "central-nav": os.path.join(PARTIALS_DIR, "navbar.html"),
+    "central-foot": os.path.join(PARTIALS_DIR, "footer.html"),
+}
+SKIP_DIRS = ("node_modules", "leaflet-omnivore-master", "dist")
+
+# The placeholder, with any previously inlined partial (between the markers) inside it
+PLACEHOLDER_RE = re.compile(
+    r'<div id="(?P<id>central-nav|central-foot)"[^>]*>'
+    r'(?:\s*<!-- prerendered: [^>]*-->.*?<!-- /prerendered -->)?\s*</div>',
+    re.DOTALL,
+)
+# Only pages that load nav-foot.js use these partials (sites-old-nav-foot.js has its own)
+NAV_FOOT_SCRIPT_RE = re.compile(r'<script[^>]*src=["\'][^"\']*centralize-nav-foot/nav-foot\.js')
+LINK_TAG_RE = re.compile(r'<(?P<tag>a|img)\b[^>]*>', re.IGNORECASE)
+ATTR_RE = {
+    "a": re.compile(r'''(\shref=)(["'])(.*?)\2''', re.IGNORECASE),
+    "img": re.compile(r'''(\ssrc=)(["'])(.*?)\2''', re.IGNORECASE),
+}
+
+def prefix_links(html, prefix):
+    # Same rules as nav-foot.js: prefix relative links and image sources
+    if not prefix:
+        return html
+
+    def fix_attr(tag, match):
+        value = match.group(3)
+        if tag == "a" and value.startswith(("http", "#", "mailto:")):
+            return match.group(0)
+        if tag == "img" and value.startswith("http"):
+            return match.group(0)
+        return f"{match.group(1)}{match.group(2)}{prefix}{value}{match.group(2)}"
+
+    def fix_tag(match):
+        tag = match.group("tag").lower()
+        return ATTR_RE[tag].sub(lambda m: fix_attr(tag, m), match.group(0))
+
+    return LINK_TAG_RE.sub(fix_tag, html)
+
+def is_skipped_dir(path):
+    name = os.path.basename(path)
+    return name in SKIP_DIRS or name.startswith(".") or name == PARTIALS_DIR
+
+def load_partials():
+    partials = {}
+    for element_id, path in PARTIALS.items():
+        with open(path, 'r', encoding='utf-8') as f:
+            partials[element_id] = f.read().strip()
+    return partials
+
+def prerender(content, filepath, partials):
+    if not NAV_FOOT_SCRIPT_RE.search(content):
+        return content
+    prefix = page_depth(filepath)
+
+    def fill(match):
+        element_id = match.group("id")
+        html = prefix_links(partials[element_id], prefix)
+        return (
+            f'<div id="{element_id}" data-prerendered>\n'
+            f'<!-- prerendered: {PARTIALS[element_id]} -->\n{html}\n<!-- /prerendered -->\n</div>'
+        )
+
+    return PLACEHOLDER_RE.sub(fill, content)
+
+def process_file(filepath, partials):
+    with open(filepath, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    new_content = prerender(content, filepath, partials)
+    if new_content != content:
+        with open(filepath, 'w', encoding='utf-8') as f:
+            f.write(new_content)
+        print(f"Prerendered {filepath}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Inline the navbar/footer partials into #central-nav and #central-foot.",
+    )
+    add_jobs_argument(parser)
+    parser.add_argument("paths", nargs="*", help="pages to prerender (default: every page)")
+    args = parser.parse_args(argv)
+
+    partials = load_partials()
+    paths = args.paths or walk_files(".", ".html", skip=is_skipped_dir)
+    results = run_batch(functools.partial(process_file, partials=partials), paths, jobs=args.jobs)
+    return 1 if count_errors(results) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+import contextlib
+import json
+import time
+
+class FileProfile:
+    """Wall time per phase, bytes in/out and per-rule hits/time for one file.
+
+    Built inside the worker that processes the file and returned as a
+    plain dict (to_dict) so it can travel back through run_batch.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.phases = {}
+        # name -> [hits, seconds]
+        self.rules = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def add_rule(self, name, hits, seconds):
+        entry = self.rules.setdefault(name, [0, 0.0])
+        entry[0] += hits
+        entry[1] += seconds
+
+    def to_dict(self):
+        return {
+            "path": self.path,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "phases": self.phases,
+            "rules": {name: {"hits": hits, "seconds": seconds} for name, (hits, seconds) in self.rules.items()},
+        }
+
+@contextlib.contextmanager
+def measure(profile, name):
+    # with measure(profile, "img") as hits: hits[0] += n
+    # A no-op when profile is None, so instrumented code costs nothing normally.
+    hits = [0]
+    if profile is None:
+        yield hits
+        return
+    start = time.perf_counter()
+    try:
+        yield hits
+    finally:
+        profile.add_rule(name, hits[0], time.perf_counter() - start)
+
+def phase(profile, name):
+    return profile.phase(name) if profile is not None else contextlib.nullcontext()
+
+def add_profile_argument(parser, script):
+    default = f"profile-{script}.json"
+    parser.add_argument(
+        "--profile", nargs="?", const=default, metavar="REPORT",
+        help=f"record per-file phase times and per-rule hits to REPORT (default: {default}) "
+             "plus a .folded flamegraph file next to it",
+    )
+
+def build_report(script, file_profiles, rule_names=()):
+    phases = {}
+    rules = {name: {"hits": 0, "seconds": 0.0} for name in rule_names}
+    for profile in file_profiles:
+        for name, seconds in profile["phases"].items():
+            phases[name] = phases.get(name, 0.0) + seconds
+        for name, rule in profile["rules"].items():
+            entry = rules.setdefault(name, {"hits": 0, "seconds": 0.0})
+            entry["hits"] += rule["hits"]
+            entry["seconds"] += rule["seconds"]
+    return {
+        "script": script,
+        "files": file_profiles,
+        "bytes_in": sum(p["bytes_in"] for p in file_profiles),
+        "bytes_out": sum(p["bytes_out"] for p in file_profiles),
+        "phases": phases,
+        "rules": dict(sorted(rules.items(), key=lambda item: -item[1]["seconds"])),
+        "never_fired": sorted(name for name, entry in rules.items() if not entry["hits"]),
+    }
+
+def folded_lines(report):
+    """Collapsed-stack lines ("script;phase;rule microseconds") for flamegraph.pl / speedscope.
+
+    Rule time is shown under the transform phase; the rest of that phase
+    is the time spent outside any rule.
+    """
+    script = report["script"]
+    rule_total = sum(entry["seconds"] for entry in report["rules"].values())
+    lines = []
+    for name, seconds in report["phases"].items():
+        if name == "transform":
+            seconds -= rule_total
+        if seconds > 0:
+            lines.append(f"{script};{name} {round(seconds * 1e6)}")
+    for name, entry in report["rules"].items():
+        if entry["seconds"] > 0:
+            lines.append(f"{script};transform;{name.replace(';', ',').replace(' ', '_')} {round(entry['seconds'] * 1e6)}")
+    return lines
+
+def write_report(path, script, results, rule_names=()):
+    # results: BatchResults whose result is a FileProfile dict (or None when skipped)
+    report = build_report(script, [r.result for r in results if r.result], rule_names)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
+    folded_path = path.rsplit(".", 1)[0] + ".folded"
+    with open(folded_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(folded_lines(report)) + "\n")
+
+    print(f"\nProfile of {len(report['files'])} files written to {path} and {folded_path}")
+    for name, seconds in sorted(report["phases"].items(), key=lambda item: -item[1]):
+        print(f"  {name:<12} {seconds:>9.3f}s")
+    print("  Slowest rules:")
+    for name, entry in list(report["rules"].items())[:10]:
+        print(f"    {name:<28} {entry['hits']:>7} hits {entry['seconds'] * 1000:>9.2f} ms")
+    if report["never_fired"]:
+        print(f"  Never fired: {', '.join(report['never_fired'])}")
+    return report
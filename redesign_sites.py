@@ -1,6 +1,16 @@
+import argparse
+import functools
 import os
+import sys
+
 from bs4 import BeautifulSoup
 
+import responsive_images
+from batch import add_jobs_argument, count_errors, run_batch, walk_files
+from build_manifest import BuildManifest, add_force_argument, record_results, script_version, skip_unchanged
+from profiling import FileProfile, add_profile_argument, measure, phase, write_report
+from responsive_images import add_responsive_images
+
 ROOT_DIR = "sites"
 
 TEMPLATE = """<!DOCTYPE html>
@@ -83,15 +93,17 @@ TEMPLATE = """<!DOCTYPE html>
 </body>
 </html>"""
 
-def process_file(filepath):
-    with open(filepath, 'r') as f:
-        soup = BeautifulSoup(f, 'html.parser')
-
+def find_detail(soup, filepath, reconvert=False):
     detail = soup.find(id="detail")
     
     # Fallback for already redesigned pages
     if not detail:
         content_body = soup.find(class_="content-body")
+        if content_body and not reconvert:
+            # Re-templating a page is not idempotent (the first heading of its
+            # content becomes the period, .content-body nests), so only on request
+            print(f"Skipping {filepath}: already redesigned (--reconvert re-templates it)")
+            return None
         if content_body:
             print(f"Found .content-body in {filepath}, using fallback extraction.")
             # Create a dummy detail object to standardize processing
@@ -121,75 +133,158 @@ def process_file(filepath):
                     detail.insert(2, h4)
         else:
             print(f"Skipping {filepath}: No #detail or .content-body found")
-            return
-
-    # Extract Title (h1)
-    h1 = detail.find('h1')
-    title = h1.get_text(strip=True) if h1 else "Unknown Site"
-    if h1: h1.decompose()
-
-    # Extract Period (first h3 usually)
-    h3 = detail.find('h3')
-    period = h3.get_text(strip=True) if h3 else ""
-    if h3: h3.decompose()
-
-    # Extract Researcher (h4)
-    h4 = detail.find('h4')
-    researcher = h4.get_text(strip=True) if h4 else ""
-    if h4: h4.decompose()
-
-    # Fix images: Tailwind responsive images
-    for img in detail.find_all('img'):
-        # Add Tailwind classes
-        current_classes = img.get('class', [])
-        new_classes = ['w-full', 'h-auto', 'rounded-2xl', 'mb-8', 'shadow-lg']
-        img['class'] = list(set(current_classes + new_classes))
-        
-        # Remove width/height attributes to let CSS handle it
-        if img.has_attr('width'): del img['width']
-        if img.has_attr('height'): del img['height']
-        
-    # Fix figures
-    for figure in detail.find_all('figure'):
-        figure['class'] = figure.get('class', []) + ['w-full', 'mb-8']
-        # Remove inline styles that float
-        if figure.has_attr('style'): del figure['style']
-        
-    for figcaption in detail.find_all('figcaption'):
-        figcaption['class'] = figcaption.get('class', []) + ['text-sm', 'text-gray-500', 'mt-3', 'italic', 'text-center']
-
-    # Fix HRs
-    for hr in detail.find_all('hr'):
-        hr['class'] = hr.get('class', []) + ['my-10', 'border-gray-100']
-
-    # Fix Headers in content
-    for h in detail.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
-        h['class'] = h.get('class', []) + ['font-bold', 'text-gray-900', 'mt-10', 'mb-6']
-        if h.name == 'h3': h['class'].append('text-2xl')
-
-    content = detail.decode_contents()
-
-    # Calculate depth
+            return None
+    return detail
+
+def page_depth(filepath):
+    # "../" for every directory between the repository root and the page
     rel_path = os.path.relpath(filepath, ".")
-    depth = "../" * rel_path.count(os.sep)
-
-    new_html = TEMPLATE.format(
-        title=title,
-        period=period,
-        researcher=researcher,
-        content=content,
-        depth=depth
+    return "../" * rel_path.count(os.sep)
+
+# Fix-ups --profile reports on, in the order render_page applies them
+FIXUP_NAMES = ("extract title/period/researcher", "img", "images", "figure", "figcaption", "hr", "headings")
+
+def render_page(text, filepath, images=True, profile=None, reconvert=False):
+    # Returns the re-templated page, or None if it has no content to move over
+    # (or was redesigned already and reconvert is off).
+    # profile (a FileProfile) collects parse/transform/serialize time and per fix-up hits.
+    with phase(profile, "parse"):
+        soup = BeautifulSoup(text, 'html.parser')
+    with phase(profile, "transform"):
+        detail = find_detail(soup, filepath, reconvert)
+        if detail is None:
+            return None
+
+        with measure(profile, "extract title/period/researcher") as hits:
+            # Extract Title (h1)
+            h1 = detail.find('h1')
+            title = h1.get_text(strip=True) if h1 else "Unknown Site"
+            if h1: h1.decompose()
+
+            # Extract Period (first h3 usually)
+            h3 = detail.find('h3')
+            period = h3.get_text(strip=True) if h3 else ""
+            if h3: h3.decompose()
+
+            # Extract Researcher (h4)
+            h4 = detail.find('h4')
+            researcher = h4.get_text(strip=True) if h4 else ""
+            if h4: h4.decompose()
+            hits[0] = sum(1 for tag in (h1, h3, h4) if tag)
+
+        # Fix images: Tailwind responsive images
+        with measure(profile, "img") as hits:
+            for img in detail.find_all('img'):
+                hits[0] += 1
+                # Add Tailwind classes
+                current_classes = img.get('class', [])
+                new_classes = ['w-full', 'h-auto', 'rounded-2xl', 'mb-8', 'shadow-lg']
+                # dict.fromkeys dedupes like set() but keeps a stable order across processes
+                img['class'] = list(dict.fromkeys(current_classes + new_classes))
+                
+                # Remove width/height attributes to let CSS handle it
+                # (the image stage puts back the real size of local images)
+                if img.has_attr('width'): del img['width']
+                if img.has_attr('height'): del img['height']
+
+        if images:
+            with measure(profile, "images") as hits:
+                hits[0] = len(detail.find_all('img'))
+                add_responsive_images(soup, detail, filepath)
+            
+        # Fix figures
+        with measure(profile, "figure") as hits:
+            for figure in detail.find_all('figure'):
+                hits[0] += 1
+                figure['class'] = figure.get('class', []) + ['w-full', 'mb-8']
+                # Remove inline styles that float
+                if figure.has_attr('style'): del figure['style']
+            
+        with measure(profile, "figcaption") as hits:
+            for figcaption in detail.find_all('figcaption'):
+                hits[0] += 1
+                figcaption['class'] = figcaption.get('class', []) + ['text-sm', 'text-gray-500', 'mt-3', 'italic', 'text-center']
+
+        # Fix HRs
+        with measure(profile, "hr") as hits:
+            for hr in detail.find_all('hr'):
+                hits[0] += 1
+                hr['class'] = hr.get('class', []) + ['my-10', 'border-gray-100']
+
+        # Fix Headers in content
+        with measure(profile, "headings") as hits:
+            for h in detail.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6']):
+                hits[0] += 1
+                h['class'] = h.get('class', []) + ['font-bold', 'text-gray-900', 'mt-10', 'mb-6']
+                if h.name == 'h3': h['class'].append('text-2xl')
+
+    with phase(profile, "serialize"):
+        content = detail.decode_contents()
+
+        return TEMPLATE.format(
+            title=title,
+            period=period,
+            researcher=researcher,
+            content=content,
+            depth=page_depth(filepath)
+        )
+
+def process_file(filepath, images=True, profile=False, reconvert=False):
+    # With profile, returns the file's FileProfile as a dict
+    file_profile = FileProfile(filepath) if profile else None
+    with phase(file_profile, "read"):
+        with open(filepath, 'r') as f:
+            text = f.read()
+
+    new_html = render_page(text, filepath, images, file_profile, reconvert)
+    if new_html is not None:
+        with phase(file_profile, "write"):
+            with open(filepath, 'w') as f:
+                f.write(new_html)
+        print(f"Redesigned {filepath}")
+
+    if file_profile is None:
+        return None
+    file_profile.bytes_in = len(text.encode('utf-8'))
+    file_profile.bytes_out = len(new_html.encode('utf-8')) if new_html is not None else 0
+    return file_profile.to_dict()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-template site pages with the Tailwind layout.")
+    add_jobs_argument(parser)
+    add_force_argument(parser)
+    parser.add_argument(
+        "--no-images", dest="images", action="store_false",
+        help="skip resizing local images into images/derived/ and adding srcset",
+    )
+    parser.add_argument(
+        "--reconvert", action="store_true",
+        help="also re-template pages that were redesigned already (not idempotent: review the diff)",
     )
+    add_profile_argument(parser, "redesign_sites")
+    args = parser.parse_args(argv)
 
-    with open(filepath, 'w') as f:
-        f.write(new_html)
-    print(f"Redesigned {filepath}")
+    # generate_pages imports this module, and the pages it builds from content/ are its to rewrite
+    from generate_pages import load_records
+    generated = set(load_records())
+    paths = [
+        path for path in walk_files(ROOT_DIR, ".html")
+        if "aa-template" not in os.path.dirname(path).lower() and os.path.normpath(path) not in generated
+    ]
+    version = script_version(
+        __file__, responsive_images.__file__, TEMPLATE, f"images={args.images}",
+        f"reconvert={args.reconvert}",
+    )
+    manifest = BuildManifest("redesign_sites", version)
+    paths = skip_unchanged(manifest, paths, force=args.force)
 
-def main():
-    for root, dirs, files in os.walk(ROOT_DIR):
-        for file in files:
-            if file.endswith(".html") and "aa-template" not in root:
-                process_file(os.path.join(root, file))
+    process = functools.partial(process_file, images=args.images, profile=bool(args.profile), reconvert=args.reconvert)
+    results = run_batch(process, paths, jobs=args.jobs)
+    record_results(manifest, results)
+    if args.profile:
+        fixups = [name for name in FIXUP_NAMES if args.images or name != "images"]
+        write_report(args.profile, "redesign_sites", results, fixups)
+    return 1 if count_errors(results) else 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
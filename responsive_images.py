@@ -0,0 +1,129 @@
+import os
+import urllib.parse
+
+from build_manifest import file_hash
+
+try:
+    from PIL import Image, ImageOps
+except ImportError: # Pillow is optional, without it images only get lazy loading
+    Image = None
+
+# Derivatives are named after the source's content hash, so an unchanged
+# image is never resized twice and copies of the same file share them.
+# Relative to the site root, like the pages: GitHub Pages serves them from
+# there, so they are committed along with the pages that use them.
+DERIVED_DIR = os.path.join("images", "derived")
+WIDTHS = (480, 960, 1440)
+WEBP_QUALITY = 80
+JPEG_QUALITY = 82
+# Width of the content column in the site template (lg:col-span-8 of the container)
+SIZES = "(min-width: 1024px) 66vw, 100vw"
+RESIZABLE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+def local_source(src, filepath):
+    # Path of a page-relative image on disk, or None for remote/missing images
+    src = src.strip().strip('“”')
+    if not src or '://' in src or src.startswith(('//', 'data:')):
+        return None
+    path = urllib.parse.unquote(src.split('?', 1)[0].split('#', 1)[0])
+    path = os.path.normpath(os.path.join(os.path.dirname(filepath), path))
+    if not path.lower().endswith(RESIZABLE_EXTENSIONS) or not os.path.isfile(path):
+        return None
+    return path
+
+def _save(image, path, fmt, **options):
+    # Parallel runs may build the same derivative: write aside, then swap in
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    image.save(tmp_path, fmt, **options)
+    os.replace(tmp_path, path)
+
+def build_derivatives(source, derived_dir=DERIVED_DIR):
+    """Resize source to each of WIDTHS narrower than it, as WebP and as a fallback.
+
+    The fallback is JPEG, or PNG when the source has transparency.
+    Returns (width, height, {"webp": [(path, w)], "fallback": [(path, w)]})
+    with the intrinsic (EXIF-rotated) size of the source.
+    """
+    digest = file_hash(source)[:16]
+    out_dir = os.path.join(derived_dir, digest)
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        width, height = image.size
+        alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        fallback_ext, fallback_fmt = ('png', 'PNG') if alpha else ('jpg', 'JPEG')
+        image = image.convert('RGBA' if alpha else 'RGB')
+
+        variants = {"webp": [], "fallback": []}
+        for w in WIDTHS:
+            if w >= width:
+                break
+            webp_path = os.path.join(out_dir, f"{w}.webp")
+            fallback_path = os.path.join(out_dir, f"{w}.{fallback_ext}")
+            if not (os.path.exists(webp_path) and os.path.exists(fallback_path)):
+                os.makedirs(out_dir, exist_ok=True)
+                resized = image.resize((w, round(height * w / width)), Image.LANCZOS)
+                _save(resized, webp_path, 'WEBP', quality=WEBP_QUALITY)
+                if alpha:
+                    _save(resized, fallback_path, fallback_fmt, optimize=True)
+                else:
+                    _save(resized, fallback_path, fallback_fmt, quality=JPEG_QUALITY, optimize=True, progressive=True)
+            variants["webp"].append((webp_path, w))
+            variants["fallback"].append((fallback_path, w))
+    return width, height, variants
+
+def _srcset(candidates, filepath):
+    page_dir = os.path.dirname(filepath)
+    return ", ".join(
+        f"{urllib.parse.quote(os.path.relpath(path, page_dir).replace(os.sep, '/'))} {w}w"
+        for path, w in candidates
+    )
+
+def _unwrap_picture(soup, img):
+    # Drop the <picture> a previous run wrapped around img, so reruns start clean
+    picture = img.parent
+    if picture is None or picture.name != 'picture':
+        return
+    for source in picture.find_all('source'):
+        source.decompose()
+    picture.unwrap()
+    for attr in ('srcset', 'sizes'):
+        if img.has_attr(attr):
+            del img[attr]
+
+def add_responsive_images(soup, detail, filepath, derived_dir=DERIVED_DIR):
+    """Give every <img> in detail lazy loading and, for local images, a srcset.
+
+    Local JPEG/PNG images get resized derivatives (see build_derivatives),
+    a <picture> with a WebP <source>, srcset/sizes on the <img> and their
+    intrinsic width/height so the browser can reserve space. The first
+    image is left to load eagerly since it is likely in the first screen.
+    """
+    for i, img in enumerate(detail.find_all('img')):
+        _unwrap_picture(soup, img)
+        img['decoding'] = 'async'
+        if i:
+            img['loading'] = 'lazy'
+        elif img.has_attr('loading'):
+            del img['loading']
+
+        source = local_source(img.get('src', ''), filepath)
+        if source is None or Image is None:
+            continue
+        try:
+            width, height, variants = build_derivatives(source, derived_dir)
+        except (OSError, ValueError) as e:
+            print(f"Could not resize {source} for {filepath}: {e}")
+            continue
+        img['width'] = str(width)
+        img['height'] = str(height)
+        if not variants["webp"]:
+            continue # Already smaller than the narrowest derivative
+
+        original = (source, width)
+        img['srcset'] = _srcset(variants["fallback"] + [original], filepath)
+        img['sizes'] = SIZES
+        picture = soup.new_tag('picture')
+        img.wrap(picture)
+        picture.insert(0, soup.new_tag(
+            'source', attrs={'type': 'image/webp', 'srcset': _srcset(variants["webp"], filepath), 'sizes': SIZES},
+        ))
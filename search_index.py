@@ -0,0 +1,272 @@
+import argparse
+import json
+import math
+import os
+import re
+import shutil
+import sys
+import unicodedata
+
+from bs4 import BeautifulSoup
+
+from batch import walk_files
+from compile_sites import CSV_PATH, OUT_DIR, load_sites, write_json
+from redesign_sites import ROOT_DIR
+
+SEARCH_DIR = os.path.join(OUT_DIR, "search")
+DOCS_NAME = "docs.json"
+SHARDS_DIR = "terms"
+# Terms are sharded on their first characters; the widget fetches one shard per query term
+PREFIX_LENGTH = 2
+MIN_TERM_LENGTH = 2
+INDEX_VERSION = 1
+# Okapi BM25
+K1 = 1.2
+B = 0.75
+
+# Not indexed, but still counted in positions so phrase matches stay exact
+STOPWORDS = frozenset("""
+a an and are as at be been but by for from had has have he her his in into is it its of on or
+she that the their there these they this to was were which who with
+""".split())
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+COMBINING_RE = re.compile("[\u0300-\u036f]")
+# (suffix, minimum word length, replacement), first match wins. Kept small
+# so js/search.js can do exactly the same to queries.
+STEM_RULES = (
+    ("ies", 5, "y"),
+    ("sses", 5, "ss"),
+    ("ches", 5, "ch"),
+    ("shes", 5, "sh"),
+    ("xes", 4, "x"),
+    ("ss", 0, "ss"),
+    ("us", 0, "us"),
+    ("is", 0, "is"),
+    ("s", 4, ""),
+    ("ing", 6, ""),
+    ("ed", 5, ""),
+)
+
+# All of this has to match js/search.js, which tokenizes queries the same way
+
+def normalize(text):
+    # Lowercase without accents: "Kôm" -> "kom"
+    return COMBINING_RE.sub("", unicodedata.normalize("NFKD", text)).lower()
+
+def stem(word):
+    for suffix, min_length, replacement in STEM_RULES:
+        if word.endswith(suffix):
+            if len(word) >= min_length:
+                return word[:len(word) - len(suffix)] + replacement
+            return word
+    return word
+
+def tokenize(text):
+    # [(position, term)] for the indexed words of text
+    return [
+        (position, stem(word))
+        for position, word in enumerate(TOKEN_RE.findall(normalize(text)))
+        if len(word) >= MIN_TERM_LENGTH and word not in STOPWORDS
+    ]
+
+def shard_key(term):
+    return term[:PREFIX_LENGTH]
+
+def is_template_dir(path):
+    # The template page is not a site
+    return os.path.basename(path).lower() == "aa-template"
+
+def text_of(tag):
+    return " ".join(tag.get_text(" ").split()) if tag else ""
+
+def extract_document(text, url, site=None):
+    """Title, period and searchable text of one page.
+
+    Only the page's own content is read: .content-body and its header on
+    redesigned pages, #detail on the older ones, not the navbar or
+    footer. Name and period from sites-popup.csv win over the page's.
+    """
+    soup = BeautifulSoup(text, "html.parser")
+    # Nothing outside #detail belongs to an older page
+    detail = soup.find(id="detail")
+    scope = detail or soup
+    header = scope.find("header")
+    # A stub page with only its header has no content to add
+    body = scope.find(class_="content-body") or detail or header or soup.body or soup
+    h1 = (header or body).find("h1") or scope.find("h1")
+    title = site["name"] if site else text_of(h1) or os.path.splitext(os.path.basename(url))[0]
+    period = site["period"] if site else ""
+    return {
+        "url": url,
+        "title": title,
+        "period": period,
+        "text": " ".join(part for part in (title, period, text_of(header), text_of(body)) if part),
+    }
+
+def load_documents(root=ROOT_DIR, csv_path=CSV_PATH):
+    sites = {}
+    if os.path.exists(csv_path):
+        for site in load_sites(csv_path)[0]:
+            sites[os.path.normpath(site["link"])] = site
+    documents = []
+    for path in walk_files(root, ".html", skip=is_template_dir):
+        with open(path, "r", encoding="utf-8") as f:
+            text = f.read()
+        url = os.path.relpath(path, ".").replace(os.sep, "/")
+        documents.append(extract_document(text, url, sites.get(os.path.normpath(path))))
+    return documents
+
+def build_index(documents):
+    """Inverted index of documents as (docs, shards).
+
+    docs is the list of {url, title, period, length}, its position being
+    the document id. shards maps a shard key to {term: postings}, where
+    postings is [[doc id, first position, gap, gap, ...], ...] sorted by
+    document id; positions are delta encoded to keep the JSON small.
+    """
+    docs, postings = [], {}
+    for doc_id, document in enumerate(documents):
+        tokens = tokenize(document["text"])
+        docs.append({"url": document["url"], "title": document["title"], "period": document["period"],
+                     "length": len(tokens)})
+        positions = {}
+        for position, term in tokens:
+            positions.setdefault(term, []).append(position)
+        for term, term_positions in positions.items():
+            gaps = [term_positions[0]] + [b - a for a, b in zip(term_positions, term_positions[1:])]
+            postings.setdefault(term, []).append([doc_id] + gaps)
+
+    shards = {}
+    for term in sorted(postings):
+        shards.setdefault(shard_key(term), {})[term] = postings[term]
+    return docs, shards
+
+def write_index(docs, shards, out_dir=SEARCH_DIR):
+    # Written next to out_dir and swapped in, so a reader never sees half an index
+    tmp_dir = out_dir + ".tmp"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+    os.makedirs(os.path.join(tmp_dir, SHARDS_DIR))
+    for key, terms in shards.items():
+        write_json(os.path.join(tmp_dir, SHARDS_DIR, f"{key}.json"), terms)
+    write_json(os.path.join(tmp_dir, DOCS_NAME), {
+        "version": INDEX_VERSION,
+        "prefix_length": PREFIX_LENGTH,
+        "average_length": round(sum(doc["length"] for doc in docs) / len(docs), 2) if docs else 0,
+        "shards": sorted(shards),
+        "docs": docs,
+    })
+    if os.path.exists(out_dir):
+        shutil.rmtree(out_dir)
+    os.replace(tmp_dir, out_dir)
+
+class SearchIndex:
+    """Reads an index from disk shard by shard, the way js/search.js does in the browser."""
+
+    def __init__(self, index_dir=SEARCH_DIR):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, DOCS_NAME), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.shards = {}
+
+    def terms(self, key):
+        # {term: postings} of one shard, fetched on first use
+        if key not in self.shards:
+            terms = {}
+            if key in self.meta["shards"]:
+                with open(os.path.join(self.index_dir, SHARDS_DIR, f"{key}.json"), "r", encoding="utf-8") as f:
+                    terms = json.load(f)
+            self.shards[key] = terms
+        return self.shards[key]
+
+    def search(self, query, limit=10, prefix=False):
+        """Documents holding every query term, best BM25 score first.
+
+        Quoted parts of the query have to appear as a phrase. With prefix
+        (search as you type) a last word the query ends on also matches
+        every term it is the start of.
+        """
+        docs = self.meta["docs"]
+        phrases = [tokenize(phrase) for phrase in re.findall(r'"([^"]*)"', query)]
+        text = normalize(query.replace('"', " "))
+        words = TOKEN_RE.findall(text)
+        tokens = tokenize(text)
+
+        # slot -> terms that fill it; a document needs one of them for every slot
+        slots = {}
+        completing = words[-1] if prefix and words and text.endswith(words[-1]) else None
+        if completing and tokens and tokens[-1][0] == len(words) - 1:
+            tokens = tokens[:-1]
+        for _, term in tokens:
+            slots[term] = [term]
+        if completing and len(completing) >= PREFIX_LENGTH:
+            expanded = {term for term in self.terms(shard_key(completing)) if term.startswith(completing)}
+            # A finished word may stem to something it is not the start of: cemeteries -> cemetery
+            stemmed = stem(completing)
+            if stemmed in self.terms(shard_key(stemmed)):
+                expanded.add(stemmed)
+            if expanded or completing not in STOPWORDS:
+                slots[completing + "*"] = sorted(expanded)
+        if not slots:
+            return []
+
+        # slot -> {doc id: [positions]}
+        matches = {}
+        for slot, terms in slots.items():
+            found = matches[slot] = {}
+            for term in terms:
+                for posting in self.terms(shard_key(term)).get(term, []):
+                    positions, position = found.setdefault(posting[0], []), 0
+                    for gap in posting[1:]:
+                        position += gap
+                        positions.append(position)
+        candidates = set.intersection(*(set(found) for found in matches.values()))
+        for phrase in phrases:
+            candidates = {doc_id for doc_id in candidates if has_phrase(phrase, matches, doc_id)}
+
+        results = []
+        for doc_id in candidates:
+            length_norm = 1 - B + B * docs[doc_id]["length"] / (self.meta["average_length"] or 1)
+            score = 0.0
+            for found in matches.values():
+                tf = len(found[doc_id])
+                idf = math.log(1 + (len(docs) - len(found) + 0.5) / (len(found) + 0.5))
+                score += idf * tf * (K1 + 1) / (tf + K1 * length_norm)
+            results.append((score, doc_id))
+        results.sort(key=lambda item: (-item[0], item[1]))
+        return [dict(docs[doc_id], score=round(score, 4)) for score, doc_id in results[:limit]]
+
+def has_phrase(phrase, matches, doc_id):
+    # phrase is [(position, term)]; every term has to sit at the same offset from the first
+    if not phrase:
+        return True
+    first_position = phrase[0][0]
+    starts = set(matches[phrase[0][1]][doc_id])
+    for position, term in phrase[1:]:
+        offset = position - first_position
+        starts &= {p - offset for p in matches[term][doc_id]}
+    return bool(starts)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=f"Build the full-text search index of the site pages into {SEARCH_DIR}/.",
+    )
+    parser.add_argument("--out", default=SEARCH_DIR)
+    parser.add_argument("--query", help="search the index in --out instead of building it")
+    parser.add_argument("--prefix", action="store_true", help="treat the last word of --query as typed so far")
+    args = parser.parse_args(argv)
+
+    if args.query:
+        for result in SearchIndex(args.out).search(args.query, prefix=args.prefix):
+            print(f"{result['score']:>8.3f}  {result['title']}  ({result['url']})")
+        return 0
+
+    docs, shards = build_index(load_documents())
+    write_index(docs, shards, args.out)
+    size = sum(os.path.getsize(os.path.join(args.out, SHARDS_DIR, f"{key}.json")) for key in shards)
+    terms = sum(len(terms) for terms in shards.values())
+    print(f"Indexed {len(docs)} pages, {terms} terms in {len(shards)} shards ({size / 1024:.0f} KiB) into {args.out}/")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""Static server for previewing the site, and the server the test suite runs against.
+
+Unlike python -m http.server it serves the .gz/.br siblings
+compress_assets.py writes to clients that accept them, answers range
+requests, and sends cache headers: assets named in the fingerprint
+manifest are immutable, everything else is revalidated with its ETag.
+"""
+import argparse
+import email.utils
+import functools
+import io
+import json
+import os
+import posixpath
+import re
+import sys
+import urllib.parse
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+from compress_assets import ENCODINGS
+from fingerprint_assets import DIST_DIR, MANIFEST_NAME
+
+DEFAULT_PORT = 8000
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+# Cached, but checked with the server before every use
+REVALIDATE_CACHE = "no-cache"
+RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)$')
+
+def load_immutable(directory):
+    # URL paths of the fingerprinted assets, from the manifest fingerprint_assets.py wrote
+    path = os.path.join(directory, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return frozenset()
+    with open(path, 'r', encoding='utf-8') as f:
+        return frozenset("/" + hashed for hashed in json.load(f).values())
+
+def parse_accept_encoding(header):
+    # {coding: q} of an Accept-Encoding header
+    accepted = {}
+    for item in (header or "").split(","):
+        coding, _, params = item.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        match = re.search(r'q=([\d.]+)', params)
+        if match:
+            try:
+                q = float(match.group(1))
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+def choose_encoding(header, available):
+    """The best of available (encodings in order of preference) the client accepts, or None."""
+    accepted = parse_accept_encoding(header)
+    best, best_q = None, 0.0
+    for encoding in available:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+def parse_range(header, size):
+    """(start, end) inclusive of a single "bytes=" range, or None to send the whole file.
+
+    Raises ValueError when the range lies outside the file. Multiple
+    ranges are answered with the whole file, which HTTP allows.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        length = int(last) # The last length bytes
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end
+
+class SiteRequestHandler(SimpleHTTPRequestHandler):
+    # Fixed types for what the site serves, whatever the system's mime.types says
+    extensions_map = dict(SimpleHTTPRequestHandler.extensions_map, **{
+        ".csv": "text/csv", ".json": "application/json", ".js": "text/javascript", ".svg": "image/svg+xml",
+        ".webp": "image/webp", ".woff2": "font/woff2",
+    })
+
+    def __init__(self, *args, immutable=frozenset(), quiet=False, **kwargs):
+        self.immutable = immutable
+        self.quiet = quiet
+        super().__init__(*args, **kwargs)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+    def end_headers(self):
+        self.send_header("Accept-Ranges", "bytes")
+        super().end_headers()
+
+    def send_head(self):
+        path = self.translate_path(self.path)
+        url_path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        if os.path.isdir(path):
+            index = os.path.join(path, "index.html")
+            if not url_path.endswith("/") or not os.path.isfile(index):
+                return super().send_head() # The redirect to "dir/" or a listing
+            path, url_path = index, posixpath.join(url_path, "index.html")
+        if path.endswith("/") or not os.path.isfile(path):
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+
+        stat = os.stat(path)
+        available = [
+            (encoding, path + suffix) for encoding, suffix in ENCODINGS
+            # A sibling older than its file is left over from a previous build
+            if os.path.isfile(path + suffix) and os.stat(path + suffix).st_mtime >= stat.st_mtime
+        ]
+        encoding = choose_encoding(self.headers.get("Accept-Encoding"), [e for e, _ in available])
+        body_path = dict(available)[encoding] if encoding else path
+        body_stat = os.stat(body_path) if encoding else stat
+        size = body_stat.st_size
+        # Each representation has its own ETag, as ranges and caches depend on the exact bytes
+        etag = f'"{body_stat.st_mtime_ns:x}-{size:x}{"-" + encoding if encoding else ""}"'
+
+        def send_headers(status, length=None):
+            self.send_response(status)
+            self.send_header("Content-Type", self.guess_type(path))
+            if encoding:
+                self.send_header("Content-Encoding", encoding)
+            if available:
+                self.send_header("Vary", "Accept-Encoding")
+            if length is not None:
+                self.send_header("Content-Length", str(length))
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", self.date_time_string(stat.st_mtime))
+            self.send_header("Cache-Control", IMMUTABLE_CACHE if url_path in self.immutable else REVALIDATE_CACHE)
+
+        if self.not_modified(etag, stat.st_mtime):
+            send_headers(HTTPStatus.NOT_MODIFIED)
+            self.end_headers()
+            return None
+
+        byte_range = None
+        if_range = self.headers.get("If-Range")
+        if if_range is None or if_range.strip() == etag:
+            try:
+                byte_range = parse_range(self.headers.get("Range"), size)
+            except ValueError:
+                self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+                self.send_header("Content-Range", f"bytes */{size}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return None
+
+        f = open(body_path, 'rb')
+        if byte_range is None:
+            send_headers(HTTPStatus.OK, size)
+            self.end_headers()
+            return f
+        start, end = byte_range
+        with f:
+            f.seek(start)
+            body = f.read(end - start + 1)
+        send_headers(HTTPStatus.PARTIAL_CONTENT, len(body))
+        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        return io.BytesIO(body)
+
+    def not_modified(self, etag, mtime):
+        # If-None-Match wins over If-Modified-Since when a client sends both
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or etag in tags or f"W/{etag}" in tags
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            return since is not None and int(mtime) <= since.timestamp()
+        return False
+
+def make_server(directory, host="127.0.0.1", port=DEFAULT_PORT, quiet=False):
+    handler = functools.partial(
+        SiteRequestHandler, directory=directory, immutable=load_immutable(directory), quiet=quiet,
+    )
+    return ThreadingHTTPServer((host, port), handler)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=f"Serve a directory (the site, or {DIST_DIR}/ after fingerprint_assets.py and compress_assets.py).",
+    )
+    parser.add_argument("directory", nargs="?", default=".")
+    parser.add_argument("--bind", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"default: {DEFAULT_PORT}")
+    args = parser.parse_args(argv)
+
+    server = make_server(args.directory, args.bind, args.port)
+    host, port = server.server_address[:2]
+    print(f"Serving {os.path.abspath(args.directory)} at http://{host}:{port}/ (Ctrl+C to stop)")
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+// Offline support for the built site. service_worker.py fills in the
+// precache manifest and version below when it copies this into dist/, and
+// registers the worker from every precached page.
+//
+// Precached files are served from the cache; a new deploy downloads only
+// the files whose revision changed. Map tiles, CDN files and anything else
+// are served stale-while-revalidate from size-capped runtime caches.
+const PRECACHE_MANIFEST = [];
+const CACHE_VERSION = '';
+
+const CACHE_PREFIX = 'daea-';
+const PRECACHE = `${CACHE_PREFIX}precache-${CACHE_VERSION}`;
+const TILE_CACHE = `${CACHE_PREFIX}tiles`;
+const RUNTIME_CACHE = `${CACHE_PREFIX}runtime`;
+// Entries kept per runtime cache, least recently used dropped first
+const MAX_TILES = 600;
+const MAX_RUNTIME = 200;
+const TILE_HOST_RE = /(^|\.)tile\.openstreetmap\.org$/;
+const CDN_HOSTS = new Set(['unpkg.com', 'fonts.googleapis.com', 'fonts.gstatic.com']);
+
+const scopeURL = (path) => new URL(path, self.registration.scope).href;
+
+// Cache key of each precached URL: the revision is part of it, so an
+// unchanged file is found under the same key in the previous version's cache
+const precacheKeys = new Map(PRECACHE_MANIFEST.map(([path, revision]) => [
+    scopeURL(path), `${scopeURL(path)}?__rev=${revision}`,
+]));
+
+self.addEventListener('install', (event) => {
+    event.waitUntil((async () => {
+        const cache = await caches.open(PRECACHE);
+        await Promise.all([...precacheKeys].map(async ([url, key]) => {
+            if (await cache.match(key)) {
+                return;
+            }
+            let response = await caches.match(key);
+            if (!response) {
+                response = await fetch(url, { cache: 'no-cache' });
+                if (!response.ok) {
+                    throw new Error(`Precaching ${url} failed with HTTP ${response.status}`);
+                }
+            }
+            await cache.put(key, response);
+        }));
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', (event) => {
+    event.waitUntil((async () => {
+        const names = await caches.keys();
+        await Promise.all(names
+            .filter((name) => name.startsWith(`${CACHE_PREFIX}precache-`) && name !== PRECACHE)
+            .map((name) => caches.delete(name)));
+        await self.clients.claim();
+    })());
+});
+
+const trimCache = async (cache, maxEntries) => {
+    // Cache keys come back oldest first, and touch() moves an entry to the end
+    const keys = await cache.keys();
+    await Promise.all(keys.slice(0, Math.max(keys.length - maxEntries, 0)).map((key) => cache.delete(key)));
+};
+
+const touch = async (cache, request, response) => {
+    await cache.delete(request);
+    await cache.put(request, response);
+};
+
+const staleWhileRevalidate = async (event, cacheName, maxEntries) => {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(event.request);
+    const network = fetch(event.request).then(async (response) => {
+        // Opaque responses (status 0) are cross-origin tiles fetched without CORS
+        if (response.ok || response.type === 'opaque') {
+            await touch(cache, event.request, response.clone());
+            await trimCache(cache, maxEntries);
+        }
+        return response;
+    });
+    if (cached) {
+        event.waitUntil(network.catch(() => undefined));
+        event.waitUntil(touch(cache, event.request, cached.clone()));
+        return cached;
+    }
+    return network;
+};
+
+const precacheKey = (request) => {
+    const url = new URL(request.url);
+    url.hash = '';
+    url.search = '';
+    if (url.pathname.endsWith('/')) {
+        url.pathname += 'index.html';
+    }
+    return precacheKeys.get(url.href);
+};
+
+self.addEventListener('fetch', (event) => {
+    const { request } = event;
+    if (request.method !== 'GET') {
+        return;
+    }
+    const url = new URL(request.url);
+    const key = precacheKey(request);
+    if (key) {
+        event.respondWith(caches.open(PRECACHE)
+            .then((cache) => cache.match(key))
+            .then((cached) => cached || fetch(request)));
+    } else if (TILE_HOST_RE.test(url.hostname)) {
+        event.respondWith(staleWhileRevalidate(event, TILE_CACHE, MAX_TILES));
+    } else if (url.origin === self.location.origin || CDN_HOSTS.has(url.hostname)) {
+        event.respondWith(staleWhileRevalidate(event, RUNTIME_CACHE, MAX_RUNTIME));
+    }
+});
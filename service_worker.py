@@ -0,0 +1,134 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import sys
+
+from build_manifest import file_hash
+from fingerprint_assets import DIST_DIR, MANIFEST_NAME
+from link_index import extract_references
+from redesign_sites import page_depth
+
+SW_NAME = "service-worker.js"
+# Root-relative globs of the files a visit needs. Whatever these reference
+# that is not a page (stylesheets, scripts, images) is precached as well.
+PRECACHE_GLOBS = (
+    "index.html", "sites/**/*.html", "centralize-nav-foot/*.html", "sites-popup.csv",
+    "data/sites.geojson", "data/sites/*.json", "favicon.ico",
+)
+# Left to the runtime cache: the template page, source maps and the
+# precompressed siblings (the browser gets those through Content-Encoding)
+SKIP_RE = re.compile(r'(^|/)aa-template(/|$)|\.(map|gz|br)$', re.IGNORECASE)
+REVISION_LENGTH = 10
+MANIFEST_RE = re.compile(r'^const PRECACHE_MANIFEST = \[\];$', re.MULTILINE)
+VERSION_RE = re.compile(r"^const CACHE_VERSION = '';$", re.MULTILINE)
+REGISTER_MARKER = "navigator.serviceWorker.register"
+
+def read_text(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except UnicodeDecodeError:
+        return None # Binary files reference nothing
+
+def find_precache(dist):
+    """Sorted root-relative paths of every file to precache.
+
+    Starts from PRECACHE_GLOBS and follows references out of each file,
+    except to other pages: a page only linked to is not needed offline
+    and would drag its own stylesheets along.
+    """
+    # The unhashed copies of fingerprinted assets; pages load the hashed ones
+    unused = set()
+    if os.path.exists(os.path.join(dist, MANIFEST_NAME)):
+        with open(os.path.join(dist, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            unused = set(json.load(f))
+    pending = []
+    for pattern in PRECACHE_GLOBS:
+        for path in glob.glob(os.path.join(dist, pattern), recursive=True):
+            if os.path.isfile(path):
+                pending.append(os.path.relpath(path, dist).replace(os.sep, '/'))
+    found = set()
+    while pending:
+        path = pending.pop()
+        if path in found or path in unused or SKIP_RE.search(path):
+            continue
+        found.add(path)
+        content = read_text(os.path.join(dist, path))
+        if content is None:
+            continue
+        for target, _, _ in extract_references(path, content):
+            if not target.endswith(".html") and os.path.isfile(os.path.join(dist, target)):
+                pending.append(target)
+    return sorted(found)
+
+def precache_manifest(dist, paths):
+    # [[path, revision]] with the revision a hash of the file's content
+    return [[path, file_hash(os.path.join(dist, path))[:REVISION_LENGTH]] for path in paths]
+
+def cache_version(manifest):
+    return hashlib.sha256(json.dumps(manifest).encode('utf-8')).hexdigest()[:REVISION_LENGTH]
+
+def write_service_worker(dist, manifest):
+    path = os.path.join(dist, SW_NAME)
+    with open(path, 'r', encoding='utf-8') as f:
+        source = f.read()
+    if not MANIFEST_RE.search(source) or not VERSION_RE.search(source):
+        raise ValueError(f"{path} has no empty PRECACHE_MANIFEST/CACHE_VERSION to fill in (built twice?)")
+    version = cache_version(manifest)
+    source = MANIFEST_RE.sub(lambda m: f"const PRECACHE_MANIFEST = {json.dumps(manifest)};", source)
+    source = VERSION_RE.sub(lambda m: f"const CACHE_VERSION = '{version}';", source)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(source)
+    return version
+
+def registration_script(page):
+    # The worker sits at the root, so its scope is the whole site
+    return (f"<script>if ('serviceWorker' in navigator) "
+            f"navigator.serviceWorker.register('{page_depth(page)}{SW_NAME}');</script>\n")
+
+def register(dist, page):
+    # Adds the registration to a page, returns False if there was nothing to do
+    path = os.path.join(dist, page)
+    text = read_text(path)
+    if text is None or REGISTER_MARKER in text:
+        return False
+    end = text.lower().rfind("</body>")
+    if end < 0:
+        return False
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text[:end] + registration_script(page) + text[end:])
+    return True
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description=f"Write the precache manifest into {SW_NAME} of a built site "
+                    f"(python fingerprint_assets.py writes {DIST_DIR}/) and register the worker on its pages. "
+                    "Run it before compress_assets.py.",
+    )
+    parser.add_argument("directory", nargs="?", default=DIST_DIR)
+    args = parser.parse_args(argv)
+
+    if not os.path.isfile(os.path.join(args.directory, SW_NAME)):
+        print(f"{args.directory}/{SW_NAME} does not exist, run python fingerprint_assets.py first")
+        return 1
+    paths = find_precache(args.directory)
+    pages = [path for path in paths if path.endswith(".html") and not path.startswith("centralize-nav-foot/")]
+    # Registering changes the pages, so it has to come before they are hashed
+    registered = sum(register(args.directory, page) for page in pages)
+    manifest = precache_manifest(args.directory, paths)
+    try:
+        version = write_service_worker(args.directory, manifest)
+    except ValueError as e:
+        print(e)
+        return 1
+
+    size = sum(os.path.getsize(os.path.join(args.directory, path)) for path in paths)
+    print(f"Precache {version}: {len(paths)} files ({size / 1024:.0f} KiB before compression), "
+          f"worker registered on {registered} pages")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+import base64
+import functools
+import mimetypes
+import os
+import threading
+import urllib.parse
+
+import pytest
+
+from serve import make_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Copies of the CDN files the pages load (Leaflet 1.9.4, markercluster 1.4.1),
+# laid out by host and path. Exact copies rather than the old js/leaflet.js,
+# so the pages' SRI hashes match.
+CDN_DIR = os.path.join(ROOT, "tests", "vendor")
+CDN_HOSTS = {"unpkg.com"}
+TILE_HOSTS = {"tile.openstreetmap.org", "a.tile.openstreetmap.org", "b.tile.openstreetmap.org", "c.tile.openstreetmap.org"}
+FONT_HOSTS = {"fonts.googleapis.com", "fonts.gstatic.com"}
+# 1x1 transparent PNG for every map tile
+STUB_TILE = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--update-perf-baseline", action="store_true",
+        help="record the measured page metrics in tests/perf_baseline.json instead of checking them",
+    )
+
+@pytest.fixture(scope="session")
+def site_server():
+    """Serve the repository on an ephemeral port for the whole session, with serve.py.
+
+    Each pytest-xdist worker is its own session, so every worker gets
+    its own server and port.
+    """
+    server = make_server(ROOT, port=0, quiet=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture(scope="session")
+def base_url(site_server):
+    # pytest-playwright resolves page.goto("index.html") against this
+    return site_server
+
+def cdn_path(url):
+    parts = urllib.parse.urlsplit(url)
+    return os.path.join(CDN_DIR, parts.netloc, *parts.path.lstrip("/").split("/"))
+
+def serve_cdn(route):
+    path = cdn_path(route.request.url)
+    if not os.path.isfile(path):
+        # Not vendored: fail like an unreachable CDN rather than going online
+        route.abort()
+        return
+    content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    route.fulfill(path=path, content_type=content_type, headers={"access-control-allow-origin": "*"})
+
+def handle_route(site_url, route):
+    url = route.request.url
+    host = urllib.parse.urlsplit(url).hostname or ""
+    if url.startswith(site_url):
+        route.continue_()
+    elif host in CDN_HOSTS:
+        serve_cdn(route)
+    elif host in TILE_HOSTS:
+        route.fulfill(body=STUB_TILE, content_type="image/png")
+    elif host in FONT_HOSTS:
+        route.fulfill(body="", content_type="text/css" if host == "fonts.googleapis.com" else "font/woff2")
+    else:
+        # Nothing else should leave the machine during the tests
+        route.abort()
+
+@pytest.fixture
+def context(context, site_server):
+    # Overrides pytest-playwright's context so every page runs offline
+    context.route("**/*", functools.partial(handle_route, site_server))
+    yield context
@@ -0,0 +1,40 @@
+from batch import run_batch
+
+
+def shout(path):
+    # Module level so the process pool can pickle it
+    if path.startswith("bad"):
+        raise ValueError(f"cannot read {path}")
+    print(f"processing {path}")
+    return path.upper()
+
+
+def run(capsys, paths, jobs):
+    results = run_batch(shout, paths, jobs=jobs)
+    return results, capsys.readouterr().out
+
+
+def test_parallel_run_matches_serial_run(capsys):
+    paths = [f"page{i}.html" for i in range(20)]
+    paths[3] = "bad3.html"
+    paths[11] = "bad11.html"
+
+    serial, serial_out = run(capsys, paths, jobs=1)
+    parallel, parallel_out = run(capsys, paths, jobs=4)
+
+    assert [(r.path, r.result, r.error) for r in parallel] == [(r.path, r.result, r.error) for r in serial]
+    assert parallel_out == serial_out
+    assert [r.path for r in parallel] == paths
+    assert parallel[0].output == "processing page0.html\n"
+
+
+def test_worker_exception_is_reported(capsys):
+    for jobs in (1, 2):
+        results, out = run(capsys, ["page0.html", "bad1.html", "page2.html"], jobs=jobs)
+        assert [r.result for r in results] == ["PAGE0.HTML", None, "PAGE2.HTML"]
+        assert results[1].error == "ValueError: cannot read bad1.html"
+        assert out.splitlines() == [
+            "processing page0.html",
+            "Error processing bad1.html: ValueError: cannot read bad1.html",
+            "processing page2.html",
+        ]
@@ -0,0 +1,70 @@
+import os
+
+from batch import BatchResult
+from build_manifest import BuildManifest, record_results, script_version, skip_unchanged
+from redesign_sites import TEMPLATE
+
+
+def write(path, content):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def build(tmp_path, version, paths):
+    # One run: skip what is up to date, "process" the rest and record it
+    manifest = BuildManifest("redesign_sites", version, path=str(tmp_path / "manifest.json"))
+    stale = skip_unchanged(manifest, paths)
+    record_results(manifest, [BatchResult(path, None, "", None) for path in stale])
+    return stale
+
+
+def pages(tmp_path):
+    paths = [str(tmp_path / name) for name in ("kerma.html", "karnak.html")]
+    for path in paths:
+        write(path, f"<h1>{os.path.basename(path)}</h1>")
+    return paths
+
+
+def test_unchanged_files_are_skipped(tmp_path):
+    paths = pages(tmp_path)
+    version = script_version("redesign_sites.py", TEMPLATE)
+    assert build(tmp_path, version, paths) == paths
+    assert build(tmp_path, version, paths) == []
+
+    write(paths[1], "<h1>Karnak temple</h1>")
+    assert build(tmp_path, version, paths) == [paths[1]]
+
+
+def test_same_size_edit_is_rebuilt(tmp_path):
+    paths = pages(tmp_path)
+    build(tmp_path, "1", paths)
+    stat = os.stat(paths[0])
+    write(paths[0], "<h1>KERMA.html</h1>")
+    # Same size as before, so only the content hash tells them apart
+    os.utime(paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert build(tmp_path, "1", paths) == [paths[0]]
+
+
+def test_touched_but_unchanged_files_are_skipped(tmp_path):
+    paths = pages(tmp_path)
+    build(tmp_path, "1", paths)
+    stat = os.stat(paths[0])
+    os.utime(paths[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert build(tmp_path, "1", paths) == []
+
+
+def test_version_change_invalidates_every_file(tmp_path):
+    paths = pages(tmp_path)
+    version = script_version("redesign_sites.py", TEMPLATE)
+    build(tmp_path, version, paths)
+
+    assert build(tmp_path, script_version("redesign_sites.py", TEMPLATE.replace("DAEA", "Atlas")), paths) == paths
+    assert build(tmp_path, script_version("pipeline.py", TEMPLATE), paths) == paths
+
+
+def test_force_rebuilds_everything(tmp_path):
+    paths = pages(tmp_path)
+    build(tmp_path, "1", paths)
+    manifest = BuildManifest("redesign_sites", "1", path=str(tmp_path / "manifest.json"))
+    assert skip_unchanged(manifest, paths) == []
+    assert skip_unchanged(manifest, paths, force=True) == paths
@@ -0,0 +1,37 @@
+import json
+
+from cluster_tiles import build_levels, project, tile_items, unproject, write_tiles
+
+
+def point(id, lon, lat):
+    x, y = project(lon, lat)
+    return {"x": x, "y": y, "count": 1, "id": id, "name": id}
+
+
+def test_project_round_trips():
+    assert unproject(*project(31.2, 30.0)) == (31.2, 30.0)
+
+
+def test_nearby_sites_cluster_until_they_separate():
+    points = [point("a", 31.20, 30.00), point("b", 31.21, 30.01), point("c", 32.9, 24.1)]
+    levels = build_levels(points, 0, 12)
+
+    assert [item["count"] for item in levels[0]] == [3]
+    assert levels[12] == points
+    # a and b are ~1.5 km apart, still within 80 px until the max zoom
+    assert [(item["count"], item.get("expansion_zoom")) for item in levels[5]] == [(2, 12), (1, None)]
+    assert levels[4][0]["expansion_zoom"] == 5
+
+
+def test_write_tiles(tmp_path):
+    points = [point("a", 31.2, 30.0), point("b", -70.0, -10.0)]
+    levels = build_levels(points, 0, 2)
+    out = tmp_path / "tiles"
+    assert write_tiles(levels, str(out)) == 1 + 2 + 2
+    assert sorted(tile_items(levels[1], 1)) == [(0, 1), (1, 0)]
+
+    with open(out / "1" / "1" / "0.json", encoding="utf-8") as f:
+        feature = json.load(f)["features"][0]
+    assert feature["id"] == "a"
+    with open(out / "meta.json", encoding="utf-8") as f:
+        assert json.load(f)["count"] == 2
@@ -0,0 +1,38 @@
+import json
+import os
+
+from compile_sites import load_sites, write_outputs
+
+CSV = (
+    "lat,lon,timePeriod,siteName,info,link\n"
+    '30.0,31.2, <h4>Old Kingdom</h4>, <h3>Giza </h3>,Pyramids <i>and</i> more,'
+    '<a href="sites/giza.html"> MORE DETAILS </a>\n'
+    "95,31.2,<h4>x</h4>,<h3>Nowhere</h3>,bad,\n"
+)
+
+
+def test_load_sites_cleans_markup_and_validates(tmp_path):
+    path = tmp_path / "sites.csv"
+    path.write_text(CSV, encoding="utf-8")
+    sites, errors, warnings = load_sites(str(path))
+
+    assert sites == [{
+        "id": "giza", "lat": 30.0, "lon": 31.2, "name": "Giza", "period": "Old Kingdom",
+        "info": "Pyramids <i>and</i> more", "link": "sites/giza.html",
+    }]
+    assert len(errors) == 1 and "out of range" in errors[0]
+
+
+def test_write_outputs_splits_index_and_shards(tmp_path):
+    sites = [{"id": "giza", "lat": 30.0, "lon": 31.2, "name": "Giza", "period": "", "info": "", "link": ""}]
+    stale = tmp_path / "sites" / "old.json"
+    stale.parent.mkdir()
+    stale.write_text("{}")
+    write_outputs(sites, str(tmp_path))
+
+    with open(tmp_path / "sites.geojson", encoding="utf-8") as f:
+        feature = json.load(f)["features"][0]
+    assert feature["id"] == "giza"
+    assert feature["geometry"]["coordinates"] == [31.2, 30.0]
+    assert feature["properties"] == {"name": "Giza"}
+    assert os.listdir(tmp_path / "sites") == ["giza.json"]
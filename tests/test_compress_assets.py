@@ -0,0 +1,55 @@
+import gzip
+
+from compress_assets import minify_css, minify_html, minify_js, precompress_file
+
+
+def test_minify_html_keeps_what_renders():
+    page = (
+        "<!DOCTYPE html>\n<html>\n  <head>\n    <!-- Tailwind CSS -->\n"
+        '    <!--[if lt IE 9]><script src="html5shiv.js"></script><![endif]-->\n'
+        "    <style>\n      body { color: red; }\n    </style>\n  </head>\n"
+        '  <body   class="a  b">\n    <p>Old   <b>Kingdom</b>\n      site</p>\n'
+        "    <pre>  keep\n    this</pre>\n  </body>\n</html>\n"
+    )
+    assert minify_html(page) == (
+        "<!DOCTYPE html>\n<html>\n<head>\n"
+        '<!--[if lt IE 9]><script src="html5shiv.js"></script><![endif]-->\n'
+        "<style>body{color:red}</style>\n</head>\n"
+        '<body class="a  b">\n<p>Old <b>Kingdom</b>\nsite</p>\n'
+        "<pre>  keep\n    this</pre>\n</body>\n</html>\n"
+    )
+    assert minify_html(minify_html(page)) == minify_html(page)
+
+
+def test_minify_css():
+    css = "/* comment */\n.a :hover ,\n.b > .c {\n  width: calc(100% - 2px);\n  color: red;\n}\n/*! license */"
+    assert minify_css(css) == ".a :hover,.b>.c{width:calc(100% - 2px);color:red}/*! license */"
+    assert minify_css('.x::after { content: "a  /* b */"; }') == '.x::after{content:"a  /* b */"}'
+
+
+def test_minify_js_keeps_strings_regexes_and_line_breaks():
+    js = (
+        "// setup\nconst a = 1\nconst b = a + +1 /* plus */\n"
+        "const re = /[/\"]+/g; const half = a / 2 / 1;\n"
+        "const t = `x  ${ { y: 'a  b' }.y }  z`;\n"
+        "function f() {\n    return a\n}\n"
+    )
+    assert minify_js(js) == (
+        "const a=1\nconst b=a+ +1\n"
+        "const re=/[/\"]+/g;const half=a/2/1;const t=`x  ${{y:'a  b'}.y}  z`;function f(){return a}"
+    )
+
+
+def test_precompress_file(tmp_path):
+    big = tmp_path / "big.css"
+    big.write_text(".a{color:red}\n" * 100)
+    small = tmp_path / "small.css"
+    small.write_text(".a{color:red}")
+    (tmp_path / "small.css.gz").write_bytes(b"stale")
+
+    sizes = precompress_file(str(big))
+    assert gzip.decompress((tmp_path / "big.css.gz").read_bytes()) == big.read_bytes()
+    assert sizes["gzip"] == (tmp_path / "big.css.gz").stat().st_size
+    # Not worth compressing, and the leftover sibling goes
+    assert precompress_file(str(small)) == {}
+    assert not (tmp_path / "small.css.gz").exists()
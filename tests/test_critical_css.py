@@ -0,0 +1,65 @@
+import os
+
+from critical_css import CRITICAL_ATTR, critical_rules, inline_critical, parse_stylesheet, selector_requirements
+from generate_pages import render
+
+CSS = """
+@import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400&display=swap');
+/* preflight */
+*, ::before, ::after { box-sizing: border-box; }
+h1, h2, pre { margin: 0; }
+.prose :where(p):not(:where([class~="not-prose"] *)) { margin-top: 1.25em; }
+.bg-blue-900 { background-color: #1e3a8a; }
+.hover\\:bg-blue-50:hover { background-color: #eff6ff; }
+.rounded-3xl { border-radius: 1.5rem; }
+.lead { font-size: 1.25rem; }
+@keyframes spin { to { transform: rotate(360deg); } }
+@media (min-width: 768px) {
+  .md\\:text-6xl { font-size: 3.75rem; }
+  .md\\:p-12 { padding: 3rem; }
+}
+"""
+
+
+def test_selector_requirements():
+    assert selector_requirements(".md\\:text-6xl") == (set(), {"md:text-6xl"}, set())
+    assert selector_requirements("nav a.active:hover > #x") == ({"nav", "a"}, {"active"}, {"x"})
+    # :not() and attribute selectors ask for nothing, a one-item :where() does
+    assert selector_requirements('.prose :where(p):not(:where([class~="not-prose"] *))') == ({"p"}, {"prose"}, set())
+    assert selector_requirements(":is(h1, h2)::before") == (set(), set(), set())
+
+
+def test_parse_and_select_rules():
+    nodes = parse_stylesheet(CSS)
+    assert [node[0] for node in nodes] == ["statement", "rule", "rule", "rule", "rule", "rule", "rule", "rule", "block", "at"]
+    assert nodes[0][2].endswith("display=swap');")
+
+    css = critical_rules(nodes, {"html", "body", "header", "h1"}, {"bg-blue-900", "md:text-6xl", "hover:bg-blue-50"}, set())
+    assert css == (
+        "*,::before,::after{box-sizing: border-box;}h1{margin: 0;}"
+        ".bg-blue-900{background-color: #1e3a8a;}"
+        "@media (min-width: 768px){.md\\:text-6xl{font-size: 3.75rem;}}"
+    )
+
+
+def test_inline_critical():
+    path = os.path.join("sites", "kerma.html")
+    values = {"title": "Kerma", "period": "Old Kingdom", "researcher": "A. Student"}
+    page = render(path, values, '<p class="lead">Kush.</p>', {"central-nav": "<nav>Atlas</nav>",
+                                                                 "central-foot": "<footer>DAEA</footer>"})
+    nodes = parse_stylesheet(CSS)
+
+    result = inline_critical(page, "sites/kerma.html", "css/output.css", nodes)
+    assert f"<style {CRITICAL_ATTR}>" in result
+    assert ".bg-blue-900{background-color:#1e3a8a}" in result
+    critical = result.split("</style>")[0]
+    # The content card's box is styled, the content itself waits for the stylesheet
+    assert ".md\\:p-12{padding:3rem}" in critical
+    assert ".lead" not in critical
+    assert '<link rel="stylesheet" href="../css/output.css?v=1" media="print" onload="this.media=\'all\'">' in result
+    assert '<noscript><link rel="stylesheet" href="../css/output.css?v=1"></noscript>' in result
+
+    assert inline_critical(result, "sites/kerma.html", "css/output.css", nodes) is None
+    # Not a page of the site template
+    assert inline_critical('<link href="css/output.css" rel="stylesheet"><p>Map</p>', "index.html",
+                           "css/output.css", nodes) is None
@@ -0,0 +1,44 @@
+import json
+import os
+
+from fingerprint_assets import copy_site, fingerprint
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_fingerprint_rewrites_pages_and_dependent_assets(tmp_path):
+    src, dist = str(tmp_path / "src"), str(tmp_path / "dist")
+    write(os.path.join(src, "css", "output.css"), "body{}")
+    write(os.path.join(src, "centralize-nav-foot", "navbar.html"), "<nav></nav>")
+    write(os.path.join(src, "centralize-nav-foot", "nav-foot.js"), 'new URL("navbar.html", scriptUrl);')
+    write(os.path.join(src, "sites", "kerma.html"),
+          '<link href="../css/output.css?v=1"><script src="../centralize-nav-foot/nav-foot.js"></script>')
+    write(os.path.join(src, "build.py"), "")
+    copy_site(src, dist)
+    assert not os.path.exists(os.path.join(dist, "build.py"))
+
+    manifest = fingerprint(dist)
+    script = manifest["centralize-nav-foot/nav-foot.js"]
+    navbar = os.path.basename(manifest["centralize-nav-foot/navbar.html"])
+    assert manifest["css/output.css"].startswith("css/output.") and "?" not in manifest["css/output.css"]
+
+    assert read(os.path.join(dist, script)) == f'new URL("{navbar}", scriptUrl);'
+    assert read(os.path.join(dist, "sites", "kerma.html")) == (
+        f'<link href="../{manifest["css/output.css"]}"><script src="../{script}"></script>'
+    )
+    with open(os.path.join(dist, "asset-manifest.json"), encoding="utf-8") as f:
+        assert json.load(f) == manifest
+
+    # A changed partial changes the name of the script that loads it
+    write(os.path.join(src, "centralize-nav-foot", "navbar.html"), "<nav>new</nav>")
+    copy_site(src, dist)
+    assert fingerprint(dist)["centralize-nav-foot/nav-foot.js"] != script
@@ -0,0 +1,77 @@
+import json
+import os
+
+import pytest
+
+from generate_pages import CompiledTemplate, extract_record, generate_page, load_records, render
+import redesign_sites
+from redesign_sites import TEMPLATE
+
+VALUES = {"title": "Kerma", "period": "Old Kingdom", "researcher": "A. Student"}
+CONTENT = "<p>Capital of Kush.</p>"
+PARTIALS = {"central-nav": "<nav>Atlas</nav>", "central-foot": "<footer>DAEA</footer>"}
+
+
+def test_compiled_template_renders_like_format_and_back():
+    template = CompiledTemplate(TEMPLATE)
+    values = dict(VALUES, content=CONTENT, depth="../")
+    page = template.render(values)
+    assert page == TEMPLATE.format(**values)
+    assert template.match(page) == values
+    # {period} is used twice, both have to agree
+    assert template.match(page.replace("Old Kingdom", "New Kingdom", 1)) is None
+    with pytest.raises(ValueError):
+        CompiledTemplate("{title!r}")
+
+
+def test_extract_record_undoes_render():
+    path = os.path.join("sites", "kerma.html")
+    page = render(path, VALUES, CONTENT, PARTIALS)
+    assert "<nav>Atlas</nav>" in page
+    assert extract_record(page, path) == (VALUES, CONTENT)
+    # Rendered for a different depth
+    assert extract_record(page, os.path.join("sites", "kerma", "kerma.html")) is None
+
+
+def test_load_records_and_generate(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "sites-popup.csv").write_text(
+        "lat,lon,timePeriod,siteName,info,link\n"
+        '19.6,30.4,<h4>Old Kingdom</h4>,<h3>Kerma</h3>,Kush.,<a href="sites/kerma.html">MORE DETAILS</a>\n'
+        '25.7,32.6,<h4>New Kingdom</h4>,<h3>Karnak</h3>,Temples.,<a href="sites/karnak.html">MORE DETAILS</a>\n',
+        encoding="utf-8",
+    )
+    content = tmp_path / "content" / "sites"
+    content.mkdir(parents=True)
+    (content / "kerma.html").write_text(CONTENT, encoding="utf-8")
+    (content / "amarna.html").write_text(CONTENT, encoding="utf-8")
+    (tmp_path / "content" / "pages.json").write_text(json.dumps({
+        "sites/kerma.html": {"researcher": "A. Student", "period": "Description of Site"},
+        "sites/amarna.html": {"title": "Amarna", "period": "18th Dynasty"},
+    }))
+
+    # Karnak has no fragment, Kerma takes title and period from the CSV (the
+    # period even over pages.json), Amarna has no CSV row to take them from
+    path = os.path.join("sites", "kerma.html")
+    assert load_records() == {
+        os.path.join("sites", "amarna.html"): {"title": "Amarna", "period": "18th Dynasty", "researcher": ""},
+        path: VALUES,
+    }
+
+    assert generate_page(path, VALUES, PARTIALS)
+    assert (tmp_path / path).read_text(encoding="utf-8") == render(path, VALUES, CONTENT, PARTIALS)
+    assert not generate_page(path, VALUES, PARTIALS)
+
+
+def test_redesign_leaves_generated_pages_alone(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    path = os.path.join("sites", "kerma.html")
+    (tmp_path / "content" / "sites").mkdir(parents=True)
+    (tmp_path / "content" / path).write_text(CONTENT, encoding="utf-8")
+    (tmp_path / "content" / "pages.json").write_text(json.dumps({"sites/kerma.html": VALUES}))
+    (tmp_path / "sites").mkdir()
+    page = '<html><body><div id="detail"><h1>Kerma</h1><p>Kush.</p></div></body></html>'
+    (tmp_path / path).write_text(page, encoding="utf-8")
+
+    assert redesign_sites.main(["--no-images", "--force"]) == 0
+    assert (tmp_path / path).read_text(encoding="utf-8") == page
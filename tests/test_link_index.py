@@ -0,0 +1,37 @@
+import os
+
+from link_index import LinkIndex, resolve_reference
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+
+
+def test_resolve_reference():
+    assert resolve_reference("sites/karnak.html", "../index.html") == "index.html"
+    assert resolve_reference("sites/karnak.html", "Kom%20Ombo.html#top") == "sites/Kom Ombo.html"
+    assert resolve_reference("sites-popup.csv", "sites/kerma.html") == "sites/kerma.html"
+    assert resolve_reference("sites/karnak.html", "http://example.com/a.html") is None
+    assert resolve_reference("sites/karnak.html", "#detail") is None
+
+
+def test_index_finds_referrers_and_reuses_cache(tmp_path):
+    root = str(tmp_path)
+    write(os.path.join(root, "sites-popup.csv"), 'lat,lon,link\n1,2,<a href="sites/Kom Ombo.html">x</a>\n')
+    write(os.path.join(root, "sites", "karnak.html"), '<a href="Kom%20Ombo.html">Kom Ombo</a><img src="img/a.jpg">')
+    write(os.path.join(root, "node_modules", "pkg", "index.html"), '<a href="../../sites/Kom Ombo.html">')
+
+    index = LinkIndex.build(root)
+    assert index.referrers(["sites/Kom Ombo.html"]) == ["sites-popup.csv", "sites/karnak.html"]
+    assert index.referrers(["sites/img"]) == ["sites/karnak.html"]
+    index.save()
+
+    again = LinkIndex.build(root)
+    assert again.stats == {"parsed": 0, "reused": 2}
+
+    write(os.path.join(root, "sites", "karnak.html"), "no links any more")
+    changed = LinkIndex.build(root)
+    assert changed.stats == {"parsed": 1, "reused": 1}
+    assert changed.referrers(["sites/Kom Ombo.html"]) == ["sites-popup.csv"]
@@ -0,0 +1,89 @@
+import io
+
+import migrate_bootstrap
+
+
+def test_class_rules_chain_in_map_order():
+    # "panel" runs before "panel-heading", so the prefix is rewritten first.
+    assert migrate_bootstrap.rewrite_classes("panel panel-heading") == "card card-heading"
+    assert migrate_bootstrap.rewrite_classes("col-xs-6 col-xs-offset-3") == "col-6 offset-3"
+
+
+def test_whitespace_and_unknown_classes_are_preserved():
+    classes = "  row\tpull-right\n navbar-toggler "
+    assert migrate_bootstrap.rewrite_classes(classes) == "  row\tfloat-end\n navbar-toggler "
+
+
+def test_process_file(tmp_path):
+    page = tmp_path / "page.html"
+    page.write_text(
+        '<html><head></head><body>'
+        '<div class="modal-dialog navbar-collapse" data-toggle="modal"></div>'
+        '</body></html>'
+    )
+    migrate_bootstrap.process_file(str(page))
+    content = page.read_text()
+    assert 'class="modal-dialog modal-dialog-centered collapse navbar-collapse"' in content
+    assert 'data-bs-toggle="modal"' in content
+    assert migrate_bootstrap.BOOTSTRAP_CSS_CDN in content
+
+
+def test_stream_matches_in_memory_migrate(tmp_path):
+    # Cuts land next to removed tags, open IE shims and open class attributes
+    page_text = (
+        '<html>\n<head>\n<link href="css/bootstrap.css" rel="stylesheet">\n'
+        '<!--[if lt IE 9]>\n<script src="html5shiv.js"></script>\n<![endif]-->\n</head>\n'
+        '<body>\n<div class="panel\n pull-right>\n">cla<link bootstrap css>\nss="x"</div>\n'
+        '<div class="modal-dialog" data-toggle="modal">\n</div>\n'
+        '<script src="js/jquery.js"></script>\n<script src="js/bootstrap.min.js"></script>\n</body>\n</html>\n'
+    )
+    # On one line, cuts also land between tags and before a </script>
+    for text in (page_text, page_text.replace('\n', '')):
+        expected = migrate_bootstrap.migrate(text)
+        for chunk_size in (1, 5, 64, 4096):
+            source, target = io.StringIO(text), io.StringIO()
+            assert migrate_bootstrap.migrate_stream(source, target, chunk_size)
+            assert target.getvalue() == expected
+    expected = migrate_bootstrap.migrate(page_text)
+
+    page = tmp_path / "page.html"
+    page.write_text(page_text)
+    page.chmod(0o640)
+    migrate_bootstrap.process_file(str(page), stream=True)
+    assert page.read_text() == expected
+    assert page.stat().st_mode & 0o777 == 0o640
+    # Nothing to change: the page is left alone and no temporary file stays behind
+    plain = tmp_path / "plain.html"
+    plain.write_text('<p class="lead">\nText</p>\n')
+    mtime = plain.stat().st_mtime_ns
+    migrate_bootstrap.process_file(str(plain), stream=True)
+    assert plain.stat().st_mtime_ns == mtime
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["page.html", "plain.html"]
+
+
+def test_converted_pages_are_left_alone():
+    tailwind = '<html><head><link href="css/output.css" rel="stylesheet"></head>\n<body><div class="panel"></div></body></html>'
+    assert migrate_bootstrap.migrate(tailwind) == tailwind
+    migrated = migrate_bootstrap.migrate('<html><head></head><body><div class="panel"></div></body></html>')
+    assert migrate_bootstrap.migrate(migrated) == migrated
+    # The marker is found even when it straddles a chunk boundary
+    for page_text in (tailwind, migrated):
+        for chunk_size in (1, 7, 4096):
+            source, target = io.StringIO(page_text), io.StringIO()
+            assert not migrate_bootstrap.migrate_stream(source, target, chunk_size)
+            assert target.getvalue() == page_text
+
+
+class RecordingTarget(io.StringIO):
+    def write(self, text):
+        self.largest = max(getattr(self, "largest", 0), len(text))
+        return super().write(text)
+
+
+def test_stream_memory_is_bounded_without_newlines():
+    # A minified page: one line, so no '>\n' to cut at
+    page_text = '<html><head></head><body>' + '<div class="panel"><p>Text</p></div>' * 20000 + '</body></html>'
+    source, target = io.StringIO(page_text), RecordingTarget()
+    assert migrate_bootstrap.migrate_stream(source, target, 1024)
+    assert target.getvalue() == migrate_bootstrap.migrate(page_text)
+    assert target.largest < 4 * 1024
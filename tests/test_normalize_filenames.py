@@ -0,0 +1,51 @@
+import normalize_filenames
+
+
+def rewrite(content, rename_map):
+    pattern = normalize_filenames.compile_rename_map(rename_map)
+    return normalize_filenames.rewrite_references(content, pattern, rename_map)
+
+
+def test_longest_name_wins():
+    rename_map = {"Ombo.html": "ombo.html", "Kom Ombo.html": "kom_ombo.html"}
+    assert rewrite('<a href="sites/Kom Ombo.html">', rename_map) == ('<a href="sites/kom_ombo.html">', 1)
+
+
+def test_names_inside_longer_names_are_left_alone():
+    rename_map = {"Kom.html": "kom.html"}
+    content = "Kom.html old_Kom.html Kom.html.bak sites/Kom.html#top"
+    assert rewrite(content, rename_map) == ("kom.html old_Kom.html Kom.html.bak sites/kom.html#top", 2)
+
+
+def test_renames_do_not_chain():
+    rename_map = {"A B.html": "a_b.html", "a_b.html": "other.html"}
+    assert rewrite("A B.html a_b.html", rename_map) == ("a_b.html other.html", 2)
+
+
+def test_indexed_run_matches_full_scan(tmp_path, monkeypatch):
+    files = {
+        "sites/Kom Ombo.html": '<a href="Karnak Temple/Hall.html">Hall</a>',
+        "sites/Karnak Temple/Hall.html": '<a href="../Kom%20Ombo.html">Kom Ombo</a>',
+        "sites-popup.csv": 'lat,lon,link\n1,2,<a href="sites/Kom Ombo.html">x</a>\n',
+        "js/map.js": "fetch('sites/Kom Ombo.html');",
+        "compile_sites.py": 'PAGE = "sites/Karnak Temple/Hall.html"\n',
+        "README.md": "[Kom Ombo](sites/Kom%20Ombo.html)\n",
+        "node_modules/pkg/README.md": "[Kom Ombo](sites/Kom%20Ombo.html)\n",
+    }
+    trees = {}
+    for mode, argv in (("full", []), ("indexed", ["--index"])):
+        root = tmp_path / mode
+        for path, content in files.items():
+            (root / path).parent.mkdir(parents=True, exist_ok=True)
+            (root / path).write_text(content)
+        monkeypatch.chdir(root)
+        assert normalize_filenames.main(argv) == 0
+        trees[mode] = {
+            str(path.relative_to(root)): path.read_text() for path in sorted(root.rglob("*"))
+            if path.is_file() and path.name != ".link-index.json"
+        }
+
+    assert trees["indexed"] == trees["full"]
+    assert trees["full"]["compile_sites.py"] == 'PAGE = "sites/karnak_temple/hall.html"\n'
+    assert trees["full"]["sites/kom_ombo.html"] == '<a href="karnak_temple/hall.html">Hall</a>'
+    assert "Kom%20Ombo" in trees["full"]["node_modules/pkg/README.md"]
@@ -0,0 +1,112 @@
+import glob
+import json
+import os
+
+import pytest
+from playwright.sync_api import Page
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_PATH = os.path.join(ROOT, "tests", "perf_baseline.json")
+PAGES = ["index.html"] + sorted(
+    os.path.relpath(path, ROOT).replace(os.sep, "/")
+    for path in glob.glob(os.path.join(ROOT, "sites", "**", "*.html"), recursive=True)
+)
+METRICS = ("requests", "transfer_bytes", "dom_content_loaded_ms", "lcp_ms", "cls")
+
+# Installed before any page script runs; buffered observers also see
+# entries from before they were created
+OBSERVE_SCRIPT = """
+window.__perf = { lcp: 0, cls: 0 };
+try {
+    new PerformanceObserver((list) => {
+        for (const entry of list.getEntries()) window.__perf.lcp = entry.startTime;
+    }).observe({ type: 'largest-contentful-paint', buffered: true });
+    new PerformanceObserver((list) => {
+        for (const entry of list.getEntries()) {
+            if (!entry.hadRecentInput) window.__perf.cls += entry.value;
+        }
+    }).observe({ type: 'layout-shift', buffered: true });
+} catch (e) {
+    // Not supported by this browser
+}
+"""
+
+COLLECT_SCRIPT = """
+() => {
+    const nav = performance.getEntriesByType('navigation')[0];
+    return {
+        dom_content_loaded_ms: nav ? nav.domContentLoadedEventEnd : 0,
+        lcp_ms: window.__perf.lcp,
+        cls: window.__perf.cls,
+    };
+}
+"""
+
+def load_baseline():
+    with open(BASELINE_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_baseline(baseline):
+    tmp_path = BASELINE_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, BASELINE_PATH)
+
+def measure(page, path):
+    """Load path and return its METRICS.
+
+    Request count and bytes come from Playwright's network events, which
+    see every request including the ones conftest.py fulfils locally;
+    timings and layout shift come from the Performance APIs.
+    """
+    requests = []
+    page.on("requestfinished", requests.append)
+    page.add_init_script(OBSERVE_SCRIPT)
+    page.goto(path)
+    page.wait_for_load_state("networkidle")
+
+    metrics = page.evaluate(COLLECT_SCRIPT)
+    metrics["requests"] = len(requests)
+    metrics["transfer_bytes"] = sum(
+        sizes["responseBodySize"] + sizes["responseHeadersSize"] for sizes in (r.sizes() for r in requests)
+    )
+    return {name: round(metrics[name], 4 if name == "cls" else 0) for name in METRICS}
+
+def budget(value, tolerance):
+    return value * (1 + tolerance.get("relative", 0)) + tolerance.get("absolute", 0)
+
+def report(path, measured, expected, tolerances):
+    lines = [f"Performance budget exceeded for {path}:", f"  {'metric':<24}{'baseline':>12}{'budget':>12}{'measured':>12}"]
+    for name in METRICS:
+        limit = budget(expected[name], tolerances[name])
+        flag = "  <-- over" if measured[name] > limit else ""
+        lines.append(f"  {name:<24}{expected[name]:>12g}{limit:>12g}{measured[name]:>12g}{flag}")
+    return "\n".join(lines)
+
+@pytest.mark.performance
+@pytest.mark.parametrize("path", PAGES)
+def test_page_budget(browser_name, request, path):
+    if browser_name != "chromium":
+        pytest.skip("LCP and layout shift are only reported by Chromium")
+    baseline = load_baseline()
+    update = request.config.getoption("--update-perf-baseline")
+    expected = baseline["pages"].get(path)
+    if expected is None and not update:
+        # A new page has nothing to be compared with until a baseline is recorded on CI hardware
+        pytest.skip(f"No baseline for {path}, record one with: pytest -m performance -n 0 --update-perf-baseline")
+    if os.environ.get("PYTEST_XDIST_WORKER"):
+        # Timings taken while other workers load pages are noise
+        pytest.fail("performance tests have to run without pytest-xdist: pytest -m performance -n 0")
+    # Only now, so a skipped page does not start a browser
+    page: Page = request.getfixturevalue("page")
+    measured = measure(page, path)
+
+    if update:
+        baseline["pages"][path] = measured
+        save_baseline(baseline)
+        return
+
+    tolerances = baseline["tolerances"]
+    over = [name for name in METRICS if measured[name] > budget(expected[name], tolerances[name])]
+    assert not over, report(path, measured, expected, tolerances)
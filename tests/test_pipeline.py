@@ -0,0 +1,90 @@
+import os
+
+from normalize_filenames import compile_rename_map
+from pipeline import main, stages_for, transform
+
+PAGE = """<html><head><link href="../css/bootstrap.css" rel="stylesheet"></head><body>
+<div id="detail"><h1>Kom Ombo</h1><h3>Ptolemaic</h3><h4>A. Student</h4>
+<div class="panel"><p>See <a href="Site%20Name%201.html">the other site</a>.</p></div>
+</div></body></html>
+"""
+
+
+def test_transform_runs_stages_in_order():
+    rename_map = {"Site%20Name%201.html": "site_name_1.html"}
+    text, changed = transform(
+        PAGE, os.path.join("sites", "kom_ombo.html"), ["migrate", "redesign", "links"],
+        images=False, pattern=compile_rename_map(rename_map), rename_map=rename_map,
+    )
+    assert changed == ["migrate", "redesign", "links"]
+    assert '<div class="card"><p>See <a href="site_name_1.html">' in text
+    assert "<title>Kom Ombo - DAEA</title>" in text
+
+    text, changed = transform(PAGE, os.path.join("sites", "kom_ombo.html"), ["links"])
+    assert (text, changed) == (PAGE, [])
+
+
+def test_stages_for():
+    stages = ["migrate", "redesign", "links"]
+    assert stages_for(os.path.join(".", "sites", "kerma.html"), stages) == stages
+    assert stages_for(os.path.join(".", "index.html"), stages) == ["migrate", "links"]
+    assert stages_for(os.path.join(".", "wiki", "page.html"), stages) == ["links"]
+    assert stages_for(os.path.join(".", "sites-popup.csv"), ["migrate"]) == []
+
+
+def test_dry_run_writes_nothing(tmp_path, monkeypatch, capsys):
+    sites = tmp_path / "sites"
+    sites.mkdir()
+    (sites / "Kom Ombo.html").write_text(PAGE, encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+
+    assert main(["--dry-run", "--no-images"]) == 0
+    out = capsys.readouterr().out
+    assert "Would rename sites/Kom Ombo.html -> sites/kom_ombo.html" in out
+    assert "+++ b/sites/kom_ombo.html" in out
+    assert os.listdir(sites) == ["Kom Ombo.html"]
+    assert not (tmp_path / ".build-manifest.json").exists()
+
+    assert main(["--no-images"]) == 0
+    assert os.listdir(sites) == ["kom_ombo.html"]
+    assert "panel" not in (sites / "kom_ombo.html").read_text(encoding="utf-8")
+
+
+def test_paths_rebuild_only_those_files(tmp_path, monkeypatch):
+    sites = tmp_path / "sites"
+    sites.mkdir()
+    for name in ("kerma.html", "karnak.html"):
+        (sites / name).write_text(PAGE, encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+
+    (sites / "kerma.html").chmod(0o640)
+    assert main(["--no-images", os.path.join("sites", "kerma.html")]) == 0
+    assert (sites / "kerma.html").stat().st_mode & 0o777 == 0o640
+    assert "<title>Kom Ombo - DAEA</title>" in (sites / "kerma.html").read_text(encoding="utf-8")
+    assert (sites / "karnak.html").read_text(encoding="utf-8") == PAGE
+
+
+def test_stages_for_generated_pages():
+    stages = ["migrate", "redesign", "links"]
+    kerma = os.path.join("sites", "kerma.html")
+    assert stages_for(os.path.join(".", kerma), stages, {kerma}) == ["links"]
+
+
+def test_redesigned_and_generated_pages_need_reconvert(tmp_path, monkeypatch):
+    sites = tmp_path / "sites"
+    sites.mkdir()
+    (sites / "kerma.html").write_text(PAGE, encoding="utf-8")
+    monkeypatch.chdir(tmp_path)
+    assert main(["--no-images"]) == 0
+    redesigned = (sites / "kerma.html").read_text(encoding="utf-8")
+    assert main(["--no-images", "--force"]) == 0
+    assert (sites / "kerma.html").read_text(encoding="utf-8") == redesigned
+
+    # Built from content/ by generate_pages.py: not even --reconvert touches it
+    (sites / "karnak.html").write_text(redesigned, encoding="utf-8")
+    (tmp_path / "content" / "sites").mkdir(parents=True)
+    (tmp_path / "content" / "sites" / "karnak.html").write_text("<p>Karnak</p>", encoding="utf-8")
+    (tmp_path / "content" / "pages.json").write_text('{"sites/karnak.html": {"title": "Karnak"}}')
+    assert main(["--no-images", "--force", "--reconvert"]) == 0
+    assert (sites / "karnak.html").read_text(encoding="utf-8") == redesigned
+    assert (sites / "kerma.html").read_text(encoding="utf-8") != redesigned
@@ -0,0 +1,29 @@
+from prerender_partials import prefix_links, prerender
+
+PARTIALS = {
+    "central-nav": '<nav><a href="index.html">Atlas</a><a href="http://x.org">x</a><a href="#top">t</a></nav>',
+    "central-foot": '<footer><img src="centralize-nav-foot/img/logo.png"><a href="mailto:a@b.c">m</a></footer>',
+}
+
+
+def test_prefix_links_follows_nav_foot_rules():
+    assert prefix_links(PARTIALS["central-nav"], "../") == (
+        '<nav><a href="../index.html">Atlas</a><a href="http://x.org">x</a><a href="#top">t</a></nav>'
+    )
+    assert prefix_links(PARTIALS["central-foot"], "") == PARTIALS["central-foot"]
+
+
+def test_prerender_is_idempotent():
+    page = (
+        '<body><div id="central-nav"></div><main></main><div id="central-foot"></div>'
+        '<script src="../centralize-nav-foot/nav-foot.js"></script></body>'
+    )
+    once = prerender(page, "sites/kerma.html", PARTIALS)
+    assert '<div id="central-nav" data-prerendered>' in once
+    assert 'src="../centralize-nav-foot/img/logo.png"' in once
+    assert prerender(once, "sites/kerma.html", PARTIALS) == once
+
+
+def test_pages_without_nav_foot_script_are_left_alone():
+    page = '<div id="central-nav"></div><script src="../centralize-nav-foot/sites-old-nav-foot.js"></script>'
+    assert prerender(page, "wiki/page.html", PARTIALS) == page
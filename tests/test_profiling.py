@@ -0,0 +1,28 @@
+import migrate_bootstrap
+from profiling import build_report, folded_lines
+
+
+def test_migrate_profile_counts_rule_hits(tmp_path):
+    page = tmp_path / "page.html"
+    page.write_text('<html><head></head><body><div class="panel pull-right" data-toggle="x"></div></body></html>')
+
+    profile = migrate_bootstrap.process_file(str(page), profile=True)
+    assert set(profile["phases"]) == {"read", "transform", "write"}
+    assert profile["rules"]["panel"]["hits"] == 1
+    assert profile["rules"]["pull-right"]["hits"] == 1
+    assert profile["rules"]["data-toggle"]["hits"] == 1
+    assert profile["bytes_out"] > profile["bytes_in"]
+
+    report = build_report("migrate_bootstrap", [profile], migrate_bootstrap.RULE_NAMES)
+    assert "pull-left" in report["never_fired"] and "panel" not in report["never_fired"]
+    # Without --profile nothing is collected
+    assert migrate_bootstrap.process_file(str(page)) is None
+
+
+def test_folded_lines_split_transform_time():
+    report = {
+        "script": "s",
+        "phases": {"read": 0.001, "transform": 0.003},
+        "rules": {"col-xs-(\\d+)": {"hits": 2, "seconds": 0.002}, "hr": {"hits": 0, "seconds": 0.0}},
+    }
+    assert folded_lines(report) == ["s;read 1000", "s;transform 1000", "s;transform;col-xs-(\\d+) 2000"]
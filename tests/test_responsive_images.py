@@ -0,0 +1,61 @@
+import os
+
+import pytest
+from bs4 import BeautifulSoup
+
+from responsive_images import DERIVED_DIR, add_responsive_images
+
+Image = pytest.importorskip("PIL.Image")
+
+PAGE = (
+    '<div id="detail"><img src="img/big photo.jpg"><img src="img/small.png">'
+    '<img src="http://example.org/remote.jpg" loading="eager"></div>'
+)
+
+
+def render(tmp_path):
+    soup = BeautifulSoup(PAGE, "html.parser")
+    detail = soup.find(id="detail")
+    add_responsive_images(soup, detail, str(tmp_path / "sites" / "page.html"), str(tmp_path / "derived"))
+    return detail
+
+
+def test_local_images_get_derivatives_and_srcset(tmp_path):
+    (tmp_path / "sites" / "img").mkdir(parents=True)
+    Image.new("RGB", (1200, 800), "red").save(tmp_path / "sites" / "img" / "big photo.jpg")
+    Image.new("RGBA", (300, 200)).save(tmp_path / "sites" / "img" / "small.png")
+
+    detail = render(tmp_path)
+    big, small, remote = detail.find_all("img")
+
+    assert big.parent.name == "picture"
+    assert (big["width"], big["height"]) == ("1200", "800")
+    assert "loading" not in big.attrs
+    assert big["srcset"].endswith("960w, img/big%20photo.jpg 1200w")
+    webp = big.parent.find("source")["srcset"].split(", ")
+    assert [c.rsplit(" ", 1)[1] for c in webp] == ["480w", "960w"]
+    assert len(list((tmp_path / "derived").rglob("*.webp"))) == 2
+
+    # Too small to resize, but still sized and lazy
+    assert small.parent.name == "div" and "srcset" not in small.attrs
+    assert (small["width"], small["loading"], small["decoding"]) == ("300", "lazy", "async")
+    assert remote["loading"] == "lazy" and "width" not in remote.attrs
+
+    # A second pass rebuilds the same markup instead of nesting pictures
+    once = str(detail)
+    add_responsive_images(BeautifulSoup("", "html.parser"), detail, str(tmp_path / "sites" / "page.html"),
+                          str(tmp_path / "derived"))
+    assert str(detail) == once
+
+
+def test_derived_images_stay_in_the_site_tree(tmp_path, monkeypatch):
+    # Run on another tree, the derivatives land in that tree next to its pages
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "sites" / "img").mkdir(parents=True)
+    Image.new("RGB", (1200, 800), "red").save(tmp_path / "sites" / "img" / "big photo.jpg")
+    soup = BeautifulSoup(PAGE, "html.parser")
+    detail = soup.find(id="detail")
+    add_responsive_images(soup, detail, os.path.join("sites", "page.html"))
+
+    assert len(list((tmp_path / DERIVED_DIR).rglob("*.webp"))) == 2
+    assert detail.find("source")["srcset"].startswith("../images/derived/")
@@ -0,0 +1,63 @@
+from search_index import SearchIndex, build_index, extract_document, stem, tokenize, write_index
+
+DOCUMENTS = [
+    {"url": "sites/karnak.html", "title": "Karnak", "period": "New Kingdom",
+     "text": "Karnak New Kingdom. The great temple of Amun and its temples."},
+    {"url": "sites/giza.html", "title": "Giza", "period": "Old Kingdom",
+     "text": "Giza Old Kingdom. Pyramids and the cemeteries of the kingdom's officials."},
+    {"url": "sites/amarna.html", "title": "Amarna", "period": "New Kingdom",
+     "text": "Amarna New Kingdom. A new city, with a temple and cemetery."},
+]
+
+
+def test_tokenize_and_stem():
+    assert stem("cemeteries") == "cemetery"
+    assert stem("temples") == "temple"
+    assert stem("excavated") == "excavat"
+    # Too short to strip, or not a plural
+    assert stem("gas") == "gas"
+    assert stem("osiris") == "osiris"
+    # Stopwords and single letters keep their position but are not terms
+    assert tokenize("The Temple of Kôm") == [(1, "temple"), (3, "kom")]
+
+
+def test_extract_document_reads_content_only():
+    page = (
+        "<html><body><nav>Atlas About</nav><header><h1>Kerma</h1></header>"
+        '<div class="content-body"><p>Capital of Kush.</p></div><footer>DAEA</footer></body></html>'
+    )
+    document = extract_document(page, "sites/kerma.html")
+    assert document["title"] == "Kerma"
+    assert "Kush" in document["text"]
+    assert "Atlas" not in document["text"] and "DAEA" not in document["text"]
+    site = {"name": "Kerma (Dukki Gel)", "period": "Middle Kingdom"}
+    assert extract_document(page, "sites/kerma.html", site)["title"] == "Kerma (Dukki Gel)"
+
+
+def test_build_index_delta_encodes_positions():
+    docs, shards = build_index(DOCUMENTS)
+    assert [doc["url"] for doc in docs] == [document["url"] for document in DOCUMENTS]
+    # "temple" at positions 5 and 10 of Karnak, 8 of Amarna
+    assert shards["te"]["temple"] == [[0, 5, 5], [2, 8]]
+    assert all(term.startswith(key) for key, terms in shards.items() for term in terms)
+
+
+def test_search(tmp_path):
+    write_index(*build_index(DOCUMENTS), out_dir=str(tmp_path / "search"))
+    index = SearchIndex(str(tmp_path / "search"))
+
+    def urls(query, **kwargs):
+        return [result["url"] for result in index.search(query, **kwargs)]
+
+    # Karnak mentions temples twice and is ranked first
+    assert urls("temples") == ["sites/karnak.html", "sites/amarna.html"]
+    assert urls("new temple") == ["sites/karnak.html", "sites/amarna.html"]
+    assert urls("temple pyramid") == []
+    assert urls('"new city"') == ["sites/amarna.html"]
+    assert urls('"city new"') == []
+    # Search as you type: "cemet" completes to cemetery
+    assert urls("cemet") == []
+    assert sorted(urls("cemet", prefix=True)) == ["sites/amarna.html", "sites/giza.html"]
+    assert urls("cemeteries", prefix=True) == urls("cemeteries")
+    # Only loaded the shards it needed
+    assert set(index.shards) <= {"te", "ne", "py", "ci", "ce"}
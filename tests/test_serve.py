@@ -0,0 +1,91 @@
+import gzip
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from serve import IMMUTABLE_CACHE, REVALIDATE_CACHE, choose_encoding, make_server, parse_range
+
+PAGE = b"<p>" + b"Karnak " * 200 + b"</p>\n"
+
+
+@pytest.fixture
+def server_url(tmp_path):
+    (tmp_path / "index.html").write_bytes(PAGE)
+    (tmp_path / "index.html.gz").write_bytes(gzip.compress(PAGE))
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "output.0123456789.css").write_text(".a{color:red}")
+    (tmp_path / "asset-manifest.json").write_text(json.dumps({"css/output.css": "css/output.0123456789.css"}))
+    server = make_server(str(tmp_path), port=0, quiet=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/"
+    server.shutdown()
+    server.server_close()
+
+
+def fetch(url, **headers):
+    try:
+        response = urllib.request.urlopen(urllib.request.Request(url, headers=headers))
+    except urllib.error.HTTPError as e:
+        response = e
+    with response:
+        return response.status, response.headers, response.read()
+
+
+def test_choose_encoding_and_parse_range():
+    assert choose_encoding("gzip, deflate, br", ["br", "gzip"]) == "br"
+    assert choose_encoding("br;q=0.5, gzip", ["br", "gzip"]) == "gzip"
+    assert choose_encoding("*;q=0.1", ["gzip"]) == "gzip"
+    assert choose_encoding("gzip;q=0, identity", ["gzip"]) is None
+    assert choose_encoding(None, ["gzip"]) is None
+
+    assert parse_range("bytes=0-9", 100) == (0, 9)
+    assert parse_range("bytes=90-", 100) == (90, 99)
+    assert parse_range("bytes=-10", 100) == (90, 99)
+    assert parse_range("bytes=95-200", 100) == (95, 99)
+    assert parse_range("bytes=0-1,5-6", 100) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=100-", 100)
+
+
+def test_negotiates_encoding(server_url):
+    status, headers, body = fetch(server_url, **{"Accept-Encoding": "gzip"})
+    assert status == 200
+    assert headers["Content-Encoding"] == "gzip"
+    assert headers["Vary"] == "Accept-Encoding"
+    assert headers["Content-Type"] == "text/html"
+    assert gzip.decompress(body) == PAGE
+
+    status, headers, body = fetch(server_url + "index.html")
+    assert headers["Content-Encoding"] is None
+    assert body == PAGE
+
+
+def test_cache_headers(server_url):
+    _, headers, _ = fetch(server_url + "css/output.0123456789.css")
+    assert headers["Cache-Control"] == IMMUTABLE_CACHE
+    _, headers, _ = fetch(server_url + "index.html")
+    assert headers["Cache-Control"] == REVALIDATE_CACHE
+    status, _, body = fetch(server_url + "index.html", **{"If-None-Match": headers["ETag"]})
+    assert (status, body) == (304, b"")
+    # The gzip representation has its own ETag
+    status, _, _ = fetch(server_url + "index.html", **{"If-None-Match": headers["ETag"], "Accept-Encoding": "gzip"})
+    assert status == 200
+
+
+def test_range_requests(server_url):
+    status, headers, body = fetch(server_url + "index.html", Range="bytes=3-8")
+    assert (status, body) == (206, b"Karnak")
+    assert headers["Content-Range"] == f"bytes 3-8/{len(PAGE)}"
+
+    _, headers, _ = fetch(server_url + "index.html")
+    status, _, body = fetch(server_url + "index.html", Range="bytes=3-8", **{"If-Range": '"stale"'})
+    assert (status, body) == (200, PAGE)
+    status, _, body = fetch(server_url + "index.html", Range="bytes=3-8", **{"If-Range": headers["ETag"]})
+    assert (status, body) == (206, b"Karnak")
+
+    status, headers, _ = fetch(server_url + "index.html", Range=f"bytes={len(PAGE)}-")
+    assert status == 416
+    assert headers["Content-Range"] == f"bytes */{len(PAGE)}"
@@ -0,0 +1,57 @@
+import json
+import os
+import re
+
+import pytest
+
+from service_worker import SW_NAME, find_precache, precache_manifest, register, write_service_worker
+
+
+@pytest.fixture
+def dist(tmp_path):
+    files = {
+        "index.html": '<link href="css/output.0123456789.css" rel="stylesheet"><a href="projects.html">Projects</a>'
+                      '<script src="js/map.js"></script></body>',
+        "projects.html": '<link href="css/bootstrap.css" rel="stylesheet">',
+        "css/output.0123456789.css": ".a{background:url(../img/bg.png)}",
+        "css/output.css": ".a{}",
+        "css/bootstrap.css": ".b{}",
+        "img/bg.png": "png",
+        "js/map.js": "fetch('data/sites.geojson')",
+        "data/sites.geojson": "{}",
+        "sites/kerma.html": "<p>Kerma</p>\n</body>\n</html>",
+        "sites/aa-template/aa-template.html": "<p>{title}</p></body>",
+        "asset-manifest.json": json.dumps({"css/output.css": "css/output.0123456789.css"}),
+        SW_NAME: "const PRECACHE_MANIFEST = [];\nconst CACHE_VERSION = '';\n",
+    }
+    for path, content in files.items():
+        os.makedirs(tmp_path / os.path.dirname(path), exist_ok=True)
+        (tmp_path / path).write_text(content)
+    return tmp_path
+
+
+def test_find_precache_follows_assets_not_links(dist):
+    # Not the linked page and its stylesheet, the template or the unhashed output.css
+    assert find_precache(str(dist)) == [
+        "css/output.0123456789.css", "data/sites.geojson", "img/bg.png", "index.html", "js/map.js", "sites/kerma.html",
+    ]
+
+
+def test_register_and_write_service_worker(dist):
+    assert register(str(dist), "sites/kerma.html")
+    page = (dist / "sites" / "kerma.html").read_text()
+    assert page.endswith("navigator.serviceWorker.register('../service-worker.js');</script>\n</body>\n</html>")
+    assert not register(str(dist), "sites/kerma.html")
+
+    manifest = precache_manifest(str(dist), ["index.html", "sites/kerma.html"])
+    assert [path for path, _ in manifest] == ["index.html", "sites/kerma.html"]
+    version = write_service_worker(str(dist), manifest)
+    source = (dist / SW_NAME).read_text()
+    assert json.loads(re.search(r"PRECACHE_MANIFEST = (.*);", source).group(1)) == manifest
+    assert f"const CACHE_VERSION = '{version}';" in source
+
+    # A changed file gets a new revision, and the worker is only filled in once
+    (dist / "index.html").write_text("<p>Atlas</p>")
+    assert precache_manifest(str(dist), ["index.html"])[0][1] != manifest[0][1]
+    with pytest.raises(ValueError):
+        write_service_worker(str(dist), manifest)
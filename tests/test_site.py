@@ -2,16 +2,14 @@ import pytest
 from playwright.sync_api import Page, expect
 import re
 
-# Helper to get URL
-def get_url(path):
-    return f"http://localhost:8000/{path}"
+# Paths are relative to the base_url fixture (see conftest.py)
 
 def test_homepage_loads(page: Page):
-    page.goto(get_url("index.html"))
+    page.goto("index.html")
     expect(page).to_have_title("Digital Atlas of Egyptian Archaeology")
 
 def test_map_initializes(page: Page):
-    page.goto(get_url("index.html"))
+    page.goto("index.html")
     
     # Close modal if it appears
     if page.locator("#welcome-modal").is_visible():
@@ -28,7 +26,7 @@ def test_map_initializes(page: Page):
         raise
 
 def test_modal_appears_and_closes(page: Page):
-    page.goto(get_url("index.html"))
+    page.goto("index.html")
     # Modal should be visible initially
     modal = page.locator("#welcome-modal")
     expect(modal).to_be_visible(timeout=5000)
@@ -39,7 +37,7 @@ def test_modal_appears_and_closes(page: Page):
 
 def test_navigation_injection(page: Page):
     """Test that the centralized navbar is injected correctly."""
-    page.goto(get_url("sites/mut-el-kharab.html"))
+    page.goto("sites/mut-el-kharab.html")
     
     # Check for navbar (Tailwind uses <nav>)
     nav = page.locator("nav").first
@@ -53,7 +51,7 @@ def test_navigation_injection(page: Page):
 
 def test_typography_applied(page: Page):
     """Test that new font classes are applied."""
-    page.goto(get_url("sites/mut-el-kharab.html"))
+    page.goto("sites/mut-el-kharab.html")
     
     # Check for font-display on headings
     expect(page.locator("h1").first).to_have_class(re.compile(r"font-display"))
@@ -64,7 +62,7 @@ def test_typography_applied(page: Page):
 def test_responsive_layout(page: Page):
     """Test that the layout adapts to mobile screens."""
     page.set_viewport_size({"width": 375, "height": 667})
-    page.goto(get_url("sites/mut-el-kharab.html"))
+    page.goto("sites/mut-el-kharab.html")
     
     # Check for main content container
     expect(page.locator(".container").first).to_be_visible()
@@ -75,26 +73,26 @@ def test_responsive_layout(page: Page):
 def test_resource_availability(page: Page):
     """Verify that critical resources are served correctly."""
     # Check nav-foot.js
-    response = page.request.get(get_url("centralize-nav-foot/nav-foot.js"))
+    response = page.request.get("centralize-nav-foot/nav-foot.js")
     expect(response).to_be_ok()
     
     # Check navbar.html
-    response = page.request.get(get_url("centralize-nav-foot/navbar.html"))
+    response = page.request.get("centralize-nav-foot/navbar.html")
     expect(response).to_be_ok()
 
     # Check footer logos
-    response = page.request.get(get_url("centralize-nav-foot/img/anp_logo.png"))
+    response = page.request.get("centralize-nav-foot/img/anp_logo.png")
     expect(response).to_be_ok()
-    response = page.request.get(get_url("centralize-nav-foot/img/leadr_logo.png"))
+    response = page.request.get("centralize-nav-foot/img/leadr_logo.png")
     expect(response).to_be_ok()
 
     # Check sites/kerma.html directly
-    response = page.request.get(get_url("sites/kerma.html"))
+    response = page.request.get("sites/kerma.html")
     expect(response).to_be_ok()
 
 def test_typography_applied(page: Page):
     """Test that new font classes are applied."""
-    page.goto(get_url("sites/kerma.html"))
+    page.goto("sites/kerma.html")
     
     # Check for font-roboto-condensed on main title
     expect(page.locator("h1").first).to_have_class(re.compile(r"font-roboto-condensed"))
@@ -110,7 +108,7 @@ def test_full_map_functionality(page: Page):
     page.on("console", lambda msg: console_logs.append(msg.text))
 
     try:
-        page.goto(get_url("index.html"))
+        page.goto("index.html")
         
         # Close modal first
         if page.locator("#welcome-modal").is_visible():
@@ -0,0 +1,27 @@
+import base64
+import hashlib
+import os
+import re
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VENDOR_DIR = os.path.join(ROOT, "tests", "vendor")
+# A CDN <link>/<script> and the integrity attribute it may carry
+CDN_TAG_RE = re.compile(r'<(?:link|script)\b[^>]*?(?:href|src)="https://(unpkg\.com/[^"]+)"[^>]*>')
+INTEGRITY_RE = re.compile(r'integrity="sha256-([^"]+)"')
+
+
+def cdn_tags():
+    with open(os.path.join(ROOT, "index.html"), "r", encoding="utf-8") as f:
+        return CDN_TAG_RE.finditer(f.read())
+
+
+@pytest.mark.parametrize("match", list(cdn_tags()), ids=lambda match: match.group(1))
+def test_cdn_files_are_vendored(match):
+    path = os.path.join(VENDOR_DIR, *match.group(1).split("/"))
+    assert os.path.isfile(path), f"copy {match.group(1)} to tests/vendor/ (see tests/vendor/README.md)"
+    integrity = INTEGRITY_RE.search(match.group())
+    if integrity:
+        with open(path, "rb") as f:
+            assert base64.b64encode(hashlib.sha256(f.read()).digest()).decode() == integrity.group(1)
@@ -0,0 +1,67 @@
+import os
+
+from watch import changed_paths, plan_rebuild, rebuild, scan, wait_for_changes
+
+SNAPSHOT = {
+    "index.html": (1, 10),
+    os.path.join("sites", "kerma.html"): (1, 10),
+    os.path.join("centralize-nav-foot", "navbar.html"): (1, 10),
+    "sites-popup.csv": (1, 10),
+    "redesign_sites.py": (1, 10),
+}
+
+
+def test_scan_and_changed_paths(tmp_path):
+    (tmp_path / "sites").mkdir()
+    (tmp_path / "sites" / "kerma.html").write_text("<p>Kerma</p>")
+    (tmp_path / "node_modules").mkdir()
+    (tmp_path / "node_modules" / "a.html").write_text("")
+    (tmp_path / "notes.txt").write_text("")
+    before = scan(str(tmp_path))
+    assert list(before) == [os.path.join("sites", "kerma.html")]
+
+    (tmp_path / "sites" / "kerma.html").write_text("<p>Kerma, Sudan</p>")
+    (tmp_path / "index.html").write_text("")
+    assert changed_paths(before, scan(str(tmp_path))) == {"index.html", os.path.join("sites", "kerma.html")}
+
+
+def test_plan_rebuild_follows_dependencies():
+    kerma = os.path.join("sites", "kerma.html")
+    assert plan_rebuild({kerma}, SNAPSHOT) == ({kerma}, False, False, False, True)
+    # A deleted page has nothing left to build
+    assert plan_rebuild({os.path.join("sites", "gone.html")}, SNAPSHOT) == (set(), False, False, False, False)
+    assert plan_rebuild({os.path.join("centralize-nav-foot", "navbar.html")}, SNAPSHOT) == (
+        set(), True, False, False, False)
+    assert plan_rebuild({"sites-popup.csv"}, SNAPSHOT) == (set(), False, True, True, True)
+    assert plan_rebuild({"cluster_tiles.py"}, SNAPSHOT) == (set(), False, True, False, True)
+    # The template only regenerates the generated pages; source pages are never re-templated
+    assert plan_rebuild({"redesign_sites.py"}, SNAPSHOT) == (set(), False, False, True, True)
+    assert not any(plan_rebuild({"migrate_bootstrap.py", "pipeline.py"}, SNAPSHOT))
+
+
+def test_generated_pages_follow_content():
+    kerma = os.path.join("sites", "kerma.html")
+    fragment = os.path.join("content", "sites", "kerma.html")
+    assert plan_rebuild({fragment}, SNAPSHOT, generated=[kerma]) == (set(), False, False, True, True)
+    # Generated pages are outputs: a hand edit rebuilds nothing
+    assert not any(plan_rebuild({kerma}, SNAPSHOT, generated=[kerma]))
+
+
+def test_rebuild_runs_only_derived_outputs(monkeypatch):
+    scripts = []
+    monkeypatch.setattr("watch.run_script", lambda script, args=(): scripts.append((script, list(args))) or True)
+    kerma = os.path.join("sites", "kerma.html")
+    assert rebuild(plan_rebuild({kerma, "redesign_sites.py"}, SNAPSHOT))
+    assert scripts == [("prerender_partials.py", [kerma]), ("generate_pages.py", []), ("search_index.py", [])]
+
+
+def test_wait_for_changes_debounces():
+    # The tree changes on the second poll and keeps changing for two more
+    scans = iter([{"a.html": 1}, {"a.html": 2}, {"a.html": 3}, {"a.html": 3, "b.html": 1}, {"a.html": 3, "b.html": 1}])
+    sleeps = []
+    changed, snapshot = wait_for_changes(
+        {"a.html": 1}, interval=0.5, debounce=0.2, scan=lambda: next(scans), sleep=sleeps.append,
+    )
+    assert changed == {"a.html", "b.html"}
+    assert snapshot == {"a.html": 3, "b.html": 1}
+    assert sleeps == [0.5, 0.5, 0.2, 0.2, 0.2]
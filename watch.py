@@ -0,0 +1,164 @@
+"""Rebuild only what an edit affects, for python pipeline.py --watch.
+
+Only derived outputs are rebuilt: the prerendered navbar/footer, the pages
+generated from content/, the site index and tiles, and the search index.
+The migrate and redesign stages rewrite source pages and are not
+idempotent, so the watch never runs them; that stays a deliberate
+python pipeline.py run.
+
+The tree is polled (no extra dependency, works the same on every OS and
+on network mounts) and a batch of edits is rebuilt once it has been quiet
+for the debounce window. Every rebuild runs the scripts as fresh
+processes, so edits to the template or the scripts themselves take effect
+without restarting the watch, and a half-saved script cannot kill it.
+"""
+import os
+import subprocess
+import sys
+import time
+from collections import namedtuple
+
+from batch import walk_files
+from cluster_tiles import TILES_DIR
+from compile_sites import CSV_PATH
+from generate_pages import CONTENT_DIR, load_records
+from link_index import SKIP_DIRS
+from prerender_partials import PARTIALS
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+WATCHED_EXTENSIONS = ('.html', '.csv', '.json', '.py')
+DEFAULT_INTERVAL = 0.5
+DEFAULT_DEBOUNCE = 0.3
+# What pages rendered from content/ by generate_pages.py depend on besides content/ itself
+GENERATOR_SOURCES = ("generate_pages.py", "redesign_sites.py", CSV_PATH)
+PARTIAL_PATHS = tuple(os.path.normpath(path) for path in PARTIALS.values())
+# What the site index and tiles are built from
+SITES_DATA_SOURCES = (CSV_PATH, "compile_sites.py", "cluster_tiles.py")
+
+# pages: edited pages to prerender again
+# prerender_all: a partial changed, so every page's navbar/footer is stale
+# sites_data: the site index and tiles are stale
+# generate: pages rendered from content/ are stale
+# search: the search index is stale
+Plan = namedtuple("Plan", ["pages", "prerender_all", "sites_data", "generate", "search"])
+
+def add_watch_arguments(parser):
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and rebuild the derived outputs an edit affects (prerendered "
+                             "partials, generated pages, site data, search index); never migrates or redesigns")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                        help=f"seconds between polls in --watch mode (default: {DEFAULT_INTERVAL})")
+    parser.add_argument("--debounce", type=float, default=DEFAULT_DEBOUNCE,
+                        help=f"quiet seconds to wait for before rebuilding (default: {DEFAULT_DEBOUNCE})")
+
+def is_skipped(path):
+    name = os.path.basename(path)
+    return name in SKIP_DIRS or name.startswith(".")
+
+def scan(root="."):
+    # path -> (mtime, size) of every file a rebuild depends on
+    snapshot = {}
+    for path in walk_files(root, WATCHED_EXTENSIONS, skip=is_skipped):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue # Deleted while we were walking
+        snapshot[os.path.normpath(os.path.relpath(path, root))] = (st.st_mtime_ns, st.st_size)
+    return snapshot
+
+def changed_paths(old, new):
+    # Added, modified and removed paths
+    return {path for path in old.keys() | new.keys() if old.get(path) != new.get(path)}
+
+def wait_for_changes(snapshot, interval=DEFAULT_INTERVAL, debounce=DEFAULT_DEBOUNCE, scan=scan, sleep=time.sleep):
+    """Block until the tree differs from snapshot and then stays unchanged for debounce seconds.
+
+    Returns (changed paths, new snapshot). Waiting for a quiet tree turns
+    an editor's save-and-rename or a git checkout into a single rebuild.
+    """
+    while True:
+        sleep(interval)
+        current = scan()
+        if current != snapshot:
+            break
+    while True:
+        sleep(debounce)
+        latest = scan()
+        if latest == current:
+            return changed_paths(snapshot, current), current
+        current = latest
+
+def is_content(path):
+    return path.startswith(CONTENT_DIR + os.sep)
+
+def is_page(path):
+    return path.endswith(".html") and path not in PARTIAL_PATHS and not is_content(path)
+
+def plan_rebuild(changed, snapshot, generated=()):
+    """Work a set of changed paths calls for, given the tree's current snapshot.
+
+    A page's prerendered navbar and footer depend on the page and the
+    partials, the site index and cluster tiles on SITES_DATA_SOURCES, and
+    the search index on the pages and sites-popup.csv. The generated pages
+    (rendered from content/) depend on content/ and GENERATOR_SOURCES only;
+    they are outputs, so editing one by hand rebuilds nothing.
+    """
+    pages = {path for path in changed if is_page(path) and path in snapshot} - set(generated)
+    prerender_all = any(path in PARTIAL_PATHS or path == "prerender_partials.py" for path in changed)
+    sites_data = any(path in SITES_DATA_SOURCES for path in changed)
+    generate = any(is_content(path) or path in GENERATOR_SOURCES for path in changed)
+    search = bool(pages) or sites_data or generate or "search_index.py" in changed
+    return Plan(pages, prerender_all, sites_data, generate, search)
+
+def run_script(script, args=()):
+    command = [sys.executable, os.path.join(SCRIPT_DIR, script), *args]
+    code = subprocess.run(command).returncode
+    if code:
+        print(f"{script} exited with status {code}")
+    return code == 0
+
+def build_sites_data():
+    ok = run_script("compile_sites.py")
+    # Tiles are optional; only keep them up to date if they were built
+    if ok and os.path.isdir(TILES_DIR):
+        ok = run_script("cluster_tiles.py")
+    return ok
+
+def rebuild(plan):
+    ok = True
+    if plan.prerender_all:
+        ok = run_script("prerender_partials.py")
+    elif plan.pages:
+        ok = run_script("prerender_partials.py", sorted(plan.pages))
+    if plan.sites_data:
+        ok = build_sites_data() and ok
+    # Last, so nothing above leaves its output in a generated page
+    if plan.generate:
+        ok = run_script("generate_pages.py") and ok
+    if plan.search:
+        ok = run_script("search_index.py") and ok
+    return ok
+
+def watch(interval=DEFAULT_INTERVAL, debounce=DEFAULT_DEBOUNCE):
+    snapshot = scan()
+    print(f"Watching {len(snapshot)} files for changes (Ctrl+C to stop)")
+    try:
+        while True:
+            changed, snapshot = wait_for_changes(snapshot, interval, debounce)
+            try:
+                generated = load_records()
+            except ValueError as e:
+                print(f"\nNot rebuilding, {CONTENT_DIR}/ is unreadable: {e}")
+                continue
+            plan = plan_rebuild(changed, snapshot, generated)
+            if not any(plan):
+                continue
+            print(f"\nChanged: {', '.join(sorted(changed))}")
+            start = time.perf_counter()
+            ok = rebuild(plan)
+            # What the rebuild itself wrote is not an edit to react to
+            snapshot = scan()
+            status = "" if ok else " with errors"
+            print(f"Rebuilt in {time.perf_counter() - start:.2f}s{status}")
+    except KeyboardInterrupt:
+        return 0